@@ -0,0 +1 @@
+"""Benchmarks for the ESPSomfy RTS integration."""
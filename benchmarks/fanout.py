@@ -0,0 +1,582 @@
+"""Event fan-out throughput benchmark for the ESPSomfy RTS integration.
+
+Feeds socket frames for a number of hubs through the controllers and the
+cover, sensor, binary sensor and switch entities of each hub inside a test
+instance of Home Assistant.  The frames go in as fast as the loop takes
+them while the entities run on a clock that follows the frame timestamps,
+so the write budget sees the same gaps as on a live socket.  Each scenario
+runs again with every state change written as a baseline for the budget,
+and once more with every entity of a hub written on every frame the way
+the integration worked before the field level deltas.  The throughput along with the work done for every frame is written out as
+JSON so runs can be compared across releases.
+
+    python -m benchmarks.fanout --output fanout.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+import heapq
+import importlib
+import itertools
+import json
+import logging
+import math
+from pathlib import Path
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_test_home_assistant,
+)
+
+from homeassistant.const import CONF_HOST, Platform, __version__ as HA_VERSION
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.entity_platform import EntityPlatform
+
+from custom_components.espsomfy_rts.connection import HubConnection
+from custom_components.espsomfy_rts.const import (
+    CONF_MAX_WRITE_RATE,
+    CONF_POSITION_DEADBAND,
+    DEFAULT_MAX_WRITE_RATE,
+    DEFAULT_POSITION_DEADBAND,
+    DOMAIN,
+    VERSION,
+)
+from custom_components.espsomfy_rts.controller import (
+    SOCKET_EVENTS,
+    ESPSomfyAPI,
+    ESPSomfyController,
+)
+
+from .frames import HubFrames, recorded_frames, synthetic_frames
+
+_LOGGER = logging.getLogger(__name__)
+
+PACKAGE = "custom_components.espsomfy_rts"
+PLATFORMS = (Platform.COVER, Platform.SENSOR, Platform.BINARY_SENSOR, Platform.SWITCH)
+SHADE_COUNTS = (8, 32, 128, 512)
+HUB_COUNTS = (1, 2, 5, 10)
+# Seconds between the samples of the event loop latency.
+PROBE_INTERVAL = 0.005
+# Seconds the clock runs on after the last frame so held back writes go out.
+SETTLE_SECONDS = 60.0
+# Options that let every state change through the limiter as one write.
+BASELINE_OPTIONS = {CONF_MAX_WRITE_RATE: 0, CONF_POSITION_DEADBAND: 0}
+# Figures of the baseline and pre-delta runs reported next to the limited run.
+BASELINE_KEYS = (
+    "frames_per_s",
+    "cpu_us_per_frame",
+    "callbacks_per_frame",
+    "state_writes_per_frame",
+    "state_writes_per_1000_frames",
+)
+
+
+class LoopLagProbe:
+    """Measures how late the event loop runs a timer while frames are fed."""
+
+    def __init__(self, interval: float = PROBE_INTERVAL) -> None:
+        """Initialize the probe."""
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start sampling."""
+        self._task = asyncio.create_task(self._async_run())
+
+    def stop(self) -> None:
+        """Stop sampling."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def summary(self) -> dict[str, float]:
+        """Get the latency figures in milliseconds."""
+        if not self.samples:
+            return {"samples": 0}
+        samples = sorted(self.samples)
+        return {
+            "samples": len(samples),
+            "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+            "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+            "p99_ms": round(samples[int(len(samples) * 0.99)] * 1000, 3),
+            "max_ms": round(samples[-1] * 1000, 3),
+        }
+
+    async def _async_run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(loop.time() - start - self.interval, 0))
+
+
+class BenchClock:
+    """A controller clock that follows the timestamps of the frames.
+
+    The timers started while a frame or one of these timers is handled are
+    noted along with when they are due on this clock and fired as the frames
+    move past them, so the entities see the same gaps as on a live socket.
+    Everything else on the event loop, the latency probe included, keeps to
+    real time.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Initialize the clock at the start of the frames."""
+        self.now = 0.0
+        self.fired = 0
+        self._loop = loop
+        self._call_at = loop.call_at
+        self._capturing = False
+        self._sequence = itertools.count()
+        self._timers: list[
+            tuple[float, int, asyncio.TimerHandle, Callable[..., Any], tuple]
+        ] = []
+
+    def __call__(self) -> float:
+        """Get the current time on the clock."""
+        return self.now
+
+    @contextmanager
+    def attach(self) -> Iterator[None]:
+        """Note the timers started on the event loop for the duration."""
+        self._loop.call_at = self._async_call_at  # type: ignore[method-assign]
+        try:
+            yield
+        finally:
+            del self._loop.call_at
+            for _due, _sequence, handle, _callback, _args in self._timers:
+                handle.cancel()
+            self._timers.clear()
+
+    def handle(self, connection: HubConnection, timestamp: float, message: str) -> None:
+        """Move the clock to the time of a message and hand it to a hub."""
+        self.advance(timestamp)
+        self._capturing = True
+        try:
+            connection.handle_message(message)
+        finally:
+            self._capturing = False
+
+    def advance(self, now: float) -> None:
+        """Move the clock forward and fire the timers that came due on the way."""
+        while self._timers and self._timers[0][0] <= now:
+            due, _sequence, handle, callback, args = heapq.heappop(self._timers)
+            if handle.cancelled():
+                continue
+            handle.cancel()
+            self.now = max(self.now, due)
+            self.fired += 1
+            self._capturing = True
+            try:
+                callback(*args)
+            finally:
+                self._capturing = False
+        self.now = max(self.now, now)
+
+    def _async_call_at(
+        self, when: float, callback: Callable[..., Any], *args: Any, context=None
+    ) -> asyncio.TimerHandle:
+        if not self._capturing:
+            return self._call_at(when, callback, *args, context=context)
+        # The loop holds on to the timer so it can be cancelled as usual but
+        # only the clock ever fires it.
+        handle = self._call_at(math.inf, callback, *args, context=context)
+        due = self.now + when - self._loop.time()
+        heapq.heappush(
+            self._timers, (due, next(self._sequence), handle, callback, args)
+        )
+        return handle
+
+
+def count_callbacks(controller: ESPSomfyController, calls: list[int]) -> None:
+    """Count the calls to the handlers the entities register on a controller.
+
+    The listener methods are wrapped on the controller before the platforms
+    are set up so every handler is counted from the time it is registered.
+    """
+
+    def counted(update_callback: Callable[..., Any]) -> Callable[..., Any]:
+        def _counted(*args: Any) -> Any:
+            calls[0] += 1
+            return update_callback(*args)
+
+        return _counted
+
+    def counting(add: Callable[..., Any]) -> Callable[..., Any]:
+        def _add(*args: Any, **kwargs: Any) -> Any:
+            # The handler is the only callable that is passed in.
+            return add(
+                *(counted(arg) if callable(arg) else arg for arg in args), **kwargs
+            )
+
+        return _add
+
+    for name in (
+        "async_add_listener",
+        "async_add_state_listener",
+        "async_add_hub_listener",
+        "async_add_flag_listener",
+    ):
+        setattr(controller, name, counting(getattr(controller, name)))
+
+
+def write_every_entity(
+    controller: ESPSomfyController, entities: Sequence[Entity], calls: list[int]
+) -> Callable[[Any], None]:
+    """Wrap the frame handler of a hub so every entity writes on every frame.
+
+    This is the work the hub did before the field level deltas, when every
+    frame went to every entity of the hub and each of them wrote its state.
+    The entities that already wrote for the frame are not written twice.
+    """
+    handle_frame = controller.ws_onpacket
+    written: set[int] = set()
+
+    def tracked(entity: Entity) -> Callable[[], None]:
+        write_state = entity.async_write_ha_state
+
+        def _write_state() -> None:
+            written.add(id(entity))
+            write_state()
+
+        return _write_state
+
+    for entity in entities:
+        entity.async_write_ha_state = tracked(entity)  # type: ignore[method-assign]
+
+    def _handle_frame(data: Any) -> None:
+        written.clear()
+        handle_frame(data)
+        for entity in entities:
+            calls[0] += 1
+            if id(entity) not in written:
+                entity.async_write_ha_state()
+
+    return _handle_frame
+
+
+async def async_setup_hub(
+    hass: HomeAssistant,
+    frames: HubFrames,
+    index: int,
+    clock: BenchClock,
+    calls: list[int],
+    options: dict[str, Any],
+    pre_delta: bool = False,
+) -> tuple[ESPSomfyController, HubConnection]:
+    """Set up a hub along with the entities of every platform.
+
+    The hub is configured from its discovery payload instead of the network
+    and the frames are handed to the same socket decoder the hub uses.  With
+    pre_delta every entity of the hub writes its state on every frame.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title=f"Bench {index}",
+        data={CONF_HOST: f"192.0.2.{index + 1}"},
+        options=options,
+        entry_id=f"bench{index:02d}",
+    )
+    entry.add_to_hass(hass)
+    api = ESPSomfyAPI(hass, entry.entry_id, entry.data)
+    api.apply_data(
+        json.loads(json.dumps({**frames.discovery, "serverId": f"BENCH{index:04d}"}))
+    )
+    controller = ESPSomfyController(entry.entry_id, hass, api)
+    controller.clock = clock
+    count_callbacks(controller, calls)
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = controller
+    controller.set_connected(True)
+    entities: list[Entity] = []
+    for domain in PLATFORMS:
+        entity_platform = EntityPlatform(
+            hass=hass,
+            logger=_LOGGER,
+            domain=domain,
+            platform_name=DOMAIN,
+            platform=importlib.import_module(f"{PACKAGE}.{domain}"),
+            scan_interval=timedelta(seconds=30),
+            entity_namespace=None,
+        )
+        await entity_platform.async_setup_entry(entry)
+        entities.extend(entity_platform.entities.values())
+    await hass.async_block_till_done()
+    handle_frame = controller.ws_onpacket
+    if pre_delta:
+        handle_frame = write_every_entity(controller, entities, calls)
+
+    async def _async_sock_url() -> str:
+        # The frames are handed over directly so the socket is never opened.
+        return api.get_sock_url()
+
+    connection = HubConnection(
+        entry.entry_id,
+        _async_sock_url,
+        SOCKET_EVENTS,
+        handle_frame,
+        controller.ws_onopen,
+        controller.ws_onclose,
+        controller.ws_onerror,
+    )
+    return controller, connection
+
+
+async def async_feed(
+    clock: BenchClock,
+    connections: Sequence[HubConnection],
+    messages: Sequence[tuple[float, str]],
+    batch: int,
+) -> None:
+    """Hand the messages to every hub in turn.
+
+    The hubs are interleaved like sockets delivering at the same time and
+    the loop gets a turn after every batch of messages.  The clock moves to
+    the time of each message as it is handed over.
+    """
+    for sent, ((timestamp, message), connection) in enumerate(
+        itertools.product(messages, connections), 1
+    ):
+        clock.handle(connection, timestamp, message)
+        if sent % batch == 0:
+            await asyncio.sleep(0)
+
+
+async def async_run_scenario(
+    frames: HubFrames,
+    shades: int,
+    hubs: int,
+    batch: int,
+    options: dict[str, Any],
+    pre_delta: bool = False,
+) -> dict[str, Any]:
+    """Measure a number of hubs that all send the same frames."""
+    with tempfile.TemporaryDirectory() as config_dir:
+        async with async_test_home_assistant(config_dir=config_dir) as hass:
+            clock = BenchClock(hass.loop)
+            calls = [0]
+            start = time.perf_counter()
+            hub_setups = [
+                await async_setup_hub(
+                    hass, frames, index, clock, calls, options, pre_delta
+                )
+                for index in range(hubs)
+            ]
+            setup = time.perf_counter() - start
+            controllers = [controller for controller, _connection in hub_setups]
+            connections = [connection for _controller, connection in hub_setups]
+            entities = len(hass.states.async_all())
+
+            before = _counters(controllers)
+            before_calls = calls[0]
+            probe = LoopLagProbe()
+            with clock.attach():
+                probe.start()
+                wall = time.perf_counter()
+                cpu = time.process_time()
+                await async_feed(clock, connections, frames.messages, batch)
+                await hass.async_block_till_done()
+                cpu = time.process_time() - cpu
+                wall = time.perf_counter() - wall
+                probe.stop()
+                # Let the writes held back by the budget go out before they
+                # are counted.
+                clock.advance(clock.now + SETTLE_SECONDS)
+                await hass.async_block_till_done()
+            counters = {
+                key: value - before[key]
+                for key, value in _counters(controllers).items()
+            }
+
+            received = counters["frames_received"]
+            writes = counters["state_writes"]
+            result = {
+                "shades": shades,
+                "hubs": hubs,
+                "entities": entities,
+                "frames": received,
+                "setup_s": round(setup, 3),
+                "seconds": round(wall, 3),
+                "frames_per_s": round(received / wall, 1) if wall else None,
+                "cpu_us_per_frame": _per_frame(cpu * 1_000_000, received),
+                "callbacks_per_frame": _per_frame(calls[0] - before_calls, received),
+                "state_writes_per_frame": _per_frame(writes, received),
+                "state_writes_per_1000_frames": _per_frame(writes * 1000, received),
+                "writes_suppressed_per_frame": _per_frame(
+                    counters["writes_suppressed"], received
+                ),
+                "unchanged_frames": counters["frames_unchanged"],
+                "timers_fired": clock.fired,
+                "loop_latency": probe.summary(),
+            }
+            for controller in controllers:
+                await controller.ws_close()
+    return result
+
+
+def _counters(controllers: Sequence[ESPSomfyController]) -> dict[str, int]:
+    """Total the runtime counters of the controllers."""
+    return {
+        key: sum(getattr(controller, key) for controller in controllers)
+        for key in (
+            "frames_received",
+            "frames_unchanged",
+            "state_writes",
+            "writes_suppressed",
+        )
+    }
+
+
+def _per_frame(value: float, frames: int) -> float | None:
+    return round(value / frames, 3) if frames else None
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse the command line."""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.fanout", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument("--shades", type=int, nargs="+", default=SHADE_COUNTS)
+    parser.add_argument("--hubs", type=int, nargs="+", default=HUB_COUNTS)
+    parser.add_argument(
+        "--travel-time",
+        type=float,
+        default=10.0,
+        help="seconds for a generated motor to travel from open to closed",
+    )
+    parser.add_argument(
+        "--frame-rate",
+        type=float,
+        default=2.0,
+        help="generated state frames per second for each moving shade",
+    )
+    parser.add_argument(
+        "--batch",
+        type=int,
+        default=10,
+        help="messages handled before the loop gets a turn",
+    )
+    parser.add_argument(
+        "--max-write-rate",
+        type=float,
+        default=DEFAULT_MAX_WRITE_RATE,
+        help="state writes per second allowed for a moving shade",
+    )
+    parser.add_argument(
+        "--position-deadband",
+        type=int,
+        default=DEFAULT_POSITION_DEADBAND,
+        help="position change needed before a moving shade writes",
+    )
+    parser.add_argument(
+        "--baseline",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="also run every scenario with one state write per change",
+    )
+    parser.add_argument(
+        "--pre-delta",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="also run every scenario with every entity written on every frame",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--discovery", type=Path, help="recorded discovery payload to use"
+    )
+    parser.add_argument(
+        "--frames", type=Path, help="recorded socket messages, one per line"
+    )
+    parser.add_argument(
+        "--output", type=Path, help="file for the results instead of stdout"
+    )
+    args = parser.parse_args(argv)
+    if (args.discovery is None) != (args.frames is None):
+        parser.error("--discovery and --frames must be given together")
+    return args
+
+
+async def async_main(args: argparse.Namespace) -> dict[str, Any]:
+    """Run every scenario and gather the results."""
+    results = []
+    if args.frames is not None:
+        frames = recorded_frames(args.discovery, args.frames)
+        scenarios = [(frames, len(frames.discovery.get("shades", [])))]
+    else:
+        scenarios = [
+            (
+                synthetic_frames(
+                    shades,
+                    travel_time=args.travel_time,
+                    frame_rate=args.frame_rate,
+                    seed=args.seed,
+                ),
+                shades,
+            )
+            for shades in args.shades
+        ]
+    options = {
+        CONF_MAX_WRITE_RATE: args.max_write_rate,
+        CONF_POSITION_DEADBAND: args.position_deadband,
+    }
+    for frames, shades in scenarios:
+        for hubs in args.hubs:
+            _LOGGER.info("Running %s shades on %s hubs", shades, hubs)
+            result = await async_run_scenario(frames, shades, hubs, args.batch, options)
+            if args.baseline:
+                _LOGGER.info("Running %s shades on %s hubs unlimited", shades, hubs)
+                baseline = await async_run_scenario(
+                    frames, shades, hubs, args.batch, BASELINE_OPTIONS
+                )
+                result["baseline"] = {key: baseline[key] for key in BASELINE_KEYS}
+            if args.pre_delta:
+                _LOGGER.info("Running %s shades on %s hubs pre-delta", shades, hubs)
+                pre_delta = await async_run_scenario(
+                    frames, shades, hubs, args.batch, BASELINE_OPTIONS, pre_delta=True
+                )
+                result["pre_delta"] = {key: pre_delta[key] for key in BASELINE_KEYS}
+            results.append(result)
+    return {
+        "benchmark": "fanout",
+        "integration_version": VERSION,
+        "homeassistant_version": HA_VERSION,
+        "python_version": platform.python_version(),
+        "timestamp": datetime.now(UTC).isoformat(),
+        "settings": {
+            "source": "recorded" if args.frames is not None else "synthetic",
+            "travel_time": args.travel_time,
+            "frame_rate": args.frame_rate,
+            "batch": args.batch,
+            "seed": args.seed,
+            "max_write_rate": args.max_write_rate,
+            "position_deadband": args.position_deadband,
+        },
+        "results": results,
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the benchmark and write out the results."""
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    report = json.dumps(asyncio.run(async_main(args)), indent=2)
+    if args.output is not None:
+        args.output.write_text(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
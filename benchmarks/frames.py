@@ -0,0 +1,103 @@
+"""Socket frames to feed the benchmarks, generated or loaded from a recording."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from espsomfy_sim.device import SimulatedHub, SimulatorConfig, encode_frame
+
+# Seconds the generated frames advance between the steps of the motors.
+STEP = 0.05
+# Seconds between the messages of a recording, which has no timestamps.
+RECORDED_SPACING = 0.01
+
+
+class HubFrames(NamedTuple):
+    """The discovery payload for a hub and the socket messages it sends.
+
+    Each message is paired with the time in seconds it was sent at.
+    """
+
+    discovery: dict[str, Any]
+    messages: list[tuple[float, str]]
+
+
+class _Clock:
+    """A clock that only moves when it is told to."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def synthetic_frames(
+    shades: int,
+    *,
+    travel_time: float = 10.0,
+    frame_rate: float = 2.0,
+    seed: int = 0,
+) -> HubFrames:
+    """Generate the frames for a hub where every shade closes and opens again.
+
+    A quarter of the shades tilt and a quarter have sun sensors which trip
+    between the moves.  Remote presses and status frames are mixed in at a
+    steady rate so every platform sees traffic.
+    """
+    clock = _Clock()
+    messages: list[tuple[float, str]] = []
+    config = SimulatorConfig(
+        shades=shades,
+        groups=max(shades // 8, 1),
+        travel_time=travel_time,
+        travel_spread=0.25,
+        tilt_shades=shades // 4,
+        sun_shades=shades // 4,
+        frame_rate=frame_rate,
+        remote_rate=shades / 64,
+        chatter_rate=1.0,
+        seed=seed,
+    )
+    hub = SimulatedHub(
+        config,
+        lambda event, payload: messages.append(
+            (clock.now, encode_frame(event, payload))
+        ),
+        clock,
+    )
+    discovery = hub.discovery()
+    # Long enough for the slowest motor to finish its travel.
+    duration = travel_time * (1 + config.travel_spread) + 1
+
+    def run() -> None:
+        end = clock.now + duration
+        while clock.now < end:
+            clock.now += STEP
+            hub.tick()
+
+    for shade in hub.shades.values():
+        hub.shade_command(shade, {"command": "down"})
+    run()
+    for shade in list(hub.shades.values())[: config.sun_shades]:
+        hub.set_sensor(shade, {"sunny": True, "windy": shade.shade_id % 2 == 0})
+        hub.shade_command(shade, {"command": "sunflag"})
+    for group in hub.groups.values():
+        hub.group_command(group, {"command": "up"})
+    run()
+    return HubFrames(discovery, messages)
+
+
+def recorded_frames(discovery: Path, frames: Path) -> HubFrames:
+    """Load a discovery payload and the raw socket messages recorded from a hub.
+
+    The frames file holds one message per line as it came off the socket.
+    The recording has no timestamps so the messages are spread out evenly.
+    """
+    lines = [line for line in frames.read_text().splitlines() if line.strip()]
+    return HubFrames(
+        json.loads(discovery.read_text()),
+        [(index * RECORDED_SPACING, line) for index, line in enumerate(lines)],
+    )
@@ -5,13 +5,21 @@ from __future__ import annotations
 from enum import IntFlag
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.const import CONF_HOST, EVENT_HOMEASSISTANT_STOP
 from homeassistant.core import Event, HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.device_registry import DeviceEntry
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN, PLATFORMS
-from .controller import ESPSomfyAPI, ESPSomfyController
+from .const import DOMAIN, PLATFORMS, SIGNAL_HUB_UPDATED
+from .controller import ESPSomfyAPI, ESPSomfyController, cache_stores
+from .query import async_setup_services
+from .snapshot import ESPSomfySnapshotView
+from .subscription import async_setup_websocket
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
 
 class ESPSomfyRTSEntityFeature(IntFlag):
@@ -21,18 +29,49 @@ class ESPSomfyRTSEntityFeature(IntFlag):
     BACKUP = 2
 
 
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the services and views that span all the ESPSomfy RTS hubs."""
+    async_setup_services(hass)
+    hass.http.register_view(ESPSomfySnapshotView())
+    async_setup_websocket(hass)
+    return True
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up ESPSomfy RTS from a config entry."""
     api = ESPSomfyAPI(hass, entry.entry_id, entry.data)
     controller = ESPSomfyController(entry.entry_id, hass, api)
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = controller
-    await api.get_initial()
-    if not api.is_configured:
-        raise ConfigEntryNotReady(
-            f"Could not find ESPSomfy RTS device with address {api.get_api_url()}"
+    if await api.async_load_cache():
+        # Start from the last known configuration and refresh it from the hub
+        # in the background.  The entities show the restored state, or the
+        # state in the cached payload, as unconfirmed until the hub reports.
+        if not await api.async_load_state():
+            api.store.mark_restored()
+        await api.async_setup_platforms()
+        # The socket opens once the cache is applied so its frames land on
+        # top of the cached rows and are not replaced by them.
+        await controller.ws_connect()
+        entry.async_create_background_task(
+            hass,
+            controller.async_refresh_discovery(),
+            f"{DOMAIN}_refresh_discovery_{entry.entry_id}",
         )
+    else:
+        # The socket handshake runs while the configuration is loaded.  When
+        # the socket opens first it joins the discovery request in flight.
+        await controller.ws_connect()
+        await api.get_initial()
+        if not api.is_configured:
+            await controller.ws_close()
+            hass.data[DOMAIN].pop(entry.entry_id)
+            raise ConfigEntryNotReady(
+                f"Could not find ESPSomfy RTS device with address {api.get_api_url()}"
+            )
 
     hass.config_entries.async_update_entry(entry, title=api.deviceName)
+    entry.async_on_unload(controller.async_track_entity_registry())
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
 
     # entry.title = api.deviceName
     async def _async_ws_close(_: Event) -> None:
@@ -42,13 +81,27 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     entry.async_on_unload(
         hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_ws_close)
     )
-    # This does not occur until the socket connects.
-    # await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
-    await controller.ws_connect()
-
+    api.startup.mark("setup")
+    # Open shade subscriptions start streaming the rows of the hub.
+    async_dispatcher_send(hass, SIGNAL_HUB_UPDATED, entry.entry_id, controller)
     return True
 
 
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply a change to the config entry.
+
+    The entities read the options when they are set up so a change to them
+    reloads the entry.  A new address moves the hub without a reload.
+    """
+    controller: ESPSomfyController = hass.data[DOMAIN][entry.entry_id]
+    if dict(entry.options) != controller.applied_options:
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    # Title changes land here as well, only a new address moves the hub.
+    if controller.api.get_host() != entry.data[CONF_HOST]:
+        await controller.set_host(entry.data[CONF_HOST])
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     controller: ESPSomfyController = hass.data[DOMAIN].get(entry.entry_id)
@@ -59,10 +112,17 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
                 entry, PLATFORMS
             ):
                 hass.data[DOMAIN].pop(entry.entry_id)
+                async_dispatcher_send(hass, SIGNAL_HUB_UPDATED, entry.entry_id, None)
             return unload_ok
     return True
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the cached discovery payload and state of a deleted hub."""
+    for store in cache_stores(hass, entry.entry_id):
+        await store.async_remove()
+
+
 async def async_remove_config_entry_device(
     hass: HomeAssistant, config_entry: ConfigEntry, device_entry: DeviceEntry
 ) -> bool:
@@ -0,0 +1,133 @@
+"""Incremental aggregate state for ESPSomfy RTS groups."""
+
+from __future__ import annotations
+
+from typing import NamedTuple
+
+from homeassistant.components.cover import CoverEntityFeature
+
+from .model import ShadeModel
+from .store import ShadeState
+
+
+class MemberState(NamedTuple):
+    """What a single linked shade contributes to the group aggregate."""
+
+    position: int | None
+    tilt_position: int | None
+    opening: bool
+    closing: bool
+    open: bool
+    windy: bool
+    sunny: bool
+
+
+def member_state(model: ShadeModel, state: ShadeState) -> MemberState:
+    """Reduce the state of a linked shade to its contribution to the group."""
+    features = model.supported_features
+    opening = model.is_opening(state)
+    closing = model.is_closing(state)
+    return MemberState(
+        position=model.position(state.position)
+        if features & CoverEntityFeature.SET_POSITION
+        else None,
+        tilt_position=model.tilt_position(state.tilt_position)
+        if features & CoverEntityFeature.SET_TILT_POSITION
+        else None,
+        opening=opening,
+        closing=closing,
+        # Mirrors the cover state where moving wins over being closed.
+        open=not (opening or closing or model.is_closed(state)),
+        windy=state.windy,
+        sunny=state.sunny,
+    )
+
+
+class GroupAggregate:
+    """Running totals over the shades linked to a group.
+
+    Each member contribution is kept so an update only has to take the old
+    contribution out of the totals and put the new one in.  The cost of a
+    member update does not depend on the number of shades in the group.
+    """
+
+    __slots__ = (
+        "_members",
+        "position_sum",
+        "position_count",
+        "tilt_sum",
+        "tilt_count",
+        "opening",
+        "closing",
+        "open",
+        "windy",
+        "sunny",
+    )
+
+    def __init__(self) -> None:
+        """Initialize an empty aggregate."""
+        self._members: dict[int, MemberState] = {}
+        self.position_sum = 0
+        self.position_count = 0
+        self.tilt_sum = 0
+        self.tilt_count = 0
+        self.opening = 0
+        self.closing = 0
+        self.open = 0
+        self.windy = 0
+        self.sunny = 0
+
+    def __len__(self) -> int:
+        """Get the number of shades in the aggregate."""
+        return len(self._members)
+
+    def _add(self, member: MemberState, sign: int) -> None:
+        """Add or take a member contribution out of the totals."""
+        if member.position is not None:
+            self.position_sum += sign * member.position
+            self.position_count += sign
+        if member.tilt_position is not None:
+            self.tilt_sum += sign * member.tilt_position
+            self.tilt_count += sign
+        self.opening += sign * member.opening
+        self.closing += sign * member.closing
+        self.open += sign * member.open
+        self.windy += sign * member.windy
+        self.sunny += sign * member.sunny
+
+    def update(self, shade_id: int, member: MemberState) -> bool:
+        """Replace the contribution of a shade and return whether it changed."""
+        old = self._members.get(shade_id)
+        if old == member:
+            return False
+        if old is not None:
+            self._add(old, -1)
+        self._members[shade_id] = member
+        self._add(member, 1)
+        return True
+
+    def remove(self, shade_id: int) -> bool:
+        """Take a shade out of the aggregate and return whether it was in it."""
+        if (old := self._members.pop(shade_id, None)) is None:
+            return False
+        self._add(old, -1)
+        return True
+
+    @property
+    def position(self) -> int | None:
+        """Get the mean position of the shades that report a position."""
+        if self.position_count == 0:
+            return None
+        return round(self.position_sum / self.position_count)
+
+    @property
+    def tilt_position(self) -> int | None:
+        """Get the mean tilt position of the shades that can tilt."""
+        if self.tilt_count == 0:
+            return None
+        return round(self.tilt_sum / self.tilt_count)
+
+    @property
+    def is_closed(self) -> bool:
+        """Return true when none of the shades is open."""
+        return self.open == 0
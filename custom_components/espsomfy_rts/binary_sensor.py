@@ -2,14 +2,19 @@
 
 from __future__ import annotations
 
+from collections.abc import Callable, Mapping
+from functools import partial
+from typing import Any
+
 from homeassistant.components.binary_sensor import BinarySensorEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import DOMAIN, EVT_CONNECTED, EVT_GROUPSTATE, EVT_SHADESTATE
+from .const import ATTR_RESTORED, DOMAIN, EVT_CONNECTED
 from .controller import ESPSomfyController
 from .entity import ESPSomfyEntity
+from .store import KIND_SHADE, ShadeFlag, ShadeState
 
 
 async def async_setup_entry(
@@ -18,40 +23,46 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up shades for the shade controller."""
-    controller = hass.data[DOMAIN][config_entry.entry_id]
-    new_entities = []
+    controller: ESPSomfyController = hass.data[DOMAIN][config_entry.entry_id]
     data = controller.api.get_config()
-    if "serverId" in data:
-        for shade in controller.api.shades:
-            try:
-                if "sunSensor" in shade:
-                    if shade["sunSensor"] is True:
-                        new_entities.append(ESPSomfySunSensor(controller, shade))
-                        new_entities.append(ESPSomfyWindSensor(controller, shade))
-                    elif "shadeType" in shade:
-                        match shade["shadeType"]:
-                            case 3:
-                                new_entities.append(
-                                    ESPSomfyWindSensor(controller, shade)
-                                )
-
-                elif "shadeType" in shade:
-                    match shade["shadeType"]:
-                        case 3:
-                            new_entities.append(ESPSomfySunSensor(controller, shade))
-                            new_entities.append(ESPSomfyWindSensor(controller, shade))
-            except KeyError:
-                pass
-        for group in controller.api.groups:
-            try:
-                if "sunSensor" in group:
-                    if group["sunSensor"] is True:
-                        new_entities.append(ESPSomfySunSensor(controller, group))
-                        new_entities.append(ESPSomfyWindSensor(controller, group))
-            except KeyError:
-                pass
-    if new_entities:
-        async_add_entities(new_entities)
+    if "serverId" not in data:
+        return
+
+    def _row_entities(
+        kind: str, row_id: int
+    ) -> dict[str, Callable[[], ESPSomfyEntity]]:
+        new_entities: dict[str, Callable[[], ESPSomfyEntity]] = {}
+        sun = wind = None
+        if kind == KIND_SHADE:
+            if (shade := controller.api.shade_models.get(row_id)) is not None:
+                if shade.has_sun_sensor:
+                    sun = shade.raw
+                if shade.has_wind_sensor:
+                    wind = shade.raw
+        elif (
+            group := controller.api.group_models.get(row_id)
+        ) is not None and group.has_sun_sensor:
+            sun = wind = group.raw
+        if sun is not None:
+            new_entities[_flag_unique_id("sun", controller, sun)] = partial(
+                ESPSomfySunSensor, controller, sun
+            )
+        if wind is not None:
+            new_entities[_flag_unique_id("wind", controller, wind)] = partial(
+                ESPSomfyWindSensor, controller, wind
+            )
+        return new_entities
+
+    controller.async_add_row_platform(_row_entities, async_add_entities)
+
+
+def _flag_unique_id(
+    prefix: str, controller: ESPSomfyController, data: Mapping[str, Any]
+) -> str:
+    """Get the unique id for a flag entity of a shade or group."""
+    if "groupId" in data:
+        return f"{prefix}_group_{controller.unique_id}_{data['groupId']}"
+    return f"{prefix}_{controller.unique_id}_{data['shadeId']}"
 
 
 class ESPSomfySunSensor(ESPSomfyEntity, BinarySensorEntity):
@@ -64,24 +75,34 @@ class ESPSomfySunSensor(ESPSomfyEntity, BinarySensorEntity):
         self._shade_id = None
         self._group_id = None
         self._sensor_type = None
-        self._available = True
+        self._available = controller.connected is not False
         if "groupId" in data:
             self._group_id = data["groupId"]
-            self._attr_unique_id = f"sun_group_{controller.unique_id}_{self._group_id}"
             self._sensor_type = "group"
+            self._state = controller.store.group(int(self._group_id))
         else:
             self._shade_id = data["shadeId"]
-            self._attr_unique_id = f"sun_{controller.unique_id}_{self._shade_id}"
             self._sensor_type = "motor"
+            self._state = controller.store.shade(int(self._shade_id))
+        self._attr_unique_id = _flag_unique_id("sun", controller, data)
         self._attr_name = data["name"]
         self._attr_has_entity_name = False
-        if "flags" in data:
-            self._attr_is_on = bool((int(data["flags"]) & 0x20) == 0x20)
-        else:
-            self._attr_is_on = False
-
+        self._attr_is_on = self._state.sunny
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to the flag changes for the shade or group."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._controller.async_add_flag_listener(
+                self._state.kind, self._state.id, ShadeFlag.SUNNY, self._handle_flag
+            )
+        )
+
+    @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
+        if self.registry_entry.disabled:
+            return
         if (
             self._controller.data["event"] == EVT_CONNECTED
             and "connected" in self._controller.data
@@ -89,26 +110,12 @@ class ESPSomfySunSensor(ESPSomfyEntity, BinarySensorEntity):
             if self._available != bool(self._controller.data["connected"]):
                 self._available = bool(self._controller.data["connected"])
                 self.async_write_ha_state()
-        elif (
-            self._sensor_type == "motor"
-            and "shadeId" in self._controller.data
-            and self._controller.data["shadeId"] == self._shade_id
-            and self._controller.data["event"] == EVT_SHADESTATE
-            and "flags" in self._controller.data
-        ) or (
-            self._sensor_type == "group"
-            and "groupId" in self._controller.data
-            and self._controller.data["groupId"] == self._group_id
-            and self._controller.data["event"] == EVT_GROUPSTATE
-            and "flags" in self._controller.data
-        ):
-            if self._attr_is_on != bool(
-                (int(self._controller.data["flags"]) & 0x20) == 0x20
-            ):
-                self._attr_is_on = bool(
-                    (int(self._controller.data["flags"]) & 0x20) == 0x20
-                )
-                self.async_write_ha_state()
+
+    @callback
+    def _handle_flag(self, state: ShadeState, is_on: bool) -> None:
+        """Handle the flag being set or cleared on the shade or group."""
+        self._attr_is_on = is_on
+        self.async_write_ha_state()
 
     @property
     def icon(self) -> str:
@@ -122,6 +129,13 @@ class ESPSomfySunSensor(ESPSomfyEntity, BinarySensorEntity):
         """Indicates whether the shade is available."""
         return self._available
 
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any] | None:
+        """Mark the flag as restored until the hub confirms it."""
+        if self._state.restored:
+            return {ATTR_RESTORED: True}
+        return None
+
 
 class ESPSomfyWindSensor(ESPSomfyEntity, BinarySensorEntity):
     """A sun flag sensor indicating whether there is sun."""
@@ -133,22 +147,30 @@ class ESPSomfyWindSensor(ESPSomfyEntity, BinarySensorEntity):
         self._shade_id = None
         self._group_id = None
         self._sensor_type = None
-        self._available = True
+        self._available = controller.connected is not False
         if "groupId" in data:
             self._group_id = data["groupId"]
-            self._attr_unique_id = f"wind_group_{controller.unique_id}_{self._group_id}"
             self._sensor_type = "group"
+            self._state = controller.store.group(int(self._group_id))
         else:
             self._shade_id = data["shadeId"]
-            self._attr_unique_id = f"wind_{controller.unique_id}_{self._shade_id}"
             self._sensor_type = "motor"
+            self._state = controller.store.shade(int(self._shade_id))
+        self._attr_unique_id = _flag_unique_id("wind", controller, data)
         self._attr_name = data["name"]
         self._attr_has_entity_name = False
-        if "flags" in data:
-            self._attr_is_on = bool((int(data["flags"]) & 0x10) == 0x10)
-        else:
-            self._attr_is_on = False
-
+        self._attr_is_on = self._state.windy
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to the flag changes for the shade or group."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._controller.async_add_flag_listener(
+                self._state.kind, self._state.id, ShadeFlag.WINDY, self._handle_flag
+            )
+        )
+
+    @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         if self.registry_entry.disabled:
@@ -160,26 +182,12 @@ class ESPSomfyWindSensor(ESPSomfyEntity, BinarySensorEntity):
             if self._available != bool(self._controller.data["connected"]):
                 self._available = bool(self._controller.data["connected"])
                 self.async_write_ha_state()
-        elif (
-            self._sensor_type == "motor"
-            and "shadeId" in self._controller.data
-            and self._controller.data["shadeId"] == self._shade_id
-            and self._controller.data["event"] == EVT_SHADESTATE
-            and "flags" in self._controller.data
-        ) or (
-            self._sensor_type == "group"
-            and "groupId" in self._controller.data
-            and self._controller.data["groupId"] == self._group_id
-            and self._controller.data["event"] == EVT_GROUPSTATE
-            and "flags" in self._controller.data
-        ):
-            if self._attr_is_on != bool(
-                (int(self._controller.data["flags"]) & 0x10) == 0x10
-            ):
-                self._attr_is_on = bool(
-                    (int(self._controller.data["flags"]) & 0x10) == 0x10
-                )
-                self.async_write_ha_state()
+
+    @callback
+    def _handle_flag(self, state: ShadeState, is_on: bool) -> None:
+        """Handle the flag being set or cleared on the shade or group."""
+        self._attr_is_on = is_on
+        self.async_write_ha_state()
 
     @property
     def icon(self) -> str:
@@ -192,3 +200,10 @@ class ESPSomfyWindSensor(ESPSomfyEntity, BinarySensorEntity):
     def available(self) -> bool:
         """Indicates whether the shade is available."""
         return self._available
+
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any] | None:
+        """Mark the flag as restored until the hub confirms it."""
+        if self._state.restored:
+            return {ATTR_RESTORED: True}
+        return None
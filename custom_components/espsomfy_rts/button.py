@@ -116,7 +116,7 @@ class ESPSomfyButton(ESPSomfyEntity, ButtonEntity):
         self._attr_unique_id = f"{cfg.key}_{controller.unique_id}"
         self._attr_entity_category = cfg.entity_category
         self._attr_icon = cfg.icon
-        self._available = True
+        self._available = controller.connected is not False
         self._action = cfg.action
         self._attr_assumed_state = True
         self._attr_supported_features = cfg.features
@@ -20,13 +20,23 @@ from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers import aiohttp_client
 from homeassistant.helpers.selector import (
+    SelectSelector,
+    SelectSelectorConfig,
     TextSelector,
     TextSelectorConfig,
     TextSelectorType,
 )
 from homeassistant.util.network import is_host_valid
 
-from .const import DOMAIN
+from .const import (
+    CONF_MAX_WRITE_RATE,
+    CONF_POSITION_DEADBAND,
+    CONF_RECORDED_ATTRIBUTES,
+    DEFAULT_MAX_WRITE_RATE,
+    DEFAULT_POSITION_DEADBAND,
+    DOMAIN,
+    VOLATILE_ATTRIBUTES,
+)
 from .controller import (
     DiscoveryError,
     ESPSomfyAPI,
@@ -34,6 +44,7 @@ from .controller import (
     InvalidHost,
     LoginError,
 )
+from .resolver import is_ip_address
 
 DATA_SCHEMA = vol.Schema(
     {
@@ -139,9 +150,18 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         # await self.async_set_unique_id(f"{self.server_id}")
         self.host = discovery_info.host
         await self.async_set_unique_id(f"espsomfy_{self.server_id}")
+        entry = self.hass.config_entries.async_entry_for_domain_unique_id(
+            DOMAIN, self.unique_id
+        )
+        if entry is not None and not is_ip_address(entry.data.get(CONF_HOST, "")):
+            # A hub configured by name keeps its name and only learns the address.
+            controller = self.hass.data.get(DOMAIN, {}).get(entry.entry_id)
+            if controller is not None:
+                controller.learn_address(discovery_info.host)
+            return self.async_abort(reason="already_configured")
 
         self._abort_if_unique_id_configured(
-            updates={CONF_HOST: discovery_info.host}, reload_on_update=True
+            updates={CONF_HOST: discovery_info.host}, reload_on_update=False
         )
         self.context.update(
             {
@@ -201,7 +221,15 @@ class ESPSomfyOptionsFlowHandler(config_entries.OptionsFlow):
     async def async_step_init(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
-        """Configure options for espsomfy_rts."""
+        """Choose between the connection and the tuning options."""
+        return self.async_show_menu(
+            step_id="init", menu_options=["connection", "tuning"]
+        )
+
+    async def async_step_connection(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Configure the address and login for the hub."""
         errors = {}
         if user_input is not None:
             try:
@@ -222,7 +250,7 @@ class ESPSomfyOptionsFlowHandler(config_entries.OptionsFlow):
                 )
                 return self.async_create_entry(
                     title=api.deviceName,
-                    data=user_input,
+                    data=dict(self._config_entry.options),
                 )
             except InvalidHost:
                 errors[CONF_HOST] = "wrong_host"
@@ -234,13 +262,29 @@ class ESPSomfyOptionsFlowHandler(config_entries.OptionsFlow):
                 errors[ex.args[0]] = ex.args[1]
 
         return self.async_show_form(
-            step_id="init",
+            step_id="connection",
             data_schema=_get_data_schema(
                 self.hass, data=self._config_entry.data, host=self._host
             ),
             errors=errors,
         )
 
+    async def async_step_tuning(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Configure how the entities write and record their state.
+
+        Only the options are saved so the hub does not have to be reached.
+        """
+        if user_input is not None:
+            return self.async_create_entry(
+                title="", data={**self._config_entry.options, **user_input}
+            )
+        return self.async_show_form(
+            step_id="tuning",
+            data_schema=vol.Schema(_get_options_schema(self._config_entry.options)),
+        )
+
 
 def _get_data_schema(
     hass: HomeAssistant,
@@ -275,3 +319,23 @@ def _get_data_schema(
             ): str,
         }
     )
+
+
+def _get_options_schema(options: dict[str, Any]) -> dict[Any, Any]:
+    """Get the fields that tune how the entities write and record their state."""
+    return {
+        vol.Optional(
+            CONF_MAX_WRITE_RATE,
+            default=options.get(CONF_MAX_WRITE_RATE, DEFAULT_MAX_WRITE_RATE),
+        ): vol.All(vol.Coerce(float), vol.Range(min=0, max=20)),
+        vol.Optional(
+            CONF_POSITION_DEADBAND,
+            default=options.get(CONF_POSITION_DEADBAND, DEFAULT_POSITION_DEADBAND),
+        ): vol.All(vol.Coerce(int), vol.Range(min=0, max=25)),
+        vol.Optional(
+            CONF_RECORDED_ATTRIBUTES,
+            default=options.get(CONF_RECORDED_ATTRIBUTES, []),
+        ): SelectSelector(
+            SelectSelectorConfig(options=list(VOLATILE_ATTRIBUTES), multiple=True)
+        ),
+    }
@@ -0,0 +1,231 @@
+"""Integration wide connection manager for the ESPSomfy RTS hub sockets."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Iterable
+import json
+import logging
+import random
+import time
+from typing import Any
+
+import aiohttp
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_CONNECTIONS = f"{DOMAIN}_connections"
+
+HEARTBEAT = 20
+CONNECT_TIMEOUT = 15
+RECONNECT_MIN = 1.0
+RECONNECT_MAX = 30.0
+# Seconds a hub socket gets to close before it is left behind.
+CLOSE_TIMEOUT = 5.0
+
+
+def reconnect_delay(failures: int) -> float:
+    """Get the seconds to wait before the next attempt after a number of failures."""
+    delay = min(RECONNECT_MIN * 2 ** max(failures - 1, 0), RECONNECT_MAX)
+    # Spread the hubs out so they do not all reconnect at the same moment.
+    return delay * random.uniform(0.8, 1.2)
+
+
+class HubConnection:
+    """The socket for a single hub along with its health counters."""
+
+    def __init__(
+        self,
+        hub_id: str,
+        url: Callable[[], Awaitable[str]],
+        events: Iterable[str],
+        onpacket: Callable[[dict[str, Any]], None],
+        onopen: Callable[[], None],
+        onclose: Callable[[], None],
+        onerror: Callable[[Exception], None],
+    ) -> None:
+        """Initialize the connection for a hub."""
+        self.hub_id = hub_id
+        self.url = url
+        self.events = frozenset(events)
+        self.onpacket = onpacket
+        self.onopen = onopen
+        self.onclose = onclose
+        self.onerror = onerror
+        self.task: asyncio.Task | None = None
+        self.ws: aiohttp.ClientWebSocketResponse | None = None
+        self.connected = False
+        self.connects = 0
+        self.errors = 0
+        self.unexpected = 0
+        self.failures = 0
+        self.frames = 0
+        self.last_connected: float | None = None
+
+    def stats(self) -> dict[str, Any]:
+        """Get the health counters for the hub."""
+        return {
+            "connected": self.connected,
+            "connects": self.connects,
+            "errors": self.errors,
+            "unexpected": self.unexpected,
+            "failures": self.failures,
+            "frames": self.frames,
+            "last_connected": self.last_connected,
+        }
+
+    def handle_message(self, message: str) -> None:
+        """Decode a socket message and hand the frames that are wanted on."""
+        if message.startswith("42["):
+            ndx = message.find(",")
+            event = message[3:ndx]
+            if self.events and event not in self.events:
+                return
+            try:
+                data = json.loads(message[ndx + 1 : -1])
+            except ValueError:
+                data = None
+            if not isinstance(data, dict):
+                _LOGGER.debug(
+                    "Ignoring a malformed %s frame from %s", event, self.hub_id
+                )
+                return
+            data["event"] = event
+            self.frames += 1
+            self.onpacket(data)
+        elif message.lower() == "connected":
+            self.failures = 0
+
+
+class ConnectionManager:
+    """Serves the sockets for every hub from tasks on the event loop.
+
+    No threads are used so the number of hubs does not change the number of
+    threads the integration holds.  Every hub follows the same reconnect
+    backoff.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the manager."""
+        self._hass = hass
+        self._session = async_get_clientsession(hass, verify_ssl=False)
+        self._connections: dict[str, HubConnection] = {}
+        # Seconds the last teardown of each hub took.
+        self.teardowns: dict[str, float] = {}
+
+    @callback
+    def async_connect(self, connection: HubConnection) -> None:
+        """Start serving the socket for a hub."""
+        if self._connections.get(connection.hub_id) is not None:
+            raise ValueError(f"Hub {connection.hub_id} is already connected")
+        self._connections[connection.hub_id] = connection
+        connection.task = self._hass.async_create_background_task(
+            self._async_run(connection), f"{DOMAIN}_socket_{connection.hub_id}"
+        )
+
+    async def async_disconnect(
+        self, hub_id: str, timeout: float = CLOSE_TIMEOUT
+    ) -> None:
+        """Stop serving the socket for a hub within a bounded time.
+
+        Cancelling the task also cancels a pending reconnect.  A socket that
+        does not close in time is left to finish in the background so the
+        caller is never held up by a stuck hub.
+        """
+        if (connection := self._connections.pop(hub_id, None)) is None:
+            return
+        start = time.monotonic()
+        task = connection.task
+        if task is not None and not task.done():
+            task.cancel()
+            done, _pending = await asyncio.wait({task}, timeout=timeout)
+            if not done:
+                _LOGGER.warning(
+                    "Socket for %s did not close within %s seconds", hub_id, timeout
+                )
+        self.teardowns[hub_id] = round(time.monotonic() - start, 3)
+        _LOGGER.debug("Closed the socket for %s in %ss", hub_id, self.teardowns[hub_id])
+
+    async def async_shutdown(self, timeout: float = CLOSE_TIMEOUT) -> None:
+        """Close the sockets for every hub at the same time."""
+        await asyncio.gather(
+            *(
+                self.async_disconnect(hub_id, timeout)
+                for hub_id in list(self._connections)
+            )
+        )
+
+    def stats(self, hub_id: str) -> dict[str, Any]:
+        """Get the health counters for a hub."""
+        stats: dict[str, Any] = {"last_teardown": self.teardowns.get(hub_id)}
+        if (connection := self._connections.get(hub_id)) is not None:
+            stats.update(connection.stats())
+        return stats
+
+    async def _async_run(self, connection: HubConnection) -> None:
+        """Keep the socket for a hub open until it is disconnected."""
+        while True:
+            try:
+                await self._async_listen(connection)
+            except (aiohttp.ClientError, TimeoutError, OSError) as err:
+                connection.errors += 1
+                _LOGGER.debug("Socket for %s failed: %s", connection.hub_id, err)
+                connection.onerror(err)
+            except Exception:
+                # A failing handler must not end the reconnects for the hub.
+                connection.errors += 1
+                connection.unexpected += 1
+                _LOGGER.exception(
+                    "Unexpected error on the socket for %s", connection.hub_id
+                )
+            connection.failures += 1
+            await asyncio.sleep(reconnect_delay(connection.failures))
+
+    async def _async_listen(self, connection: HubConnection) -> None:
+        """Open the socket and hand on the messages until it closes."""
+        url = await connection.url()
+        async with asyncio.timeout(CONNECT_TIMEOUT):
+            ws = await self._session.ws_connect(url, heartbeat=HEARTBEAT)
+        async with ws:
+            connection.ws = ws
+            connection.connected = True
+            connection.connects += 1
+            connection.failures = 0
+            connection.last_connected = time.time()
+            cancelled = False
+            try:
+                connection.onopen()
+                async for msg in ws:
+                    if msg.type is aiohttp.WSMsgType.TEXT:
+                        connection.handle_message(msg.data)
+                    elif msg.type is aiohttp.WSMsgType.ERROR:
+                        break
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            finally:
+                connection.ws = None
+                connection.connected = False
+                if not cancelled:
+                    # The hub is told about the close even when a handler
+                    # failed so it falls back to polling.
+                    connection.onclose()
+
+
+@callback
+def async_get_connection_manager(hass: HomeAssistant) -> ConnectionManager:
+    """Get the connection manager shared by every hub."""
+    if (manager := hass.data.get(DATA_CONNECTIONS)) is None:
+        manager = hass.data[DATA_CONNECTIONS] = ConnectionManager(hass)
+
+        async def _async_shutdown(_: Event) -> None:
+            await manager.async_shutdown()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_shutdown)
+    return manager
@@ -6,6 +6,7 @@ VERSION = "v2.4.7"
 DOMAIN = "espsomfy_rts"
 MANUFACTURER = "rstrouse"
 API_CONTROLLER = "/controller"
+API_SHADE = "/shade"
 API_SHADES = "/shades"
 API_GROUPS = "/groups"
 API_SHADECOMMAND = "/shadeCommand"
@@ -31,6 +32,30 @@ EVT_WIFISTRENGTH = "wifiStrength"
 EVT_ETHERNET = "ethernet"
 EVT_MEMSTATUS = "memStatus"
 
+CONF_MAX_WRITE_RATE = "max_write_rate"
+CONF_POSITION_DEADBAND = "position_deadband"
+DEFAULT_MAX_WRITE_RATE = 2.0
+DEFAULT_POSITION_DEADBAND = 2
+CONF_RECORDED_ATTRIBUTES = "recorded_attributes"
+# Shade attributes that change with nearly every command or move.  These are
+# left out of the recorder unless they are picked in the options.
+VOLATILE_ATTRIBUTES = (
+    "cmd_fired",
+    "target",
+    "tilt_target",
+    "last_cmd",
+    "cmd_source",
+    "cmd_address",
+    "estimated_arrival",
+)
+
+STORAGE_VERSION = 1
+
+# Sent with the entry id and the controller when a hub is set up, the
+# controller is None when the hub is unloaded.
+SIGNAL_HUB_UPDATED = f"{DOMAIN}_hub_updated"
+
+ATTR_RESTORED = "restored"
 ATTR_RESTOREFILE = "Restore File"
 ATTR_AVAILABLE_MODES = "???"
 
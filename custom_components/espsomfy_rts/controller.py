@@ -3,22 +3,19 @@
 from __future__ import annotations
 
 import asyncio
+from collections.abc import Callable, Mapping
 from datetime import datetime
-import json
 import logging
 import os
-import threading
-from threading import Timer
-from typing import Any
+import time
+from typing import TYPE_CHECKING, Any
 
 import aiofiles
 import aiohttp
 from packaging.version import parse as version_parse
-import websocket
 
-from homeassistant.components.cover import CoverDeviceClass, CoverEntityFeature
-from homeassistant.const import CONF_HOST, CONF_PIN, CONF_USERNAME, Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.const import CONF_HOST, CONF_PIN, CONF_USERNAME
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import (
     aiohttp_client,
@@ -26,9 +23,13 @@ from homeassistant.helpers import (
     entity_registry as er,
 )
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.util import dt as dt_util
 
+from .connection import HubConnection, async_get_connection_manager
 from .const import (
     API_DISCOVERY,
     API_GROUPCOMMAND,
@@ -36,9 +37,14 @@ from .const import (
     API_LOGIN,
     API_SETPOSITIONS,
     API_SETSENSOR,
+    API_SHADE,
     API_SHADECOMMAND,
     API_SHADES,
     API_TILTCOMMAND,
+    CONF_MAX_WRITE_RATE,
+    CONF_POSITION_DEADBAND,
+    DEFAULT_MAX_WRITE_RATE,
+    DEFAULT_POSITION_DEADBAND,
     DOMAIN,
     EVT_CONNECTED,
     EVT_ETHERNET,
@@ -52,155 +58,109 @@ from .const import (
     EVT_UPDPROGRESS,
     EVT_WIFISTRENGTH,
     PLATFORMS,
+    STORAGE_VERSION,
+)
+from .fetch import FetchResult, RequestCoalescer
+from .model import (
+    SHADE_CONFIG_KEYS,
+    GroupModel,
+    ShadeModel,
+    compile_group,
+    compile_groups,
+    compile_shade,
+    compile_shades,
+)
+from .motion import MotionModel
+from .poller import ShadePoller
+from .query import ShadeIndex
+from .resolver import HostResolver
+from .staleness import StaleShadeDetector
+from .store import (
+    FIELD_MODEL,
+    FIELD_RESTORED,
+    KIND_GROUP,
+    KIND_SHADE,
+    SAVED_ATTRS,
+    ESPSomfyStateStore,
+    ShadeFlag,
+    ShadeState,
 )
 
+if TYPE_CHECKING:
+    from .entity import ESPSomfyEntity
+
 _LOGGER = logging.getLogger(__name__)
-logging.getLogger("websocket").setLevel(logging.CRITICAL)
 
+# Maps the unique id of each entity a platform creates for a shade or group
+# to a callable that creates it.
+RowEntityFactory = Callable[[str, int], dict[str, Callable[[], "ESPSomfyEntity"]]]
 
-class SocketListener(threading.Thread):
-    """A listener of sockets."""
+# Seconds to wait before the discovery payload is written to disk.
+DISCOVERY_SAVE_DELAY = 10
+# Seconds to gather the state changes on a hub into a single write to disk.
+STATE_SAVE_DELAY = 30
 
-    def __init__(
-        self, hass: HomeAssistant, url: str, onpacket, onopen, onclose, onerror
-    ) -> None:
-        """Initialize a new socket listener."""
-        super().__init__()
-        self.url = url
-        self.onpacket = onpacket
-        self.onopen = onopen
-        self.onclose = onclose
-        self.onerror = onerror
-        self.connected = False
-        self.main_loop = None
-        self.ws_app = None
-        self.hass = hass
-        self._should_stop = False
-        self.filter = None
-        self.running_future = None
-        self.reconnects = 0
-        self._connect_timer = None
-
-    def __enter__(self):
-        """Start the thread."""
-        self.start()
-
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        """Stop and join the thread."""
-        self.stop()
-
-    def stop(self):
-        """Cancel event stream and join the thread."""
-        _LOGGER.debug("Stopping event thread")
-        self._should_stop = True
-        if self.ws_app:  # and self.connected:
-            self.ws_app.close()
-
-        _LOGGER.debug("Joining event thread")
-        if self.is_alive():
-            self.join()
-        _LOGGER.debug("Event thread joined")
-
-    async def connect(self):
-        """Start up the web socket."""
-        self.main_loop = asyncio.get_event_loop()
-        self.ws_app = websocket.WebSocketApp(
-            self.url,
-            on_message=self.ws_onmessage,
-            on_error=self.ws_onerror,
-            on_close=self.ws_onclose,
-            on_open=self.ws_onopen,
-            keep_running=True,
-        )
-        self.main_loop.run_in_executor(None, self.ws_begin)
-
-    def reconnect(self):
-        """Reconnect to the web socket."""
-        if self._connect_timer is not None:
-            self._connect_timer.cancel()
-        self.reconnects = self.reconnects + 1
-        self.main_loop = asyncio.get_event_loop()
-        try:
-            self.ws_app = websocket.WebSocketApp(
-                self.url,
-                on_message=self.ws_onmessage,
-                on_error=self.ws_onerror,
-                on_close=self.ws_onclose,
-                on_open=self.ws_onopen,
-                keep_running=True,
-            )
-            self.main_loop.run_in_executor(None, self.ws_begin)
-            self._connect_timer = None
-            self.connected = True
+# Socket events handed on to the controller, the rest are dropped undecoded.
+SOCKET_EVENTS = (
+    EVT_CONNECTED,
+    EVT_SHADEADDED,
+    EVT_SHADEREMOVED,
+    EVT_SHADESTATE,
+    EVT_SHADECOMMAND,
+    EVT_GROUPSTATE,
+    EVT_FWSTATUS,
+    EVT_UPDPROGRESS,
+    EVT_WIFISTRENGTH,
+    EVT_ETHERNET,
+    EVT_MEMSTATUS,
+)
 
-        except websocket.WebSocketAddressException:
-            self._connect_timer = Timer(
-                min(10 * self.reconnects / 2, 20), self.reconnect
-            )
-            self._connect_timer.start()
-        except websocket.WebSocketTimeoutException:
-            self._connect_timer = Timer(
-                min(10 * self.reconnects / 2, 20), self.reconnect
-            )
-            self._connect_timer.start()
-        except websocket.WebSocketConnectionClosedException:
-            self._connect_timer = Timer(
-                min(10 * self.reconnects / 2, 20), self.reconnect
-            )
-            self._connect_timer.start()
+# Shade fields that feed the motion model.
+_MOTION_FIELDS = frozenset({"position", "direction", "target"})
 
-    def set_filter(self, arr: Any) -> None:
-        """Filter for the events."""
-        self.filter = arr.copy()
 
-    def close(self) -> None:
-        """Synonym for stop."""
-        self.stop()
+def cache_stores(
+    hass: HomeAssistant, config_entry_id: str
+) -> tuple[Store[dict[str, Any]], Store[dict[str, list[list[Any]]]]]:
+    """Get the stores for the discovery payload and the state of a hub."""
+    return (
+        Store(hass, STORAGE_VERSION, f"{DOMAIN}.{config_entry_id}.discovery"),
+        Store(hass, STORAGE_VERSION, f"{DOMAIN}.{config_entry_id}.state"),
+    )
 
-    def ws_begin(self) -> None:
-        """Begin the socket."""
-        self.running_future = self.ws_app.run_forever(ping_interval=20, ping_timeout=15)
-        # print("Fell out of run_runforever")
-        if not self._should_stop:
-            self.hass.loop.call_soon_threadsafe(self.reconnect)
 
-    def ws_onerror(self, wsapp, exception):
-        """Socket error."""
-        # print(f"We have an error {exception}")
-        self.hass.loop.call_soon_threadsafe(self.onerror, exception)
+class StartupTimer:
+    """Records when each phase of the startup for a hub completed.
+
+    The phases overlap so each one is reported as the seconds from the start
+    of the setup to the moment it completed.
+    """
+
+    def __init__(self) -> None:
+        """Start the timer."""
+        self._start = time.monotonic()
+        self.phases: dict[str, float] = {}
+
+    def mark(self, phase: str) -> None:
+        """Record the first completion of a phase."""
+        self.phases.setdefault(phase, round(time.monotonic() - self._start, 3))
 
-    def ws_onclose(self, wsapp, status, msg):
-        """Socket closed."""
-        # print(f"The socket was closed {status}")
-        self.connected = False
-        if not self._should_stop:
-            self.hass.loop.call_soon_threadsafe(self.onclose)
-
-    def ws_onopen(self, wsapp):
-        """Open the socket."""
-        self.connected = True
-        self.hass.loop.call_soon_threadsafe(self.onopen)
-
-    def ws_onmessage(self, wsapp, message: str):
-        """Process the incoming message."""
-        try:
-            if message is None:
-                _LOGGER.debug("Got an empty socket payload")
-            elif message.startswith("42["):
-                ndx = message.find(",")
-                event = message[3:ndx]
-                if not self.filter or event in self.filter:
-                    payload = message[ndx + 1 : -1]
-                    # print(f"Event:{event} Payload:{payload}")
-                    data = json.loads(payload)
-                    data["event"] = event
-                    self.hass.loop.call_soon_threadsafe(self.onpacket, data)
-            elif message.lower() == "connected":
-                self.reconnects = 0
-                self.connected = True
-        except Exception as e:
-            _LOGGER.debug(e.message)
-            raise
+
+def _add_listener(
+    listeners: dict[Any, list[Callable]], key: Any, listener: Callable
+) -> CALLBACK_TYPE:
+    """Add a keyed listener and return the callback that removes it."""
+    listeners.setdefault(key, []).append(listener)
+
+    @callback
+    def remove_listener() -> None:
+        keyed = listeners.get(key)
+        if keyed and listener in keyed:
+            keyed.remove(listener)
+            if not keyed:
+                del listeners[key]
+
+    return remove_listener
 
 
 class ESPSomfyController(DataUpdateCoordinator):
@@ -218,7 +178,54 @@ class ESPSomfyController(DataUpdateCoordinator):
         )
         self.config_entry_id = config_entry_id
         self.api = api
-        self.ws_listener = None
+        self.store = api.store
+        # Whether the hub can be reached over the socket or by polling.
+        self.connected: bool | None = None
+        self.socket_connected = False
+        self.poller = ShadePoller(self)
+        self.stale_detector = StaleShadeDetector(self)
+        self._closed = False
+        self.frames_received = 0
+        self.frames_unchanged = 0
+        self.state_writes = 0
+        self.writes_suppressed = 0
+        self.motion: dict[int, MotionModel] = {}
+        # Clock for the motion models and the write limits of the entities.
+        self.clock: Callable[[], float] = time.time
+        # Listeners keyed by row, the None key listens to every row on the hub.
+        self._state_listeners: dict[
+            tuple[str, int] | None, list[Callable[[ShadeState, set[str]], None]]
+        ] = {}
+        self._flag_listeners: dict[
+            tuple[str, int, ShadeFlag], list[Callable[[ShadeState, bool], None]]
+        ] = {}
+        self._shade_index: ShadeIndex | None = None
+        # The platforms that create entities for each row and the entities
+        # they created keyed by row and unique id.
+        self._row_platforms: list[tuple[RowEntityFactory, AddEntitiesCallback]] = []
+        self._row_entities: dict[tuple[str, int], dict[str, ESPSomfyEntity]] = {}
+        # Registry index for the entities on this config entry.
+        self._unique_ids: dict[str, str] | None = None
+        self._entity_ids: dict[str, str] = {}
+        self.entity_index_version = 0
+        # The options the entities were set up with, a change needs a reload.
+        self.applied_options = dict(self.options)
+
+    @property
+    def options(self) -> Mapping[str, Any]:
+        """Get the options for the config entry."""
+        entry = self.hass.config_entries.async_get_entry(self.config_entry_id)
+        return entry.options if entry is not None else {}
+
+    @property
+    def max_write_rate(self) -> float:
+        """Get the writes per second allowed for a moving shade."""
+        return float(self.options.get(CONF_MAX_WRITE_RATE, DEFAULT_MAX_WRITE_RATE))
+
+    @property
+    def position_deadband(self) -> int:
+        """Get the position change needed before a moving shade writes."""
+        return int(self.options.get(CONF_POSITION_DEADBAND, DEFAULT_POSITION_DEADBAND))
 
     @property
     def device_name(self) -> str:
@@ -267,37 +274,29 @@ class ESPSomfyController(DataUpdateCoordinator):
 
     async def ws_close(self) -> None:
         """Close the tasks and sockets."""
-        if self.ws_listener is not None:
-            self.ws_listener.close()
+        self._closed = True
+        self.poller.async_stop()
+        self.stale_detector.async_stop()
+        await async_get_connection_manager(self.hass).async_disconnect(
+            self.config_entry_id
+        )
 
     async def ws_connect(self):
         """Connect to WebSocket."""
-        if self.ws_listener is not None:
-            self.ws_listener.close()
-        self.ws_listener = SocketListener(
-            self.hass,
-            self.api.get_sock_url(),
+        manager = async_get_connection_manager(self.hass)
+        await manager.async_disconnect(self.config_entry_id)
+        self._closed = False
+        await self.api.async_resolve_host()
+        connection = HubConnection(
+            self.config_entry_id,
+            self._async_sock_url,
+            SOCKET_EVENTS,
             self.ws_onpacket,
             self.ws_onopen,
             self.ws_onclose,
             self.ws_onerror,
         )
-        self.ws_listener.set_filter(
-            [
-                EVT_CONNECTED,
-                EVT_SHADEADDED,
-                EVT_SHADEREMOVED,
-                EVT_SHADESTATE,
-                EVT_SHADECOMMAND,
-                EVT_GROUPSTATE,
-                EVT_FWSTATUS,
-                EVT_UPDPROGRESS,
-                EVT_WIFISTRENGTH,
-                EVT_ETHERNET,
-                EVT_MEMSTATUS,
-            ]
-        )
-        await self.ws_listener.connect()
+        manager.async_connect(connection)
 
     async def create_backup(self) -> bool:
         """Create a backup of the configuration and stores it in HA."""
@@ -308,141 +307,385 @@ class ESPSomfyController(DataUpdateCoordinator):
         return await self.api.update_firmware(version)
 
     async def set_host(self, host) -> None:
-        """Set a host name and reloads the sockets if the host has changed."""
-        if self.api.get_host() != host:
-            # Tear down the socket
-            self.api.set_host(host)
-            self.ws_connect()
-
-    def ensure_group_configured(self, data):
-        """Ensure the group exists on Home Assistant."""
-        uuid = f"{self.unique_id}_group{data['groupId']}"
-        devices = dr.async_get(self.hass)
-        device = devices.async_get_device({(DOMAIN, self.unique_id)})
-        entities = er.async_get(self.hass)
-        for entity in er.async_entries_for_config_entry(entities, self.config_entry_id):
-            if entity.unique_id == uuid:
+        """Move the socket and api to a new host and resync the state.
+
+        The entities stay registered and only see the state that changed
+        while the hub was moving.
+        """
+        if self.api.get_host() == host:
+            return
+        _LOGGER.debug("ESPSomfy RTS moving from %s to %s", self.api.get_host(), host)
+        self.api.set_host(host)
+        device = dr.async_get(self.hass).async_get_device({(DOMAIN, self.unique_id)})
+        if device is not None:
+            dr.async_get(self.hass).async_update_device(
+                device.id, configuration_url=self.api.get_config_url()
+            )
+        await self.ws_connect()
+        await self.async_refresh_discovery()
+
+    @property
+    def shade_index(self) -> ShadeIndex:
+        """Get the query indexes for the shades, building them on first use."""
+        if (
+            self._shade_index is None
+            or self._shade_index.models is not self.api.shade_models
+        ):
+            # A reload of the shades replaces the models wholesale.
+            self._shade_index = ShadeIndex(self.api.shade_models, self.store)
+        return self._shade_index
+
+    @callback
+    def entity_id_for(self, unique_id: str) -> str | None:
+        """Get the entity id registered for a unique id on this config entry."""
+        self._build_entity_index()
+        return self._entity_ids.get(unique_id)
+
+    @callback
+    def registry_version(self) -> int:
+        """Get the version of the registry index once it has been built."""
+        self._build_entity_index()
+        return self.entity_index_version
+
+    def _build_entity_index(self) -> None:
+        """Build the registry index on first use."""
+        if self._unique_ids is not None:
+            return
+        registry = er.async_get(self.hass)
+        self._unique_ids = {}
+        self._entity_ids = {}
+        for entry in er.async_entries_for_config_entry(registry, self.config_entry_id):
+            self._index_entity(entry.unique_id, entry.entity_id)
+
+    def _index_entity(self, unique_id: str, entity_id: str) -> None:
+        """Add an entity to the registry index."""
+        self._unique_ids[entity_id] = unique_id
+        self._entity_ids[unique_id] = entity_id
+        self.entity_index_version += 1
+
+    def _unindex_entity(self, entity_id: str) -> None:
+        """Remove an entity from the registry index."""
+        if (unique_id := self._unique_ids.pop(entity_id, None)) is not None:
+            self._entity_ids.pop(unique_id, None)
+            self.entity_index_version += 1
+
+    @callback
+    def async_track_entity_registry(self) -> CALLBACK_TYPE:
+        """Keep the registry index current as entities are added, removed or renamed."""
+
+        @callback
+        def _async_registry_updated(event: Event) -> None:
+            if self._unique_ids is None:
+                # The index is built from the registry on first use.
                 return
-        dev_features = (
-            CoverEntityFeature.OPEN | CoverEntityFeature.CLOSE | CoverEntityFeature.STOP
-        )
+            action = event.data["action"]
+            entity_id = event.data["entity_id"]
+            if action == "remove":
+                self._unindex_entity(entity_id)
+                return
+            if action == "update" and "old_entity_id" in event.data:
+                self._unindex_entity(event.data["old_entity_id"])
+            entry = er.async_get(self.hass).async_get(entity_id)
+            if entry is None or entry.config_entry_id != self.config_entry_id:
+                return
+            if self._entity_ids.get(entry.unique_id) != entity_id:
+                self._unindex_entity(entity_id)
+                self._index_entity(entry.unique_id, entity_id)
 
-        dev_class = CoverDeviceClass.SHADE
-        # Reload all the shades
-        # self.api.load_shades()
-        # I have no idea whether this reloads the devices or not.
-        entities.async_get_or_create(
-            domain=DOMAIN,
-            platform=Platform.COVER,
-            original_device_class=dev_class,
-            unique_id=uuid,
-            device_id=device.id,
-            original_name=data["name"],
-            suggested_object_id=f"{str(data['name']).lower().replace(' ', '_')}",
-            supported_features=dev_features,
+        return self.hass.bus.async_listen(
+            er.EVENT_ENTITY_REGISTRY_UPDATED, _async_registry_updated
         )
 
-    def ensure_shade_configured(self, data):
-        """Ensure the shade exists on Home Assistant."""
-        uuid = f"{self.unique_id}_{data['shadeId']}"
+    @callback
+    def async_add_row_platform(
+        self,
+        factory: RowEntityFactory,
+        async_add_entities: AddEntitiesCallback,
+    ) -> None:
+        """Add the entities a platform creates for each shade and group.
+
+        The factory maps the unique id of each entity a row needs to a
+        callable that creates it, so the entities are only created once.
+        The platform is kept so entities can be added and removed as the
+        shades and groups on the hub change without reloading the entry.
+        """
+        self._row_platforms.append((factory, async_add_entities))
+        new_entities: list[ESPSomfyEntity] = []
+        for key in self._row_keys():
+            entities = self._row_entities.setdefault(key, {})
+            for unique_id, create in factory(*key).items():
+                entities[unique_id] = entity = create()
+                new_entities.append(entity)
+        if new_entities:
+            async_add_entities(new_entities)
+
+    def _row_keys(self) -> list[tuple[str, int]]:
+        """Get the keys for the shades and groups configured on the hub."""
+        return [
+            *((KIND_SHADE, shade_id) for shade_id in self.api.shade_models),
+            *((KIND_GROUP, group_id) for group_id in self.api.group_models),
+        ]
 
-        devices = dr.async_get(self.hass)
-        device = devices.async_get_device({(DOMAIN, self.unique_id)})
+    @callback
+    def async_sync_row(self, kind: str, row_id: int) -> None:
+        """Create and remove the entities for a shade or group to match its model.
+
+        The entities that are kept take the name of the shade or group.
+        """
+        key = (kind, row_id)
+        entities = self._row_entities.setdefault(key, {})
+        kept = set(entities)
+        wanted: set[str] = set()
+        for factory, async_add_entities in self._row_platforms:
+            new_entities = []
+            for unique_id, create in factory(kind, row_id).items():
+                wanted.add(unique_id)
+                if unique_id not in entities:
+                    entities[unique_id] = entity = create()
+                    new_entities.append(entity)
+            if new_entities:
+                _LOGGER.debug("Adding %d entities for %s %s", len(new_entities), *key)
+                async_add_entities(new_entities)
+        for unique_id in set(entities) - wanted:
+            self._async_remove_entity(entities.pop(unique_id))
+        if not entities:
+            del self._row_entities[key]
+            self._async_forget_row(kind, row_id)
+            return
+        models = self.api.shade_models if kind == KIND_SHADE else self.api.group_models
+        if (model := models.get(row_id)) is not None:
+            for unique_id in kept & wanted:
+                entities[unique_id].async_rename(model.name)
+
+    @callback
+    def async_sync_rows(self, changed: set[tuple[str, int]] = frozenset()) -> None:
+        """Sync the entities for the rows that were added, removed or changed."""
+        current = set(self._row_keys())
+        for key in (current ^ set(self._row_entities)) | (changed & current):
+            self.async_sync_row(*key)
+
+    def _async_remove_entity(self, entity: Entity) -> None:
+        """Remove an entity along with its registry entry."""
+        registry = er.async_get(self.hass)
+        if entity.entity_id and registry.async_get(entity.entity_id) is not None:
+            # The entity removes itself when its registry entry goes away.
+            registry.async_remove(entity.entity_id)
+        elif entity.hass is not None:
+            self.hass.async_create_task(entity.async_remove(force_remove=True))
+
+    def _async_forget_row(self, kind: str, row_id: int) -> None:
+        """Drop the runtime state for a shade or group that is gone from the hub."""
+        self.store.remove(kind, row_id)
+        if kind == KIND_SHADE:
+            self.motion.pop(row_id, None)
+            if self._shade_index is not None:
+                self._shade_index.remove(row_id)
 
-        entities = er.async_get(self.hass)
+    def ws_onpacket(self, data):
+        """Packet from the websocket."""
+        # Catch the fwStatus messages before they go anywhere
+        # this will allow us to simply update the latest firmware
+        evt = data.get("event")
+        self.frames_received += 1
+        if evt == EVT_FWSTATUS:
+            self.api.set_firmware(data)
+        elif evt == EVT_CONNECTED and "connected" in data:
+            self.set_connected(bool(data["connected"]))
+            return
+        elif evt in (EVT_SHADEADDED, EVT_SHADEREMOVED):
+            # The shades and groups on the hub changed so pick up the new
+            # configuration and only touch the entities that differ.
+            self.hass.async_create_task(
+                self.async_refresh_discovery(), f"{DOMAIN}_refresh_discovery"
+            )
 
-        for entity in er.async_entries_for_config_entry(entities, self.config_entry_id):
-            if entity.unique_id == uuid:
-                return
-        dev_features = (
-            CoverEntityFeature.OPEN
-            | CoverEntityFeature.CLOSE
-            | CoverEntityFeature.STOP
-            | CoverEntityFeature.SET_POSITION
+        # Decode the shade and group state once and only hand the fields that
+        # changed to the entities that are listening to that row.
+        row, changed = self.store.apply_frame(data)
+        if row is None:
+            self.async_set_updated_data(data=data)
+            return
+        if (evt == EVT_SHADESTATE and self.api.update_shade_config(data)) or (
+            evt == EVT_GROUPSTATE and self.api.update_group_config(data)
+        ):
+            changed.add(FIELD_MODEL)
+            self.store.touch(row)
+        if not changed:
+            self.frames_unchanged += 1
+            return
+        self._dispatch_row(row, changed)
+        if FIELD_MODEL in changed:
+            self.async_sync_row(row.kind, row.id)
+
+    async def async_refresh_discovery(self) -> None:
+        """Load the discovery payload from the hub and hand out only what changed."""
+        if (changes := await self.api.get_initial()) is None:
+            return
+        for row, changed in changes:
+            self._dispatch_row(row, changed)
+        self.async_sync_rows(
+            {(row.kind, row.id) for row, changed in changes if FIELD_MODEL in changed}
         )
 
-        dev_class = CoverDeviceClass.SHADE
-        if "shadeType" in data:
-            match int(data["shadeType"]):
-                case 1:
-                    dev_class = CoverDeviceClass.BLIND
-                    if "tiltType" in data:
-                        match int(data["tiltType"]):
-                            case 1 | 2:
-                                dev_features |= (
-                                    CoverEntityFeature.OPEN_TILT
-                                    | CoverEntityFeature.CLOSE_TILT
-                                    | CoverEntityFeature.SET_TILT_POSITION
-                                )
-                    elif "hasTilt" in data and data["hasTilt"] is True:
-                        dev_features |= (
-                            CoverEntityFeature.OPEN_TILT
-                            | CoverEntityFeature.CLOSE_TILT
-                            | CoverEntityFeature.SET_TILT_POSITION
-                        )
-                case 2 | 7 | 8:
-                    dev_class = CoverDeviceClass.CURTAIN
-                case 3:
-                    dev_class = CoverDeviceClass.AWNING
-                case _:
-                    dev_class = CoverDeviceClass.SHADE
-
-        # Reload all the shades
-        # self.api.load_shades()
-        # I have no idea whether this reloads the devices or not.
-        entities.async_get_or_create(
-            domain=DOMAIN,
-            platform=Platform.COVER,
-            original_device_class=dev_class,
-            unique_id=uuid,
-            device_id=device.id,
-            original_name=data["name"],
-            suggested_object_id=f"{str(data['name']).lower().replace(' ', '_')}",
-            supported_features=dev_features,
+    def _dispatch_row(self, row: ShadeState, changed: set[str]) -> None:
+        """Hand the fields that changed on a row to its listeners."""
+        if not changed.isdisjoint(SAVED_ATTRS):
+            self.api.async_schedule_state_save()
+        if row.kind == KIND_SHADE:
+            if not changed.isdisjoint(_MOTION_FIELDS):
+                self.motion_model(row.id).observe(
+                    row.position, row.direction, row.target, self.clock()
+                )
+                self.stale_detector.observe(row.id, row.direction != 0)
+            if self._shade_index is not None and (
+                model := self.api.shade_models.get(row.id)
+            ):
+                if FIELD_MODEL in changed:
+                    self._shade_index.set_model(model)
+                elif "position" in changed:
+                    self._shade_index.update_position(model)
+        for update_callback in self._state_listeners.get((row.kind, row.id), ()):
+            update_callback(row, changed)
+        for update_callback in self._state_listeners.get(None, ()):
+            update_callback(row, changed)
+        if "flags" in changed or FIELD_RESTORED in changed:
+            # Only the bits that flipped are published to the flag listeners
+            # unless the hub just confirmed the restored values.
+            flags = ShadeFlag if FIELD_RESTORED in changed else row.flag_transitions
+            for flag in flags:
+                for flag_callback in self._flag_listeners.get(
+                    (row.kind, row.id, flag), ()
+                ):
+                    flag_callback(row, flag in row.flags)
+
+    @callback
+    def async_add_state_listener(
+        self,
+        kind: str,
+        row_id: int,
+        update_callback: Callable[[ShadeState, set[str]], None],
+    ) -> CALLBACK_TYPE:
+        """Listen for field changes on a single shade or group row."""
+        return _add_listener(
+            self._state_listeners, (kind, int(row_id)), update_callback
         )
 
-    def ws_onpacket(self, data):
-        """Packet from the websocket."""
-        # Below doesn't work.  Near as I can tell there is no
-        # real way of adding an entity on the fly.  All this
-        # does is add an entity that is not really attached.
-        # if data["event"] == EVT_SHADEADDED:
-        #    self.ensure_shade_configured(data)
+    @callback
+    def async_add_hub_listener(
+        self, update_callback: Callable[[ShadeState, set[str]], None]
+    ) -> CALLBACK_TYPE:
+        """Listen for field changes on every shade and group row on the hub."""
+        return _add_listener(self._state_listeners, None, update_callback)
+
+    @callback
+    def async_add_flag_listener(
+        self,
+        kind: str,
+        row_id: int,
+        flag: ShadeFlag,
+        flag_callback: Callable[[ShadeState, bool], None],
+    ) -> CALLBACK_TYPE:
+        """Listen for a single flag being set or cleared on a shade or group row."""
+        return _add_listener(
+            self._flag_listeners, (kind, int(row_id), flag), flag_callback
+        )
 
-        # Catch the fwStatus messages before they go anywhere
-        # this will allow us to simply update the latest firmware
-        if "event" in data and data["event"] == EVT_FWSTATUS:
-            self.api.set_firmware(data)
+    def motion_model(self, shade_id: int) -> MotionModel:
+        """Get the motion model for a shade."""
+        model = self.motion.get(shade_id)
+        if model is None:
+            model = self.motion[shade_id] = MotionModel()
+        return model
+
+    def set_connected(self, connected: bool) -> None:
+        """Track the socket and fall back to polling while it is down."""
+        self.socket_connected = connected
+        if connected or self._closed:
+            self.poller.async_stop()
+        else:
+            self.poller.async_start()
+        self._set_available(connected or self.poller.healthy)
+
+    def set_polled(self, healthy: bool) -> None:
+        """Keep the hub available while polling works without the socket."""
+        self._set_available(self.socket_connected or healthy)
 
-        self.async_set_updated_data(data=data)
+    @property
+    def is_moving(self) -> bool:
+        """Indicates whether any shade is moving."""
+        return any(
+            row.direction != 0 or row.tilt_direction != 0
+            for row in self.store.shades.values()
+        )
+
+    async def async_refresh_shade(self, shade_id: int) -> None:
+        """Refresh a single shade from the hub and hand out what changed."""
+        for row, changed in await self.api.load_shade(shade_id) or ():
+            self._dispatch_row(row, changed)
+            if FIELD_MODEL in changed:
+                self.async_sync_row(row.kind, row.id)
+
+    async def async_poll(self) -> bool:
+        """Refresh the shades and groups over HTTP and hand out what changed."""
+        shades = await self.api.load_shades()
+        groups = await self.api.load_groups()
+        if shades is None or groups is None:
+            return False
+        changes = shades + groups
+        for row, changed in changes:
+            self._dispatch_row(row, changed)
+        self.async_sync_rows(
+            {(row.kind, row.id) for row, changed in changes if FIELD_MODEL in changed}
+        )
+        return True
+
+    def _set_available(self, connected: bool) -> None:
+        """Notify the entities only when the connection state changes."""
+        if self.connected == connected:
+            return
+        self.connected = connected
+        self.store.bump()
+        self.async_set_updated_data(
+            data={"event": EVT_CONNECTED, "connected": connected}
+        )
 
     def ws_onopen(self):
         """Websocket is opened."""
         _LOGGER.debug("ESPSomfy RTS Socket was opened")
+        self.api.startup.mark("websocket")
         if self.api.is_configured:
             _LOGGER.debug("ESPSomfy RTS Already Configured")
-            data = {"event": EVT_CONNECTED, "connected": True}
-            self.async_set_updated_data(data=data)
+            self.set_connected(True)
         else:
             _LOGGER.debug("ESPSomfy RTS configuring entities")
             loop = asyncio.get_event_loop()
             coro = loop.create_task(self.api.get_initial())
 
             def handle_connected(_coro):
-                data = {"event": EVT_CONNECTED, "connected": True}
-                self.async_set_updated_data(data=data)
+                self.set_connected(True)
 
             coro.add_done_callback(handle_connected)
 
     def ws_onerror(self, exception):
         """Error on the socket connection."""
-        data = {"event": EVT_CONNECTED, "connected": False}
-        self.async_set_updated_data(data=data)
+        self.set_connected(False)
+        # The hub may have moved so look the address up before the next attempt.
+        self.api.resolver.invalidate()
+
+    async def _async_sock_url(self) -> str:
+        """Get the socket url for the current address of the hub."""
+        await self.api.async_resolve_host()
+        return self.api.get_sock_url()
+
+    @callback
+    def learn_address(self, address: str) -> None:
+        """Use an address announced by zeroconf for a hub configured by name."""
+        # The socket picks the address up on its next connect.
+        self.api.learn_address(address)
 
     def ws_onclose(self):
         """Socket closed."""
-        data = {"event": EVT_CONNECTED, "connected": False}
-        self.async_set_updated_data(data=data)
+        self.set_connected(False)
 
 
 class ESPSomfyAPI:
@@ -463,6 +706,18 @@ class ESPSomfyAPI:
         self._can_update = False
         self._config_entry_id = config_entry_id
         self._configured = False
+        self._initial_task: asyncio.Task | None = None
+        self.startup = StartupTimer()
+        self.store = ESPSomfyStateStore()
+        self._shade_models: dict[int, ShadeModel] = {}
+        self._group_models: dict[int, GroupModel] = {}
+        self._from_cache = False
+        self._requests = RequestCoalescer()
+        # The digest of the last response applied for a path and the store
+        # version right after it was applied.
+        self._applied: dict[str, tuple[bytes, int]] = {}
+        self._discovery_cache, self._state_cache = cache_stores(hass, config_entry_id)
+        self._state_save_pending = False
 
     @property
     def shades(self) -> Any:
@@ -478,6 +733,16 @@ class ESPSomfyAPI:
             return self._config["groups"]
         return []
 
+    @property
+    def shade_models(self) -> dict[int, ShadeModel]:
+        """Return the compiled shade models keyed by shade id."""
+        return self._shade_models
+
+    @property
+    def group_models(self) -> dict[int, GroupModel]:
+        """Return the compiled group models keyed by group id."""
+        return self._group_models
+
     @property
     def server_id(self) -> str | None:
         """Getter for the server id."""
@@ -541,6 +806,16 @@ class ESPSomfyAPI:
             return self._config["inetAvailable"]
         return self._can_update
 
+    @property
+    def requests(self) -> RequestCoalescer:
+        """Get the coalescer for the GET requests to the hub."""
+        return self._requests
+
+    @property
+    def from_cache(self) -> bool:
+        """Indicates whether the configuration came from the discovery cache."""
+        return self._from_cache
+
     @property
     def is_configured(self) -> bool:
         """Indicates whether the integration has been configured."""
@@ -549,9 +824,27 @@ class ESPSomfyAPI:
     def set_host(self, host) -> None:
         """Set the host for the integration."""
         self._host = host
-        self._sock_url = f"ws://{self._host}:8080"
-        self._api_url = f"http://{self._host}:8081"
+        self.resolver = HostResolver(self.hass, host)
         self._config_url = f"http://{self._host}"
+        self._set_address(self.resolver.address)
+
+    def _set_address(self, address: str) -> None:
+        """Point the socket and api urls at an address for the host."""
+        self._sock_url = f"ws://{address}:8080"
+        self._api_url = f"http://{address}:8081"
+
+    async def async_resolve_host(self) -> bool:
+        """Point the urls at the resolved address and return whether they moved."""
+        api_url = self._api_url
+        self._set_address(await self.resolver.async_resolve())
+        return self._api_url != api_url
+
+    def learn_address(self, address: str) -> bool:
+        """Use an address announced for the host and return whether it moved."""
+        if not self.resolver.learn(address):
+            return False
+        self._set_address(address)
+        return True
 
     def get_host(self):
         """Get the current host."""
@@ -616,6 +909,36 @@ class ESPSomfyAPI:
         else:
             self._can_update = False
 
+    def update_shade_config(self, data) -> ShadeModel | None:
+        """Recompile a shade model when a frame changes its configuration."""
+        model = self._shade_models.get(int(data["shadeId"]))
+        if model is None:
+            return None
+        changes = {
+            key: data[key]
+            for key in SHADE_CONFIG_KEYS
+            if key in data and model.raw.get(key) != data[key]
+        }
+        if not changes:
+            return None
+        model = self._shade_models[model.shade_id] = compile_shade(
+            {**model.raw, **changes}
+        )
+        return model
+
+    def update_group_config(self, data) -> GroupModel | None:
+        """Recompile a group model when a frame changes the linked shades."""
+        model = self._group_models.get(int(data["groupId"]))
+        if model is None or "linkedShades" not in data:
+            return None
+        linked = tuple(int(shade["shadeId"]) for shade in data["linkedShades"])
+        if linked == model.linked_shade_ids:
+            return None
+        model = self._group_models[model.group_id] = compile_group(
+            {**model.raw, "linkedShades": data["linkedShades"]}
+        )
+        return model
+
     async def check_address(self, url) -> bool:
         """Send a head to a url to check if it exists."""
         try:
@@ -675,8 +998,12 @@ class ESPSomfyAPI:
         f.sort(reverse=True)
         return f
 
-    def apply_data(self, data) -> None:
-        """Apply the returned data to the configuration."""
+    def apply_data(self, data) -> list[tuple[ShadeState, set[str]]]:
+        """Apply the returned data to the configuration.
+
+        Returns the store rows whose state or model changed along with the
+        fields that changed.
+        """
         self._config["serverId"] = data["serverId"]
         self._config["model"] = data["model"]
         if "chipModel" in data:
@@ -712,38 +1039,121 @@ class ESPSomfyAPI:
             self._config["permissions"] = 1
         if "memory" in data:
             self._config["memory"] = data["memory"]
+        changes = self._load_rows(self._config["shades"], self._config["groups"])
         self._needsKey = False
         if self._config["authType"] > 0:
             if self._config["permissions"] != 1:
                 self._needsKey = True
         self.set_firmware(data)
+        return changes
+
+    def _load_rows(
+        self, shades: Any | None, groups: Any | None
+    ) -> list[tuple[ShadeState, set[str]]]:
+        """Compile the models and load the state for the shades or groups given.
+
+        Returns the store rows whose state or model changed along with the
+        fields that changed.
+        """
+        old_shades = self._shade_models
+        old_groups = self._group_models
+        if shades is not None:
+            self._shade_models = compile_shades(shades)
+        if groups is not None:
+            self._group_models = compile_groups(groups)
+        changes = {
+            (row.kind, row.id): (row, changed)
+            for row, changed in self.store.load(shades or [], groups or [])
+        }
+        for kind, old, new, get_row in (
+            (KIND_SHADE, old_shades, self._shade_models, self.store.shade),
+            (KIND_GROUP, old_groups, self._group_models, self.store.group),
+        ):
+            if old is new:
+                continue
+            for row_id, model in new.items():
+                if old.get(row_id, model) != model:
+                    row, changed = changes.setdefault(
+                        (kind, row_id), (get_row(row_id), set())
+                    )
+                    changed.add(FIELD_MODEL)
+                    self.store.touch(row)
+        return list(changes.values())
+
+    async def _async_fetch(self, path: str) -> FetchResult:
+        """Get a path on the hub sharing any request for it that is in flight."""
+        return await self._requests.async_get(
+            self._session, f"{self._api_url}{path}", self._headers
+        )
 
-    async def discover(self) -> Any | None:
-        """Discover the device on the network."""
-        url = f"{self._api_url}{API_DISCOVERY}"
-        async with self._session.get(url, headers=self._headers) as resp:
-            if resp.status == 200:
-                data = await resp.json()
-                self.apply_data(data)
-                return data
-            _LOGGER.error(await resp.text())
-            raise DiscoveryError(f"{url} - {await resp.text()}")
+    def _is_applied(self, path: str, result: FetchResult) -> bool:
+        """Indicates whether a response was applied and nothing changed since."""
+        return self._applied.get(path) == (result.digest, self.store.version)
 
-    async def load_shades(self) -> Any | None:
-        """Load all the shades from the controller."""
-        async with self._session.get(f"{self._api_url}{API_SHADES}") as resp:
-            if resp.status == 200:
-                self._config["shades"] = await resp.json()
-                return self._config["shades"]
-            _LOGGER.error(await resp.text())
+    def _mark_applied(self, path: str, result: FetchResult) -> None:
+        """Remember the response that the rows now reflect."""
+        self._applied[path] = (result.digest, self.store.version)
 
-    async def load_groups(self) -> Any | None:
-        """Load all the groups from the controller."""
-        async with self._session.get(f"{self._api_url}{API_GROUPS}") as resp:
-            if resp.status == 200:
-                self._config["groups"] = await resp.json()
-                return self._config["groups"]
-            _LOGGER.error(await resp.text())
+    async def discover(self) -> Any | None:
+        """Discover the device on the network."""
+        result = await self._async_fetch(API_DISCOVERY)
+        if result.status == 200:
+            data = result.json()
+            self.apply_data(data)
+            self._mark_applied(API_DISCOVERY, result)
+            return data
+        _LOGGER.error(result.text())
+        raise DiscoveryError(f"{self._api_url}{API_DISCOVERY} - {result.text()}")
+
+    async def load_shades(self) -> list[tuple[ShadeState, set[str]]] | None:
+        """Load all the shades from the controller and return the rows that changed."""
+        result = await self._async_fetch(API_SHADES)
+        if result.status != 200:
+            _LOGGER.error(result.text())
+            return None
+        if self._is_applied(API_SHADES, result):
+            return []
+        self._config["shades"] = result.json()
+        changes = self._load_rows(self._config["shades"], None)
+        self._mark_applied(API_SHADES, result)
+        return changes
+
+    async def load_shade(
+        self, shade_id: int
+    ) -> list[tuple[ShadeState, set[str]]] | None:
+        """Load a single shade from the controller and return the row if it changed."""
+        result = await self._async_fetch(f"{API_SHADE}?shadeId={shade_id}")
+        if result.status != 200:
+            _LOGGER.error(result.text())
+            return None
+        data = result.json()
+        changes = self.store.load([data], [])
+        if (model := self._shade_models.get(shade_id)) is not None:
+            # The raw payload is shared with the discovery payload that is
+            # saved to disk so it is copied rather than updated.
+            new_model = compile_shade({**model.raw, **data})
+            if new_model != model:
+                self._shade_models[shade_id] = new_model
+                row = self.store.shade(shade_id)
+                self.store.touch(row)
+                if changes:
+                    changes[0][1].add(FIELD_MODEL)
+                else:
+                    changes.append((row, {FIELD_MODEL}))
+        return changes
+
+    async def load_groups(self) -> list[tuple[ShadeState, set[str]]] | None:
+        """Load all the groups from the controller and return the rows that changed."""
+        result = await self._async_fetch(API_GROUPS)
+        if result.status != 200:
+            _LOGGER.error(result.text())
+            return None
+        if self._is_applied(API_GROUPS, result):
+            return []
+        self._config["groups"] = result.json()
+        changes = self._load_rows(None, self._config["groups"])
+        self._mark_applied(API_GROUPS, result)
+        return changes
 
     async def tilt_open(self, shade_id: int):
         """Send the command to open the tilt."""
@@ -890,27 +1300,93 @@ class ESPSomfyAPI:
             else:
                 _LOGGER.error(await resp.text())
 
-    async def get_initial(self):
-        """Get the initial config from ESPSomfy RTS."""
+    async def async_load_cache(self) -> bool:
+        """Apply the discovery payload saved on the last start."""
+        if not (data := await self._discovery_cache.async_load()):
+            return False
+        try:
+            self.apply_data(data)
+        except (KeyError, TypeError, ValueError):
+            _LOGGER.warning("Ignoring the unreadable discovery cache")
+            return False
+        self._from_cache = True
+        self.startup.mark("cache")
+        return True
+
+    async def async_load_state(self) -> bool:
+        """Restore the shade and group state saved before the last restart."""
+        if not (data := await self._state_cache.async_load()):
+            return False
+        self.store.restore(data)
+        return True
+
+    @callback
+    def async_schedule_state_save(self) -> None:
+        """Save the state of every shade and group on the hub in one batch.
+
+        The save is only scheduled when none is waiting.  Scheduling it again
+        would push it back so a shade that keeps moving could hold it off.
+        """
+        if self._state_save_pending:
+            return
+        self._state_save_pending = True
+        self._state_cache.async_delay_save(self._dump_state, STATE_SAVE_DELAY)
+
+    @callback
+    def _dump_state(self) -> dict[str, list[list[Any]]]:
+        """Get the state to save, the changes after this go in the next save."""
+        self._state_save_pending = False
+        return self.store.dump()
+
+    async def async_setup_platforms(self) -> None:
+        """Set up the entities for the hub once."""
+        if self._configured:
+            return
+        _LOGGER.debug("ESPSomfy RTS Setting up entities")
+        self._configured = True
+        entry = self.hass.config_entries.async_get_entry(self._config_entry_id)
+        await self.hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+        self.startup.mark("platforms")
+
+    async def get_initial(self) -> list[tuple[ShadeState, set[str]]] | None:
+        """Get the initial config from ESPSomfy RTS.
+
+        Returns the rows that differ from the current state or None when the
+        hub could not be reached.  Callers that ask while a request is in
+        flight share its result instead of sending another one.
+        """
+        task = self._initial_task
+        if task is None or task.done():
+            task = self._initial_task = self.hass.async_create_task(
+                self._async_get_initial(), f"{DOMAIN}_discovery"
+            )
+        return await asyncio.shield(task)
+
+    async def _async_get_initial(self) -> list[tuple[ShadeState, set[str]]] | None:
+        """Request the discovery payload from the hub and apply it."""
+        await self.async_resolve_host()
         try:
             self._session = aiohttp_client.async_get_clientsession(self.hass)
-            async with self._session.get(f"{self._api_url}{API_DISCOVERY}") as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    self.apply_data(data)
-                    entry = self.hass.config_entries.async_get_entry(
-                        self._config_entry_id
-                    )
-                    if not self._configured:
-                        _LOGGER.debug("ESPSomfy RTS Setting up entities")
-                        await self.hass.config_entries.async_forward_entry_setups(
-                            entry, PLATFORMS
-                        )
-                        self._configured = True
-                else:
-                    _LOGGER.error(await resp.text())
+            result = await self._async_fetch(API_DISCOVERY)
         except aiohttp.ClientError:
-            pass
+            # The hub may have moved so look the address up on the next try.
+            self.resolver.invalidate()
+            return None
+        if result.status != 200:
+            _LOGGER.error(result.text())
+            return None
+        self.startup.mark("discovery")
+        if self._is_applied(API_DISCOVERY, result):
+            # Nothing changed on the hub or here since the payload was applied.
+            changes = []
+        else:
+            data = result.json()
+            changes = self.apply_data(data)
+            self._mark_applied(API_DISCOVERY, result)
+            self._discovery_cache.async_delay_save(lambda: data, DISCOVERY_SAVE_DELAY)
+        self._from_cache = False
+        await self.async_setup_platforms()
+        return changes
 
 
 class InvalidHost(HomeAssistantError):
@@ -2,8 +2,9 @@
 
 from __future__ import annotations
 
-from collections.abc import Mapping
-import contextlib
+from collections.abc import Callable, Mapping
+from datetime import datetime, timedelta
+from functools import cache, partial
 from typing import Any, Final
 
 import voluptuous as vol
@@ -11,28 +12,42 @@ import voluptuous as vol
 from homeassistant.components.cover import (
     ATTR_POSITION,
     ATTR_TILT_POSITION,
+    DOMAIN as COVER_DOMAIN,
     CoverDeviceClass,
     CoverEntity,
     CoverEntityFeature,
 )
-from homeassistant.components.group.cover import CoverGroup
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import ATTR_ENTITY_ID
-from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers import entity_platform as ep, entity_registry as er
+from homeassistant.const import (
+    ATTR_ENTITY_ID,
+    SERVICE_CLOSE_COVER,
+    SERVICE_CLOSE_COVER_TILT,
+    SERVICE_OPEN_COVER,
+    SERVICE_OPEN_COVER_TILT,
+    SERVICE_SET_COVER_POSITION,
+    SERVICE_SET_COVER_TILT_POSITION,
+)
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers import entity_platform as ep
 from homeassistant.helpers.config_validation import make_entity_service_schema
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.util import dt as dt_util
+from homeassistant.helpers.event import async_track_time_interval
 
+from .aggregate import GroupAggregate, member_state
 from .const import (
+    ATTR_RESTORED,
+    CONF_RECORDED_ATTRIBUTES,
     DOMAIN,
     EVT_CONNECTED,
     EVT_SHADECOMMAND,
     EVT_SHADEREMOVED,
-    EVT_SHADESTATE,
+    VOLATILE_ATTRIBUTES,
 )
 from .controller import ESPSomfyController
 from .entity import ESPSomfyEntity
+from .limiter import StateWriteLimiter
+from .model import GroupModel, ShadeModel
+from .store import FIELD_MODEL, FIELD_RESTORED, KIND_GROUP, KIND_SHADE, ShadeState
 
 SVC_OPEN_SHADE = "open_shade"
 SVC_CLOSE_SHADE = "close_shade"
@@ -58,6 +73,49 @@ ATTR_COMMAND = "command"
 ATTR_DIRECTION = "direction"
 ATTR_REPEAT = "repeat"
 
+# How often the interpolated position is refreshed while a shade is moving.
+MOTION_REFRESH_INTERVAL = timedelta(seconds=1)
+
+# Store fields that are exposed by a shade entity.
+_LIFT_FIELDS = frozenset(
+    {
+        FIELD_MODEL,
+        FIELD_RESTORED,
+        "position",
+        "direction",
+        "target",
+        "my_pos",
+        "remote_address",
+        "last_cmd",
+        "cmd_source",
+        "cmd_address",
+        "cmd_fired",
+    }
+)
+_TILT_FIELDS = _LIFT_FIELDS | {
+    "tilt_position",
+    "tilt_direction",
+    "tilt_target",
+    "my_tilt_pos",
+}
+# Linked shade fields that change what a group entity shows.
+_GROUP_FIELDS = frozenset(
+    {FIELD_MODEL, "position", "direction", "tilt_position", "tilt_direction"}
+)
+# Features a group can offer when at least one linked shade supports them.
+_GROUP_FEATURES = (
+    CoverEntityFeature.OPEN
+    | CoverEntityFeature.CLOSE
+    | CoverEntityFeature.STOP
+    | CoverEntityFeature.SET_POSITION
+    | CoverEntityFeature.OPEN_TILT
+    | CoverEntityFeature.CLOSE_TILT
+    | CoverEntityFeature.SET_TILT_POSITION
+)
+
+# Fields that only move the position and are written against the write budget.
+_MOVING_FIELDS = frozenset({"position", "tilt_position"})
+
 ALLOWED_COMMAND = [
     "Up",
     "My",
@@ -113,31 +171,37 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up shades for the shade controller."""
-    controller = hass.data[DOMAIN][config_entry.entry_id]
-    new_shades = []
+    controller: ESPSomfyController = hass.data[DOMAIN][config_entry.entry_id]
     data = controller.api.get_config()
     if "serverId" in data:
-        for shade in controller.api.shades:
-            try:
-                # We do not want any of the dry contacts here.
-                if "shadeType" in shade and not (
-                    int(shade["shadeType"]) == 9 or int(shade["shadeType"]) == 10
-                ):
-                    new_shades.append(ESPSomfyShade(controller, shade))
-
-            except KeyError:
-                pass
-        if new_shades:
-            async_add_entities(new_shades)
-
-        new_groups = []
-        for group in controller.api.groups:
-            with contextlib.suppress(KeyError):
-                new_groups.append(
-                    ESPSomfyGroup(hass=hass, controller=controller, data=group)
+        # The class is fixed for the life of the entry, a change to the
+        # option reloads it.
+        shade_class = _shade_class(
+            frozenset(controller.applied_options.get(CONF_RECORDED_ATTRIBUTES, ()))
+        )
+
+        def _row_entities(
+            kind: str, row_id: int
+        ) -> dict[str, Callable[[], ESPSomfyEntity]]:
+            if kind == KIND_GROUP:
+                if (group := controller.api.group_models.get(row_id)) is None:
+                    return {}
+                return {
+                    _group_unique_id(controller, row_id): partial(
+                        ESPSomfyGroup, controller=controller, model=group
+                    )
+                }
+            model = controller.api.shade_models.get(row_id)
+            # We do not want any of the dry contacts here.
+            if model is None or "shadeType" not in model.raw or model.is_dry_contact:
+                return {}
+            return {
+                _shade_unique_id(controller, row_id): partial(
+                    shade_class, controller, model
                 )
-        if new_groups:
-            async_add_entities(new_groups)
+            }
+
+        controller.async_add_row_platform(_row_entities, async_add_entities)
 
         platform = ep.async_get_current_platform()
         platform.async_register_entity_service(
@@ -183,86 +247,113 @@ async def async_setup_entry(
         )
 
 
-class ESPSomfyGroup(CoverGroup, ESPSomfyEntity):
-    """A grpi[] that is associated with a controller."""
+def _shade_unique_id(controller: ESPSomfyController, shade_id: int) -> str:
+    """Get the unique id for the cover of a shade."""
+    return f"{controller.unique_id}_{shade_id}"
 
-    def __init__(
-        self, hass: HomeAssistant, controller: ESPSomfyController, data
-    ) -> None:
+
+def _group_unique_id(controller: ESPSomfyController, group_id: int) -> str:
+    """Get the unique id for the cover of a group."""
+    return f"{controller.unique_id}_group{group_id}"
+
+
+class ESPSomfyGroup(ESPSomfyEntity, CoverEntity):
+    """A group that is associated with a controller."""
+
+    def __init__(self, controller: ESPSomfyController, model: GroupModel) -> None:
         """Initialize a group."""
-        ESPSomfyEntity.__init__(self=self, controller=controller, data=data)
-        self._hass = hass
-        self._attr_available = True
+        super().__init__(controller=controller, data=model)
         self._controller = controller
-        self._group_id = data["groupId"]
+        self._group_id = model.group_id
+        self._attr_unique_id = _group_unique_id(controller, self._group_id)
+        self._attr_name = model.name
+        self._attr_available = controller.connected is not False
         self._attr_device_class = CoverDeviceClass.SHADE
-        self._linked_shade_ids = []
-        self._flip_position = False
-        self._process_individual = False
-        flipped = 0
-        notflipped = 0
-        if "linkedShades" in data:
-            for linked_shade in data["linkedShades"]:
-                if (
-                    "shadeType" in linked_shade
-                    and int(linked_shade["shadeType"]) == 3
-                    or (
-                        "flipPosition" in linked_shade
-                        and bool(linked_shade["flipPosition"]) is True
-                    )
-                ):
-                    flipped = flipped + 1
-                else:
-                    notflipped = notflipped + 1
-                self._linked_shade_ids.append(int(linked_shade["shadeId"]))
-        uuid = f"{controller.unique_id}_group{self._group_id}"
-        if flipped > 0 and notflipped == 0:
-            self._flip_position = True
-        elif flipped > 0 and notflipped > 0:
-            self._process_individual = True
-        entities = er.async_get(hass)
-        shade_ids: list[str] = []
-        for entity in er.async_entries_for_config_entry(
-            entities, self._controller.config_entry_id
-        ):
-            shade_ids.extend(
-                [
-                    entity.entity_id
-                    for cover_id in self._linked_shade_ids
-                    if entity.unique_id == f"{self._controller.unique_id}_{cover_id}"
-                ]
-            )
-            # Supposedly according to ruff the above is more readable and succinct.
-            # for cover_id in self._linked_shade_ids:
-            #    if entity.unique_id == f"{self._controller.unique_id}_{cover_id}":
-            #        shade_ids.append(entity.entity_id)
-        super().__init__(unique_id=uuid, name=data["name"], entities=shade_ids)
+        self._linked_shade_ids = list(model.linked_shade_ids)
+        self._flip_position = model.flip_position
+        self._process_individual = model.process_individual
+        self._update_features()
+        self._aggregate = GroupAggregate()
+        self._unsub_members: list[CALLBACK_TYPE] = []
+        self._member_entity_ids: list[str] = []
+        self._member_index_version = -1
+        self._limiter = StateWriteLimiter(
+            controller.hass,
+            self.async_write_ha_state,
+            controller.max_write_rate,
+            controller.position_deadband,
+            controller.clock,
+        )
 
     async def async_added_to_hass(self) -> None:
-        """Subscribe to device events."""
-        entities = er.async_get(self._hass)
-        shade_ids: list[str] = []
-        for entity in er.async_entries_for_config_entry(
-            entities, self._controller.config_entry_id
-        ):
-            for cover_id in self._linked_shade_ids:
-                if entity.unique_id == f"{self._controller.unique_id}_{cover_id}":
-                    if hasattr(self, "_entities"):
-                        if entity.entity_id not in self._entities:
-                            self._entities.append(entity.entity_id)
-                    elif hasattr(self, "_entity_ids"):
-                        if entity.entity_id not in self._entity_ids:
-                            self._entity_ids.append(entity.entity_id)
-                    shade_ids.append(entity.entity_id)
-        # self._entities = shade_ids
-        self._attr_extra_state_attributes = {ATTR_ENTITY_ID: shade_ids}
+        """Subscribe to the group and the shades linked to it."""
         await super().async_added_to_hass()
         self.async_on_remove(
-            self.coordinator.async_add_listener(
-                self._handle_coordinator_update, self.coordinator_context
+            self._controller.async_add_state_listener(
+                KIND_GROUP, self._group_id, self._handle_state_delta
+            )
+        )
+        self._link_shades()
+        self.async_on_remove(self._unlink_shades)
+
+    def _link_shades(self) -> None:
+        """Seed the aggregate from the store and listen to the linked shades."""
+        self._unlink_shades()
+        self._aggregate = GroupAggregate()
+        self._member_index_version = -1
+        self._update_features()
+        for shade_id in self._linked_shade_ids:
+            self._update_member(shade_id)
+            self._unsub_members.append(
+                self._controller.async_add_state_listener(
+                    KIND_SHADE, shade_id, self._handle_member_delta
+                )
             )
+
+    @callback
+    def _unlink_shades(self) -> None:
+        """Stop listening to the linked shades."""
+        while self._unsub_members:
+            self._unsub_members.pop()()
+        self._limiter.cancel()
+
+    def _update_features(self) -> bool:
+        """Offer the features supported by any of the linked shades.
+
+        Returns whether the features changed.
+        """
+        features = CoverEntityFeature(0)
+        for shade_id in self._linked_shade_ids:
+            if (model := self._controller.api.shade_models.get(shade_id)) is not None:
+                features |= model.supported_features
+        features &= _GROUP_FEATURES
+        if features == self._attr_supported_features:
+            return False
+        self._attr_supported_features = features
+        return True
+
+    def _update_member(self, shade_id: int) -> bool:
+        """Fold the current state of a linked shade into the aggregate."""
+        model = self._controller.api.shade_models.get(shade_id)
+        if model is None:
+            return self._aggregate.remove(shade_id)
+        return self._aggregate.update(
+            shade_id, member_state(model, self._controller.store.shade(shade_id))
         )
 
+    @callback
+    def _handle_member_delta(self, state: ShadeState, changed: set[str]) -> None:
+        """Handle the fields that changed on a linked shade."""
+        if self.registry_entry.disabled:
+            return
+        if FIELD_MODEL in changed and self._update_features():
+            self.async_write_ha_state()
+        if self._update_member(state.id) and not changed.isdisjoint(_GROUP_FIELDS):
+            aggregate = self._aggregate
+            direction = int(aggregate.opening > 0) - int(aggregate.closing > 0)
+            if not self._limiter.request(aggregate.position or 0, direction):
+                self._controller.writes_suppressed += 1
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
@@ -271,17 +362,60 @@ class ESPSomfyGroup(CoverGroup, ESPSomfyEntity):
         if (
             self._controller.data["event"] == EVT_CONNECTED
             and "connected" in self._controller.data
+            and self._attr_available != bool(self._controller.data["connected"])
         ):
             self._attr_available = bool(self._controller.data["connected"])
             self.async_write_ha_state()
-        elif "groupId" in self._controller.data:
-            if self._controller.data["groupId"] == self._group_id:
-                if "linkedShades" in self._controller.data:
-                    self._linked_shade_ids.clear()
-                    for shade in self._controller.data["linkedShades"]:
-                        self._linked_shade_ids.append(int(shade["shadeId"]))
-                self._attr_available = True
+
+    @callback
+    def _handle_state_delta(self, state: ShadeState, changed: set[str]) -> None:
+        """Handle the fields that changed on the group."""
+        if self.registry_entry.disabled:
+            return
+        if FIELD_MODEL not in changed:
+            if FIELD_RESTORED in changed:
                 self.async_write_ha_state()
+            return
+        if (model := self._controller.api.group_models.get(self._group_id)) is None:
+            return
+        self._attr_name = model.name
+        self._linked_shade_ids = list(model.linked_shade_ids)
+        self._flip_position = model.flip_position
+        self._process_individual = model.process_individual
+        self._link_shades()
+        self._attr_available = True
+        self.async_write_ha_state()
+
+    def _linked_entity_ids(self) -> list[str]:
+        """Get the entity ids for the linked shades."""
+        controller = self._controller
+        if self._member_index_version != controller.entity_index_version:
+            # Only look the shades up again when the registry index has changed.
+            self._member_entity_ids = [
+                entity_id
+                for shade_id in self._linked_shade_ids
+                if (
+                    entity_id := controller.entity_id_for(
+                        _shade_unique_id(controller, shade_id)
+                    )
+                )
+                is not None
+            ]
+            self._member_index_version = controller.entity_index_version
+        return self._member_entity_ids
+
+    async def _async_call_linked(
+        self, service: str, data: dict[str, Any] | None = None
+    ) -> None:
+        """Call a cover service on the shades linked to the group."""
+        if entity_ids := self._linked_entity_ids():
+            await self.hass.services.async_call(
+                COVER_DOMAIN,
+                service,
+                {ATTR_ENTITY_ID: entity_ids, **(data or {})},
+                blocking=True,
+                context=self._context,
+            )
 
     @property
     def available(self) -> bool:
@@ -300,10 +434,45 @@ class ESPSomfyGroup(CoverGroup, ESPSomfyEntity):
             return self._attr_icon
         return "mdi:table-multiple"
 
+    @property
+    def current_cover_position(self) -> int | None:
+        """Return the mean position of the linked shades."""
+        return self._aggregate.position
+
+    @property
+    def current_cover_tilt_position(self) -> int | None:
+        """Return the mean tilt position of the linked shades."""
+        return self._aggregate.tilt_position
+
+    @property
+    def is_opening(self) -> bool:
+        """Return true if any linked shade is opening."""
+        return self._aggregate.opening > 0
+
+    @property
+    def is_closing(self) -> bool:
+        """Return true if any linked shade is closing."""
+        return self._aggregate.closing > 0
+
+    @property
+    def is_closed(self) -> bool | None:
+        """Return true if none of the linked shades is open."""
+        if not self._aggregate:
+            return None
+        return self._aggregate.is_closed
+
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any] | None:
+        """Return the linked shades for the group."""
+        attrs: dict[str, Any] = {ATTR_ENTITY_ID: self._linked_entity_ids()}
+        if self._controller.store.group(self._group_id).restored:
+            attrs[ATTR_RESTORED] = True
+        return attrs
+
     async def async_open_cover(self, **kwargs: Any) -> None:
         """Open the cover."""
         if self._process_individual:
-            await super().async_open_cover(kwargs=kwargs)
+            await self._async_call_linked(SERVICE_OPEN_COVER)
         elif self._flip_position:
             await self._controller.api.close_group(self._group_id)
         else:
@@ -312,7 +481,7 @@ class ESPSomfyGroup(CoverGroup, ESPSomfyEntity):
     async def async_close_cover(self, **kwargs: Any) -> None:
         """Close cover."""
         if self._process_individual:
-            await super().async_close_cover(kwargs=kwargs)
+            await self._async_call_linked(SERVICE_CLOSE_COVER)
         elif self._flip_position:
             await self._controller.api.open_group(self._group_id)
         else:
@@ -323,6 +492,27 @@ class ESPSomfyGroup(CoverGroup, ESPSomfyEntity):
         # print(f"Stopping Cover id#{self._shade_id}")
         await self._controller.api.stop_group(self._group_id)
 
+    async def async_set_cover_position(self, **kwargs: Any) -> None:
+        """Move the linked shades to a position."""
+        await self._async_call_linked(
+            SERVICE_SET_COVER_POSITION, {ATTR_POSITION: kwargs[ATTR_POSITION]}
+        )
+
+    async def async_open_cover_tilt(self, **kwargs: Any) -> None:
+        """Open the tilt on the linked shades."""
+        await self._async_call_linked(SERVICE_OPEN_COVER_TILT)
+
+    async def async_close_cover_tilt(self, **kwargs: Any) -> None:
+        """Close the tilt on the linked shades."""
+        await self._async_call_linked(SERVICE_CLOSE_COVER_TILT)
+
+    async def async_set_cover_tilt_position(self, **kwargs: Any) -> None:
+        """Move the tilt on the linked shades to a position."""
+        await self._async_call_linked(
+            SERVICE_SET_COVER_TILT_POSITION,
+            {ATTR_TILT_POSITION: kwargs[ATTR_TILT_POSITION]},
+        )
+
     async def async_send_command(self, **kwargs: Any) -> None:
         """Send raw command from SVC."""
         cmd = {"groupId": self._group_id, "command": kwargs[ATTR_COMMAND]}
@@ -345,205 +535,113 @@ class ESPSomfyGroup(CoverGroup, ESPSomfyEntity):
 class ESPSomfyShade(ESPSomfyEntity, CoverEntity):
     """A shade that is associated with a controller."""
 
-    def __init__(self, controller: ESPSomfyController, data) -> None:
+    def __init__(self, controller: ESPSomfyController, model: ShadeModel) -> None:
         """Initialize a new shade."""
-        super().__init__(controller=controller, data=data)
+        super().__init__(controller=controller, data=model)
         self._controller = controller
-        self._shade_id = data["shadeId"]
-        self._position = data["position"]
-        self._tilt_position = 100
-        self._tilt_direction = 0
-        self._attr_unique_id = f"{controller.unique_id}_{self._shade_id}"
-        self._attr_name = data["name"]
-        self._direction = 0
-        self._attr_available = True
-        self._has_tilt = False
-        self._has_lift = True
-        self._flip_position = False
-        self._tilt_type = 0
-        self._state_attributes: dict[str, Any] = {}
-        self._shade_type = 1
-        self._last_direction = 0
-        if data.get("flipPosition") is True:
-            self._flip_position = True
-
-        self._attr_device_class = CoverDeviceClass.SHADE
-
-        self._attr_supported_features = (
-            CoverEntityFeature.OPEN
-            | CoverEntityFeature.CLOSE
-            | CoverEntityFeature.STOP
-            | CoverEntityFeature.SET_POSITION
+        self._shade_id = model.shade_id
+        self._model = model
+        self._state = controller.store.shade(self._shade_id)
+        self._motion = controller.motion_model(self._shade_id)
+        self._unsub_motion: CALLBACK_TYPE | None = None
+        self._last_estimate: int | None = None
+        self._limiter = StateWriteLimiter(
+            controller.hass,
+            self.async_write_ha_state,
+            controller.max_write_rate,
+            controller.position_deadband,
+            controller.clock,
         )
-        if "hasTilt" in data and data["hasTilt"] is True:
-            self._attr_supported_features |= (
-                CoverEntityFeature.OPEN_TILT
-                | CoverEntityFeature.CLOSE_TILT
-                | CoverEntityFeature.SET_TILT_POSITION
-            )
-            self._has_tilt = True
-            self._tilt_position = data.get("tiltPosition", 100)
-            self._tilt_direction = data.get("tiltDirection", 0)
-        if "tiltType" in data:
-            self._tilt_type = int(data["tiltType"])
-            match int(data["tiltType"]):
-                case 1 | 2 | 4:
-                    self._has_tilt = True
-                    self._attr_supported_features |= (
-                        CoverEntityFeature.OPEN_TILT
-                        | CoverEntityFeature.CLOSE_TILT
-                        | CoverEntityFeature.SET_TILT_POSITION
-                    )
-                case 3:
-                    self._has_tilt = True
-                    self._has_lift = False
-                    self._attr_supported_features = (
-                        CoverEntityFeature.OPEN_TILT
-                        | CoverEntityFeature.STOP_TILT
-                        | CoverEntityFeature.CLOSE_TILT
-                        | CoverEntityFeature.SET_TILT_POSITION
-                    )
-
-        if "shadeType" in data:
-            self._shade_type = int(data["shadeType"])
-            match int(data["shadeType"]):
-                case 1:
-                    self._attr_device_class = CoverDeviceClass.BLIND
-                case 2 | 7 | 8:
-                    self._attr_device_class = CoverDeviceClass.CURTAIN
-                case 3:
-                    self._attr_device_class = CoverDeviceClass.AWNING
-                case 4:
-                    self._attr_device_class = CoverDeviceClass.SHUTTER
-                case 5:
-                    self._attr_device_class = CoverDeviceClass.GARAGE
-                    self._attr_supported_features = CoverEntityFeature.STOP
-
-                case 6:
-                    self._attr_device_class = CoverDeviceClass.GARAGE
-                case 11 | 12 | 13:
-                    self._attr_device_class = CoverDeviceClass.GATE
-                case 14 | 15 | 16:
-                    self._attr_device_class = CoverDeviceClass.GATE
-                    self._attr_supported_features = (
-                        CoverEntityFeature.OPEN | CoverEntityFeature.CLOSE
-                    )
-                case _:
-                    self._attr_device_class = CoverDeviceClass.SHADE
-
+        self._attr_unique_id = _shade_unique_id(controller, self._shade_id)
+        self._attr_name = model.name
+        self._attr_available = controller.connected is not False
+        self._last_direction = 0
+        self._attr_device_class = model.device_class
+        self._attr_supported_features = model.supported_features
         self._attr_is_closed: bool = False
         # print(f"Set up shade {self._attr_unique_id} - {self._attr_name}")
 
-    def _handle_state_update(self, data) -> None:
-        """Handle the state update."""
-        upd = False
-
-        if "remoteAddress" in data and self._state_attributes.get(
-            "remote_address", 0
-        ) != int(data["remoteAddress"]):
-            self._state_attributes["remote_address"] = int(data["remoteAddress"])
-            upd = True
-        if "flipPosition" in data:
-            self._flip_position = bool(data["flipPosition"])
-        if "position" in data and self._position != data.get("position", -1):
-            self._position = int(data["position"])
-            upd = True
-        if "direction" in data and self._direction != data.get("direction", 0):
-            self._direction = int(data["direction"])
-            upd = True
-        if "target" in data and self._state_attributes.get("target", -1) != data.get(
-            "target", 0
-        ):
-            self._state_attributes["target"] = int(data.get("target", 0))
-            upd = True
-        if "myPos" in data and self._state_attributes.get("my_pos", -1) != data.get(
-            "myPos", 0
-        ):
-            self._state_attributes["my_pos"] = int(data.get("myPos", -1))
-            upd = True
-
-        if "hasTilt" in data and self._has_tilt != data.get("hasTilt", False):
-            self._has_tilt = bool(data["hasTilt"])
-        if "tiltType" in self._controller.data:
-            match int(self._controller.data["tiltType"]):
-                case 1 | 2:
-                    self._has_tilt = True
-                case 3:
-                    self._has_tilt = True
-                    self._has_lift = False
-                case _:
-                    self._has_tilt = False
-                    self._has_lift = True
-        if self._has_tilt:
-            if "tiltPosition" in data and self._tilt_position != data.get(
-                "tiltPosition", -1
-            ):
-                self._tilt_position = int(data["tiltPosition"])
-                upd = True
-            if "tiltDirection" in data and self._tilt_direction != data.get(
-                "tiltDirection", 0
-            ):
-                self._tilt_direction = int(data["tiltDirection"])
-                upd = True
-            if "tiltTarget" in data and self._state_attributes.get(
-                "tilt_target", 0
-            ) != int(data["tiltTarget"]):
-                self._state_attributes["tilt_target"] = int(data["tiltTarget"])
-                upd = True
-            if "myTiltPos" in data and self._state_attributes.get(
-                "my_tilt_pos", 0
-            ) != int(data["myTiltPos"]):
-                self._state_attributes["my_tilt_pos"] = int(data["myTiltPos"])
-                upd = True
-        if upd:
-            if self._has_lift:
-                self._attr_current_cover_position = self.current_cover_position
-            if self._has_tilt:
-                self._attr_current_cover_tilt_position = (
-                    self.current_cover_tilt_position
-                )
-            self.async_write_ha_state()
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to the state changes for the shade."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._controller.async_add_state_listener(
+                KIND_SHADE, self._shade_id, self._handle_state_delta
+            )
+        )
+        self._track_motion(self._state.direction != 0)
 
-    def _handle_state_command(self, data) -> None:
-        """Handle the state when a frame command is sent."""
-        upd = False
-        if "remoteAddress" in data and self._state_attributes.get(
-            "remote_address", 0
-        ) != int(data["remoteAddress"]):
-            self._state_attributes["remote_address"] = int(data["remoteAddress"])
-            upd = True
-        if (
-            "cmd" in data
-            and self._state_attributes.get("last_cmd", None) != data["cmd"]
-        ):
-            self._state_attributes["last_cmd"] = data["cmd"]
-            upd = True
-        if (
-            "source" in data
-            and self._state_attributes.get("cmd_source", None) != data["source"]
-        ):
-            self._state_attributes["cmd_source"] = data["source"]
-            upd = True
-        if "sourceAddress" in data and self._state_attributes.get(
-            "cmd_address", 0
-        ) != int(data["sourceAddress"]):
-            self._state_attributes["cmd_address"] = int(data["sourceAddress"])
-            upd = True
-        self._state_attributes["cmd_fired"] = dt_util.as_timestamp(dt_util.utcnow())
+    @callback
+    def _handle_state_delta(self, state: ShadeState, changed: set[str]) -> None:
+        """Handle the fields that changed on the shade."""
+        if self.registry_entry.disabled:
+            return
+        if FIELD_MODEL in changed:
+            # The model is swapped by the api when the frame changes the shade setup.
+            model = self._model = self._controller.api.shade_models.get(
+                self._shade_id, self._model
+            )
+            self._attr_name = model.name
+            self._attr_device_class = model.device_class
+            self._attr_supported_features = model.supported_features
+        if "cmd_fired" in changed:
+            self._fire_command_event()
+        if "direction" in changed:
+            self._track_motion(state.direction != 0)
+        fields = _TILT_FIELDS if self._model.has_tilt else _LIFT_FIELDS
+        if not changed.isdisjoint(fields):
+            self._request_write(force=not changed <= _MOVING_FIELDS)
+
+    def _request_write(self, force: bool = False) -> None:
+        """Write the state within the write budget for the shade."""
+        state = self._state
+        if state.direction == 0 and state.tilt_direction != 0:
+            position, direction = state.tilt_position, state.tilt_direction
+        else:
+            position, direction = self.current_cover_position, state.direction
+        if not self._limiter.request(position, direction, force):
+            self._controller.writes_suppressed += 1
+
+    def _track_motion(self, moving: bool) -> None:
+        """Start or stop refreshing the interpolated position."""
+        if moving and self._unsub_motion is None:
+            self._unsub_motion = async_track_time_interval(
+                self.hass, self._async_refresh_motion, MOTION_REFRESH_INTERVAL
+            )
+        elif not moving and self._unsub_motion is not None:
+            self._unsub_motion()
+            self._unsub_motion = None
+
+    @callback
+    def _async_refresh_motion(self, now: datetime) -> None:
+        """Write the interpolated position while the shade is moving."""
+        estimate = self._motion.estimate(self._controller.clock())
+        if estimate is not None and estimate != self._last_estimate:
+            self._last_estimate = estimate
+            self._request_write()
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop refreshing the position when the shade is removed."""
+        self._track_motion(False)
+        self._limiter.cancel()
+        await super().async_will_remove_from_hass()
+
+    def _fire_command_event(self) -> None:
+        """Fire the bus event when a frame command is sent."""
+        state = self._state
         bus_data = {
             "entity_id": self.entity_id,
             "event_key": EVT_SHADECOMMAND,
             "name": self.name,
-            "source": self._state_attributes.get("cmd_source", ""),
-            "remote_address": self._state_attributes.get("remote_address", 0),
-            "source_address": self._state_attributes.get("cmd_address", 0),
-            "command": self._state_attributes.get("last_cmd", ""),
-            "timestamp": self._state_attributes.get("cmd_fired"),
+            "source": state.cmd_source or "",
+            "remote_address": state.remote_address or 0,
+            "source_address": state.cmd_address or 0,
+            "command": state.last_cmd or "",
+            "timestamp": state.cmd_fired,
         }
         self.hass.bus.async_fire("espsomfy-rts_event", bus_data)
-        if upd:
-            self.async_write_ha_state()
 
+    @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         if self.registry_entry.disabled:
@@ -555,40 +653,11 @@ class ESPSomfyShade(ESPSomfyEntity, CoverEntity):
             ):
                 self._attr_available = bool(self._controller.data["connected"])
                 self.async_write_ha_state()
-        elif self._controller.data.get("shadeId") == self._shade_id:
-            if evt == EVT_SHADESTATE:
-                self._handle_state_update(self._controller.data)
-            elif evt == EVT_SHADEREMOVED:
-                self._attr_available = False
-            elif evt == EVT_SHADECOMMAND:
-                if "remoteAddress" in self._controller.data:
-                    self._state_attributes["remote_address"] = self._controller.data[
-                        "remoteAddress"
-                    ]
-                if "cmd" in self._controller.data:
-                    self._state_attributes["last_cmd"] = self._controller.data["cmd"]
-                if "source" in self._controller.data:
-                    self._state_attributes["cmd_source"] = self._controller.data[
-                        "source"
-                    ]
-                if "sourceAddress" in self._controller.data:
-                    self._state_attributes["cmd_address"] = self._controller.data[
-                        "sourceAddress"
-                    ]
-                self._state_attributes["cmd_fired"] = dt_util.as_timestamp(
-                    dt_util.utcnow()
-                )
-                bus_data = {
-                    "entity_id": self.entity_id,
-                    "event_key": EVT_SHADECOMMAND,
-                    "name": self.name,
-                    "source": self._state_attributes.get("cmd_source", ""),
-                    "remote_address": self._state_attributes.get("remote_address", 0),
-                    "source_address": self._state_attributes.get("cmd_address", 0),
-                    "command": self._state_attributes.get("last_cmd", ""),
-                    "timestamp": self._state_attributes.get("cmd_fired"),
-                }
-                self.hass.bus.async_fire("espsomfy-rts_event", bus_data)
+        elif (
+            evt == EVT_SHADEREMOVED
+            and self._controller.data.get("shadeId") == self._shade_id
+        ):
+            self._attr_available = False
             self.async_write_ha_state()
 
     @property
@@ -608,7 +677,7 @@ class ESPSomfyShade(ESPSomfyEntity, CoverEntity):
             return self._attr_icon
         if hasattr(self, "entity_description"):
             return self.entity_description.icon
-        if self._attr_device_class == CoverDeviceClass.AWNING:
+        if self._model.is_awning:
             if self.is_closed:
                 return "mdi:storefront-outline"
             return "mdi:storefront"
@@ -617,103 +686,77 @@ class ESPSomfyShade(ESPSomfyEntity, CoverEntity):
     @property
     def current_cover_position(self) -> int | None:
         """Return the current position of the shade."""
-        if self._flip_position is True:
-            if self._attr_device_class == CoverDeviceClass.AWNING:
-                return 100 - self._position
-            return self._position
-        if self._attr_device_class == CoverDeviceClass.AWNING:
-            return self._position
-        return 100 - self._position
+        position = self._state.position
+        if self._state.direction != 0:
+            # Fill in the position between frames while the shade is moving.
+            estimate = self._motion.estimate(self._controller.clock())
+            if estimate is not None:
+                position = estimate
+        return self._model.position(position)
 
     @property
     def current_cover_tilt_position(self) -> int | None:
         """Return current position of cover tilt. 0 is closed, 100 is open."""
-        if not self._has_tilt:
+        if not self._model.has_tilt:
             return None
-        if self._flip_position is True:
-            return self._tilt_position
-        return 100 - self._tilt_position
+        return self._model.tilt_position(self._state.tilt_position)
 
     @property
     def is_opening(self) -> bool:
         """Return true if cover is opening."""
-        if self._tilt_type == 3:
-            if self._tilt_direction == 0:
-                return False
-            if self._tilt_direction == 1 and self._tilt_position < 50:
-                return True
-            if self._tilt_direction == 1 and self._tilt_position >= 50:
-                return False
-            if self._tilt_direction == -1 and self._tilt_position < 50:
-                return False
-            if self._tilt_direction == -1 and self._tilt_position >= 50:
-                return True
-
-        if self._attr_device_class == CoverDeviceClass.AWNING:
-            return self._direction == 1
-        return self._direction == -1 or self._tilt_direction == -1
+        return self._model.is_opening(self._state)
 
     @property
     def is_closing(self) -> bool:
         """Return true if cover is closing."""
-        if self._tilt_type == 3:
-            if self._tilt_direction == 0:
-                return False
-            if self._tilt_direction == 1 and self._tilt_position < 50:
-                return False
-            if self._tilt_direction == 1 and self._tilt_position >= 50:
-                return True
-            if self._tilt_direction == -1 and self._tilt_position < 50:
-                return True
-            if self._tilt_direction == -1 and self._tilt_position >= 50:
-                return False
-
-        if self._attr_device_class == CoverDeviceClass.AWNING:
-            return self._direction == -1
-        return self._direction == 1 or self._tilt_direction == 1
+        return self._model.is_closing(self._state)
 
     @property
     def is_closed(self) -> bool:
         """Return true if cover is closed."""
-        if self._tilt_type == 3:
-            return self._tilt_position in (0, 100)
-        if self._flip_position is True:
-            if self._attr_device_class == CoverDeviceClass.AWNING:
-                return self._position == 100
-            return self._position == 0
-        if self._attr_device_class == CoverDeviceClass.AWNING:
-            return self._position == 0
-        return (self._position == 100 or not self._has_lift) and (
-            self._tilt_position == 100 or not self._has_tilt
-        )
+        return self._model.is_closed(self._state)
 
     @property
     def is_open(self) -> bool:
         """Return true if cover is closed."""
-        if self._tilt_type == 3:
-            return self._tilt_position < 100 and self._tilt_position > 0
-
-        if self._flip_position is True:
-            if self._attr_device_class == CoverDeviceClass.AWNING:
-                return self._position == 0
-            return self._position == 100
-        if self._attr_device_class == CoverDeviceClass.AWNING:
-            return self._position == 100
-        return (self._position == 0 or not self._has_lift) and (
-            self._tilt_position == 0 or not self._has_tilt
-        )
+        return self._model.is_open(self._state)
 
     @property
     def extra_state_attributes(self) -> Mapping[str, Any] | None:
         """Return entity specific state attributes."""
-        return self._state_attributes
+        state = self._state
+        attrs: dict[str, Any] = {}
+        if state.remote_address is not None:
+            attrs["remote_address"] = state.remote_address
+        if state.target is not None:
+            attrs["target"] = state.target
+        if state.my_pos is not None:
+            attrs["my_pos"] = state.my_pos
+        if self._model.has_tilt:
+            if state.tilt_target is not None:
+                attrs["tilt_target"] = state.tilt_target
+            if state.my_tilt_pos is not None:
+                attrs["my_tilt_pos"] = state.my_tilt_pos
+        if state.last_cmd is not None:
+            attrs["last_cmd"] = state.last_cmd
+        if state.cmd_source is not None:
+            attrs["cmd_source"] = state.cmd_source
+        if state.cmd_address is not None:
+            attrs["cmd_address"] = state.cmd_address
+        if state.cmd_fired is not None:
+            attrs["cmd_fired"] = state.cmd_fired
+        if state.direction != 0:
+            now = self._controller.clock()
+            if (remaining := self._motion.remaining(now)) is not None:
+                attrs["estimated_arrival"] = round(now + remaining)
+        if state.restored:
+            attrs[ATTR_RESTORED] = True
+        return attrs
 
     @property
     def is_toggle(self) -> bool:
         """Determine if the shade type uses a toggle."""
-        if self._shade_type in (5, 14, 15, 16):
-            return True
-        return False
+        return self._model.is_toggle
 
     def update_supported_features(self) -> None:
         """Update the supported features."""
@@ -722,8 +765,8 @@ class ESPSomfyShade(ESPSomfyEntity, CoverEntity):
                 self._attr_supported_features |= CoverEntityFeature.STOP
                 self._attr_supported_features &= ~CoverEntityFeature.OPEN
                 self._attr_supported_features &= ~CoverEntityFeature.CLOSE
-                if self._direction != 0:
-                    self._last_direction = self._direction
+                if self._state.direction != 0:
+                    self._last_direction = self._state.direction
             else:
                 self._attr_supported_features &= ~CoverEntityFeature.STOP
                 if self.is_closed:
@@ -741,28 +784,21 @@ class ESPSomfyShade(ESPSomfyEntity, CoverEntity):
 
     async def async_set_cover_tilt_position(self, **kwargs: Any) -> None:
         """Set the tilt postion."""
-        if self._flip_position is True:
-            await self._controller.api.position_tilt(
-                self._shade_id, int(kwargs[ATTR_TILT_POSITION])
-            )
-        else:
-            await self._controller.api.position_tilt(
-                self._shade_id, 100 - int(kwargs[ATTR_TILT_POSITION])
-            )
+        await self._controller.api.position_tilt(
+            self._shade_id, self._model.tilt_position(int(kwargs[ATTR_TILT_POSITION]))
+        )
 
     async def async_open_cover_tilt(self, **kwargs: Any) -> None:
         """Open the tilt position."""
-        if self._flip_position is True:
-            await self._controller.api.position_tilt(self._shade_id, 100)
-        else:
-            await self._controller.api.position_tilt(self._shade_id, 0)
+        await self._controller.api.position_tilt(
+            self._shade_id, self._model.tilt_position(100)
+        )
 
     async def async_close_cover_tilt(self, **kwargs: Any) -> None:
         """Close the tilt position."""
-        if self._flip_position is True:
-            await self._controller.api.position_tilt(self._shade_id, 0)
-        else:
-            await self._controller.api.position_tilt(self._shade_id, 100)
+        await self._controller.api.position_tilt(
+            self._shade_id, self._model.tilt_position(0)
+        )
 
     async def async_stop_cover_tilt(self, **kwargs: Any) -> None:
         """Stop tilting a tilt only shade."""
@@ -770,24 +806,9 @@ class ESPSomfyShade(ESPSomfyEntity, CoverEntity):
 
     async def async_set_cover_position(self, **kwargs: Any) -> None:
         """Set the cover position."""
-        if self._flip_position is True:
-            if self._attr_device_class == CoverDeviceClass.AWNING:
-                await self._controller.api.position_shade(
-                    self._shade_id, 100 - int(kwargs[ATTR_POSITION])
-                )
-            else:
-                await self._controller.api.position_shade(
-                    self._shade_id, int(kwargs[ATTR_POSITION])
-                )
-            return
-        if self._attr_device_class == CoverDeviceClass.AWNING:
-            await self._controller.api.position_shade(
-                self._shade_id, int(kwargs[ATTR_POSITION])
-            )
-        else:
-            await self._controller.api.position_shade(
-                self._shade_id, 100 - int(kwargs[ATTR_POSITION])
-            )
+        await self._controller.api.position_shade(
+            self._shade_id, self._model.position(int(kwargs[ATTR_POSITION]))
+        )
 
     async def async_open_cover(self, **kwargs: Any) -> None:
         """Open the cover."""
@@ -796,11 +817,11 @@ class ESPSomfyShade(ESPSomfyEntity, CoverEntity):
         # if the type is an awning.
         # print(f"Opening Cover id#{self._shade_id} {self._attr_device_class}")
         if self.is_toggle:
-            if self._direction in (0, 1):
+            if self._state.direction in (0, 1):
                 await self._controller.api.shade_command(
                     {"shadeId": self._shade_id, "command": "toggle"}
                 )
-        elif self._attr_device_class == CoverDeviceClass.AWNING:
+        elif self._model.is_awning:
             await self._controller.api.close_shade(self._shade_id)
         else:
             await self._controller.api.open_shade(self._shade_id)
@@ -812,7 +833,7 @@ class ESPSomfyShade(ESPSomfyEntity, CoverEntity):
             await self._controller.api.shade_command(
                 {"shadeId": self._shade_id, "command": "toggle"}
             )
-        elif self._attr_device_class == CoverDeviceClass.AWNING:
+        elif self._model.is_awning:
             await self._controller.api.open_shade(self._shade_id)
         else:
             await self._controller.api.close_shade(self._shade_id)
@@ -829,24 +850,9 @@ class ESPSomfyShade(ESPSomfyEntity, CoverEntity):
 
     async def async_set_current_position(self, **kwargs: Any) -> None:
         """Set the current position for the device without moving it."""
-        if self._flip_position is True:
-            if self._attr_device_class == CoverDeviceClass.AWNING:
-                await self._controller.api.set_current_position(
-                    self._shade_id, 100 - int(kwargs[ATTR_POSITION])
-                )
-            else:
-                await self._controller.api.set_current_position(
-                    self._shade_id, int(kwargs[ATTR_POSITION])
-                )
-            return
-        if self._attr_device_class == CoverDeviceClass.AWNING:
-            await self._controller.api.set_current_position(
-                self._shade_id, int(kwargs[ATTR_POSITION])
-            )
-        else:
-            await self._controller.api.set_current_position(
-                self._shade_id, 100 - int(kwargs[ATTR_POSITION])
-            )
+        await self._controller.api.set_current_position(
+            self._shade_id, self._model.position(int(kwargs[ATTR_POSITION]))
+        )
 
     async def async_set_current_tilt_position(self, **kwargs: Any) -> None:
         """Set the current tilt position for the device without moving it."""
@@ -879,3 +885,19 @@ class ESPSomfyShade(ESPSomfyEntity, CoverEntity):
         if ATTR_REPEAT in kwargs:
             cmd[ATTR_REPEAT] = kwargs[ATTR_REPEAT]
         await self._controller.api.shade_command(cmd)
+
+
+@cache
+def _shade_class(recorded: frozenset[str]) -> type[ESPSomfyShade]:
+    """Get a shade class that keeps only the chosen volatile attributes.
+
+    The recorder reads the unrecorded attributes from the class so a subclass
+    is made for each choice of attributes that are kept.
+    """
+    if not (unrecorded := frozenset(VOLATILE_ATTRIBUTES) - recorded):
+        return ESPSomfyShade
+    return type(
+        ESPSomfyShade.__name__,
+        (ESPSomfyShade,),
+        {"_unrecorded_attributes": unrecorded},
+    )
@@ -0,0 +1,50 @@
+"""Diagnostics support for ESPSomfy RTS."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .connection import async_get_connection_manager
+from .const import DOMAIN
+from .controller import ESPSomfyController
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return the startup timings and runtime counters for a hub."""
+    controller: ESPSomfyController = hass.data[DOMAIN][entry.entry_id]
+    api = controller.api
+    return {
+        "startup": dict(api.startup.phases),
+        "from_cache": api.from_cache,
+        "resolver": {
+            "lookups": api.resolver.lookups,
+            "failures": api.resolver.failures,
+            "last_latency": api.resolver.last_latency,
+        },
+        "requests": {
+            "sent": api.requests.requests,
+            "coalesced": api.requests.coalesced,
+        },
+        "connected": controller.connected,
+        "socket_connected": controller.socket_connected,
+        "socket": async_get_connection_manager(hass).stats(entry.entry_id),
+        "polling": {
+            "active": controller.poller.active,
+            "healthy": controller.poller.healthy,
+            "polls": controller.poller.polls,
+            "failures": controller.poller.failures,
+        },
+        "shades": len(api.shade_models),
+        "groups": len(api.group_models),
+        "stale_refreshes": controller.stale_detector.refreshes,
+        "store_version": controller.store.version,
+        "frames_received": controller.frames_received,
+        "frames_unchanged": controller.frames_unchanged,
+        "state_writes": controller.state_writes,
+        "writes_suppressed": controller.writes_suppressed,
+    }
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from homeassistant.core import callback
 from homeassistant.helpers.entity import DeviceInfo, Entity
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
@@ -22,6 +23,20 @@ class ESPSomfyEntity(CoordinatorEntity[ESPSomfyController], Entity):
         """Indicates that the entity should not poll."""
         return False
 
+    def async_write_ha_state(self) -> None:
+        """Write the state to the state machine and count the write."""
+        self.controller.state_writes += 1
+        super().async_write_ha_state()
+
+    @callback
+    def async_rename(self, name: str) -> None:
+        """Take the new name of the shade or group the entity belongs to."""
+        if name == self._attr_name:
+            return
+        self._attr_name = name
+        if self.hass is not None:
+            self.async_write_ha_state()
+
     @property
     def device_info(self) -> DeviceInfo | None:
         """Device info."""
@@ -0,0 +1,70 @@
+"""Coalesced GET requests to the ESPSomfy RTS hub."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from typing import Any, NamedTuple
+
+import aiohttp
+
+from homeassistant.util.json import json_loads
+
+
+class FetchResult(NamedTuple):
+    """The response to a GET along with a digest of its body."""
+
+    status: int
+    body: bytes
+    digest: bytes
+
+    def json(self) -> Any:
+        """Decode the body."""
+        return json_loads(self.body)
+
+    def text(self) -> str:
+        """Get the body as text."""
+        return self.body.decode(errors="replace")
+
+
+class RequestCoalescer:
+    """Shares a single GET among the callers that ask for the same url at once.
+
+    The hub only has to answer one request however many callers overlap and
+    the digest lets the callers tell whether the content has changed.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the coalescer."""
+        self._inflight: dict[str, asyncio.Task[FetchResult]] = {}
+        self.requests = 0
+        self.coalesced = 0
+
+    async def async_get(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        headers: dict[str, str] | None = None,
+    ) -> FetchResult:
+        """Get a url, joining the request for it that is in flight."""
+        task = self._inflight.get(url)
+        if task is None:
+            self.requests += 1
+            task = self._inflight[url] = asyncio.ensure_future(
+                self._async_fetch(session, url, headers)
+            )
+            task.add_done_callback(lambda _task: self._inflight.pop(url, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    @staticmethod
+    async def _async_fetch(
+        session: aiohttp.ClientSession, url: str, headers: dict[str, str] | None
+    ) -> FetchResult:
+        """Send the request and read the whole body."""
+        async with session.get(url, headers=headers) as resp:
+            body = await resp.read()
+            return FetchResult(
+                resp.status, body, hashlib.blake2b(body, digest_size=16).digest()
+            )
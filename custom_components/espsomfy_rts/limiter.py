@@ -0,0 +1,87 @@
+"""Write budget for entities that report a moving position."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+import time
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+
+class StateWriteLimiter:
+    """Limits how often an entity writes its state while it is moving.
+
+    A change of direction, including the stop that leaves the entity at its
+    resting state, is always written immediately.  While moving, positions
+    inside the deadband of the last written position are dropped and the
+    remaining writes are spaced out to the rate budget.  A write that is held
+    back by the budget is flushed as soon as the budget allows it so the
+    latest state always reaches the state machine.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        write: Callable[[], None],
+        max_rate: float,
+        deadband: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize the limiter with writes per second and a position deadband."""
+        self._hass = hass
+        self._write = write
+        self._clock = clock
+        self._interval = 1 / max_rate if max_rate > 0 else 0.0
+        self._deadband = deadband
+        self._last_time = 0.0
+        self._last_position: int | None = None
+        self._last_direction = 0
+        self._pending: tuple[int, int] | None = None
+        self._unsub_flush: CALLBACK_TYPE | None = None
+
+    @callback
+    def request(self, position: int, direction: int, force: bool = False) -> bool:
+        """Ask for a state write and return whether it was written now."""
+        if force or direction == 0 or direction != self._last_direction:
+            self._flush(position, direction)
+            return True
+        if (
+            self._last_position is not None
+            and abs(position - self._last_position) < self._deadband
+        ):
+            return False
+        # A clock that stepped back never holds a write for more than the budget.
+        wait = min(self._last_time + self._interval - self._clock(), self._interval)
+        if wait <= 0:
+            self._flush(position, direction)
+            return True
+        self._pending = (position, direction)
+        if self._unsub_flush is None:
+            self._unsub_flush = async_call_later(
+                self._hass, wait, self._async_flush_pending
+            )
+        return False
+
+    @callback
+    def _async_flush_pending(self, _now) -> None:
+        """Write the state that was held back by the budget."""
+        self._unsub_flush = None
+        if self._pending is not None:
+            self._flush(*self._pending)
+
+    def _flush(self, position: int, direction: int) -> None:
+        """Write the state now."""
+        self.cancel()
+        self._last_time = self._clock()
+        self._last_position = position
+        self._last_direction = direction
+        self._write()
+
+    @callback
+    def cancel(self) -> None:
+        """Drop any write that is waiting on the budget."""
+        self._pending = None
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
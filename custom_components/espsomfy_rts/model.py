@@ -0,0 +1,256 @@
+"""Normalized shade and group models compiled from the discovery payload."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.components.cover import CoverDeviceClass, CoverEntityFeature
+
+if TYPE_CHECKING:
+    from .store import ShadeState
+
+# Keys on a shadeState frame that change how the shade is modeled.
+SHADE_CONFIG_KEYS = ("flipPosition", "hasTilt", "tiltType")
+
+_LIFT_FEATURES = (
+    CoverEntityFeature.OPEN
+    | CoverEntityFeature.CLOSE
+    | CoverEntityFeature.STOP
+    | CoverEntityFeature.SET_POSITION
+)
+_TILT_FEATURES = (
+    CoverEntityFeature.OPEN_TILT
+    | CoverEntityFeature.CLOSE_TILT
+    | CoverEntityFeature.SET_TILT_POSITION
+)
+
+
+def _same(value: int) -> int:
+    return value
+
+
+def _invert(value: int) -> int:
+    return 100 - value
+
+
+@dataclass(frozen=True, slots=True)
+class ShadeModel:
+    """Immutable description of a shade as reported by the hub."""
+
+    shade_id: int
+    name: str
+    shade_type: int
+    tilt_type: int
+    room_id: int
+    device_class: CoverDeviceClass
+    supported_features: CoverEntityFeature
+    has_lift: bool
+    has_tilt: bool
+    tilt_only: bool
+    flip_position: bool
+    flip_commands: bool
+    is_awning: bool
+    is_toggle: bool
+    is_dry_contact: bool
+    has_sun_sensor: bool
+    has_wind_sensor: bool
+    has_sun_switch: bool
+    # Raw device positions that are reported as fully closed and fully open.
+    closed_position: int
+    open_position: int
+    # Whether the tilt must also be at its limit for the shade to be closed or open.
+    tilt_limits: bool
+    # The lift direction that moves the cover open.
+    opening_direction: int
+    # Whether a moving tilt also reports the cover as opening or closing.
+    tilt_moves: bool
+    # Position transforms between the device and Home Assistant.  These are
+    # symmetric so the same function is used in both directions.
+    position: Callable[[int], int]
+    tilt_position: Callable[[int], int]
+    # The payload changes with every position so it is not part of the identity.
+    raw: Any = field(compare=False)
+
+    def is_opening(self, state: ShadeState) -> bool:
+        """Return true if the state has the shade opening."""
+        if self.tilt_only:
+            return (state.tilt_direction == 1 and state.tilt_position < 50) or (
+                state.tilt_direction == -1 and state.tilt_position >= 50
+            )
+        return state.direction == self.opening_direction or (
+            self.tilt_moves and state.tilt_direction == -1
+        )
+
+    def is_closing(self, state: ShadeState) -> bool:
+        """Return true if the state has the shade closing."""
+        if self.tilt_only:
+            return (state.tilt_direction == 1 and state.tilt_position >= 50) or (
+                state.tilt_direction == -1 and state.tilt_position < 50
+            )
+        return state.direction == -self.opening_direction or (
+            self.tilt_moves and state.tilt_direction == 1
+        )
+
+    def is_closed(self, state: ShadeState) -> bool:
+        """Return true if the state has the shade closed."""
+        if self.tilt_only:
+            return state.tilt_position in (0, 100)
+        return state.position == self.closed_position and (
+            state.tilt_position == 100 or not self.tilt_limits
+        )
+
+    def is_open(self, state: ShadeState) -> bool:
+        """Return true if the state has the shade fully open."""
+        if self.tilt_only:
+            return 0 < state.tilt_position < 100
+        return state.position == self.open_position and (
+            state.tilt_position == 0 or not self.tilt_limits
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class GroupModel:
+    """Immutable description of a group as reported by the hub."""
+
+    group_id: int
+    name: str
+    room_id: int
+    linked_shade_ids: tuple[int, ...]
+    flip_position: bool
+    process_individual: bool
+    has_sun_sensor: bool
+    raw: Any = field(compare=False)
+
+
+def compile_shade(data: Any) -> ShadeModel:
+    """Compile the discovery data for a shade into a model."""
+    shade_type = int(data.get("shadeType", 0))
+    tilt_type = int(data.get("tiltType", 0))
+    flip_position = data.get("flipPosition") is True
+    has_lift = True
+    has_tilt = data.get("hasTilt") is True
+    features = _LIFT_FEATURES
+    if has_tilt:
+        features |= _TILT_FEATURES
+    match tilt_type:
+        case 1 | 2 | 4:
+            has_tilt = True
+            features |= _TILT_FEATURES
+        case 3:
+            has_tilt = True
+            has_lift = False
+            features = _TILT_FEATURES | CoverEntityFeature.STOP_TILT
+
+    match shade_type:
+        case 1:
+            device_class = CoverDeviceClass.BLIND
+        case 2 | 7 | 8:
+            device_class = CoverDeviceClass.CURTAIN
+        case 3:
+            device_class = CoverDeviceClass.AWNING
+        case 4:
+            device_class = CoverDeviceClass.SHUTTER
+        case 5:
+            device_class = CoverDeviceClass.GARAGE
+            features = CoverEntityFeature.STOP
+        case 6:
+            device_class = CoverDeviceClass.GARAGE
+        case 11 | 12 | 13:
+            device_class = CoverDeviceClass.GATE
+        case 14 | 15 | 16:
+            device_class = CoverDeviceClass.GATE
+            features = CoverEntityFeature.OPEN | CoverEntityFeature.CLOSE
+        case _:
+            device_class = CoverDeviceClass.SHADE
+
+    is_awning = device_class == CoverDeviceClass.AWNING
+    # Awnings extend as the position increases and flipped shades report their
+    # position the other way around so when both are set they cancel each other.
+    invert = flip_position == is_awning
+    if "sunSensor" in data:
+        has_sun_sensor = data["sunSensor"] is True
+        has_wind_sensor = has_sun_sensor or shade_type == 3
+        has_sun_switch = has_sun_sensor
+    else:
+        has_sun_sensor = has_wind_sensor = has_sun_switch = shade_type == 3
+
+    return ShadeModel(
+        shade_id=int(data["shadeId"]),
+        name=data["name"],
+        shade_type=shade_type,
+        tilt_type=tilt_type,
+        room_id=int(data.get("roomId", 0)),
+        device_class=device_class,
+        supported_features=features,
+        has_lift=has_lift,
+        has_tilt=has_tilt,
+        tilt_only=tilt_type == 3,
+        flip_position=flip_position,
+        flip_commands=bool(data.get("flipCommands", False)),
+        is_awning=is_awning,
+        is_toggle=shade_type in (5, 14, 15, 16),
+        is_dry_contact=shade_type in (9, 10),
+        has_sun_sensor=has_sun_sensor,
+        has_wind_sensor=has_wind_sensor,
+        has_sun_switch=has_sun_switch,
+        closed_position=100 if invert else 0,
+        open_position=0 if invert else 100,
+        tilt_limits=has_tilt and not flip_position and not is_awning,
+        opening_direction=1 if is_awning else -1,
+        tilt_moves=has_tilt and not is_awning,
+        position=_invert if invert else _same,
+        tilt_position=_same if flip_position else _invert,
+        raw=data,
+    )
+
+
+def compile_group(data: Any) -> GroupModel:
+    """Compile the discovery data for a group into a model."""
+    linked: list[int] = []
+    flipped = 0
+    notflipped = 0
+    for linked_shade in data.get("linkedShades", []):
+        if (
+            "shadeType" in linked_shade
+            and int(linked_shade["shadeType"]) == 3
+            or (
+                "flipPosition" in linked_shade
+                and bool(linked_shade["flipPosition"]) is True
+            )
+        ):
+            flipped = flipped + 1
+        else:
+            notflipped = notflipped + 1
+        linked.append(int(linked_shade["shadeId"]))
+    return GroupModel(
+        group_id=int(data["groupId"]),
+        name=data["name"],
+        room_id=int(data.get("roomId", 0)),
+        linked_shade_ids=tuple(linked),
+        flip_position=flipped > 0 and notflipped == 0,
+        process_individual=flipped > 0 and notflipped > 0,
+        has_sun_sensor=data.get("sunSensor") is True,
+        raw=data,
+    )
+
+
+def compile_shades(shades: Any) -> dict[int, ShadeModel]:
+    """Compile all the shades that carry enough data to be modeled."""
+    models: dict[int, ShadeModel] = {}
+    for shade in shades:
+        if "shadeId" in shade and "name" in shade:
+            model = compile_shade(shade)
+            models[model.shade_id] = model
+    return models
+
+
+def compile_groups(groups: Any) -> dict[int, GroupModel]:
+    """Compile all the groups that carry enough data to be modeled."""
+    models: dict[int, GroupModel] = {}
+    for group in groups:
+        if "groupId" in group and "name" in group:
+            model = compile_group(group)
+            models[model.group_id] = model
+    return models
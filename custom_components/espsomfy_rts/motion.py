@@ -0,0 +1,112 @@
+"""Motion model that estimates shade positions between state frames."""
+
+from __future__ import annotations
+
+# Ignore moves that are too short to say anything about the travel speed.
+MIN_LEARN_DISTANCE = 10
+MIN_LEARN_SECONDS = 1.0
+# Weight given to a new observation when blending it into the learned rate.
+LEARN_WEIGHT = 0.5
+
+
+class MotionModel:
+    """Learns the travel speed of a shade and interpolates its position.
+
+    Positions are raw device positions where a direction of 1 moves the
+    position towards 100 and -1 moves it towards 0.  Rates are learned
+    separately for each direction in percent per second.
+    """
+
+    __slots__ = (
+        "rates",
+        "direction",
+        "target",
+        "_start_time",
+        "_start_position",
+        "_anchor_time",
+        "_anchor_position",
+    )
+
+    def __init__(self) -> None:
+        """Initialize a motion model that has not learned anything yet."""
+        self.rates: dict[int, float] = {}
+        self.direction = 0
+        self.target: int | None = None
+        self._start_time = 0.0
+        self._start_position = 0
+        self._anchor_time = 0.0
+        self._anchor_position = 0
+
+    @property
+    def moving(self) -> bool:
+        """Indicates whether the shade is currently moving."""
+        return self.direction != 0
+
+    def observe(
+        self, position: int, direction: int, target: int | None, now: float
+    ) -> None:
+        """Correct the model from a state frame."""
+        if direction != self.direction:
+            if self.direction != 0:
+                self._learn(position, now)
+            if direction != 0:
+                self._start_time = now
+                self._start_position = position
+        self.direction = direction
+        self.target = target
+        self._anchor_time = now
+        self._anchor_position = position
+
+    def _learn(self, position: int, now: float) -> None:
+        """Learn the rate from a completed move."""
+        distance = abs(position - self._start_position)
+        elapsed = now - self._start_time
+        if distance < MIN_LEARN_DISTANCE or elapsed < MIN_LEARN_SECONDS:
+            return
+        rate = distance / elapsed
+        if (learned := self.rates.get(self.direction)) is not None:
+            rate = learned + (rate - learned) * LEARN_WEIGHT
+        self.rates[self.direction] = rate
+
+    def _rate(self) -> float | None:
+        """Get the rate for the current move.
+
+        Until a direction has been learned the rate from the other direction is
+        a better guess than nothing at all.
+        """
+        if (rate := self.rates.get(self.direction)) is not None:
+            return rate
+        return self.rates.get(-self.direction)
+
+    def _limit(self) -> int:
+        """Get the position where the current move will stop."""
+        if self.target is not None:
+            return self.target
+        return 100 if self.direction > 0 else 0
+
+    def estimate(self, now: float) -> int | None:
+        """Estimate the current position or None when it cannot be estimated."""
+        if self.direction == 0 or (rate := self._rate()) is None:
+            return None
+        position = self._anchor_position + self.direction * rate * (
+            now - self._anchor_time
+        )
+        limit = self._limit()
+        if self.direction > 0:
+            position = min(position, limit)
+        else:
+            position = max(position, limit)
+        return round(min(max(position, 0), 100))
+
+    def remaining(self, now: float) -> float | None:
+        """Estimate the seconds until the shade reaches the end of its move."""
+        if self.direction == 0 or (rate := self._rate()) is None:
+            return None
+        distance = abs(self._limit() - self._anchor_position)
+        return max(distance / rate - (now - self._anchor_time), 0.0)
+
+    def travel_time(self, direction: int) -> float | None:
+        """Get the learned time for a full 0-100 move in a direction."""
+        if (rate := self.rates.get(direction)) is None:
+            return None
+        return 100 / rate
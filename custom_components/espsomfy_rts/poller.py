@@ -0,0 +1,89 @@
+"""HTTP polling fallback for when the ESPSomfy RTS socket is down."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING
+
+import aiohttp
+
+from homeassistant.core import callback
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from .controller import ESPSomfyController
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds the socket gets to come back before polling starts.
+POLL_GRACE = 15
+POLL_MOVING_INTERVAL = 2
+POLL_IDLE_INTERVAL = 30
+POLL_MAX_INTERVAL = 300
+
+
+class ShadePoller:
+    """Polls the shades and groups while the socket is unavailable.
+
+    The interval is short while any shade is moving and long while they are
+    all at rest.  Failed polls back off until the longest interval.  The
+    poller is stopped as soon as the socket connects again.
+    """
+
+    def __init__(self, controller: ESPSomfyController) -> None:
+        """Initialize the poller for a hub."""
+        self._controller = controller
+        self._task: asyncio.Task | None = None
+        self.healthy = False
+        self.polls = 0
+        self.failures = 0
+
+    @property
+    def active(self) -> bool:
+        """Indicates whether the hub is being polled."""
+        return self._task is not None
+
+    @callback
+    def async_start(self) -> None:
+        """Start polling after the grace period unless it is already running."""
+        if self._task is None:
+            self._task = self._controller.hass.async_create_background_task(
+                self._async_run(), f"{DOMAIN}_poll_{self._controller.config_entry_id}"
+            )
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop polling."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.healthy = False
+
+    async def _async_run(self) -> None:
+        """Poll the hub until the poller is stopped."""
+        delay: float = POLL_GRACE
+        failures = 0
+        while True:
+            await asyncio.sleep(delay)
+            self.polls += 1
+            try:
+                healthy = await self._controller.async_poll()
+            except (aiohttp.ClientError, TimeoutError) as err:
+                _LOGGER.debug("Polling ESPSomfy RTS failed: %s", err)
+                healthy = False
+            if healthy:
+                failures = 0
+                delay = (
+                    POLL_MOVING_INTERVAL
+                    if self._controller.is_moving
+                    else POLL_IDLE_INTERVAL
+                )
+            else:
+                self.failures += 1
+                failures += 1
+                delay = min(POLL_IDLE_INTERVAL * 2 ** (failures - 1), POLL_MAX_INTERVAL)
+            if healthy != self.healthy:
+                self.healthy = healthy
+                self._controller.set_polled(healthy)
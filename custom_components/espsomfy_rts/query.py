@@ -0,0 +1,260 @@
+"""Indexed shade queries across all the ESPSomfy RTS hubs."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from typing import TYPE_CHECKING
+
+import voluptuous as vol
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.helpers import config_validation as cv
+
+from .const import DOMAIN
+from .model import ShadeModel
+from .store import ESPSomfyStateStore, ShadeFlag
+
+if TYPE_CHECKING:
+    from .controller import ESPSomfyController
+
+SVC_QUERY_SHADES = "query_shades"
+
+ATTR_HUB = "hub"
+ATTR_ROOM = "room"
+ATTR_SHADE_TYPE = "shade_type"
+ATTR_MIN_POSITION = "min_position"
+ATTR_MAX_POSITION = "max_position"
+ATTR_WINDY = "windy"
+ATTR_SUNNY = "sunny"
+ATTR_SUN_FLAG = "sun_flag"
+
+NO_FLAGS = ShadeFlag(0)
+# Width of the position buckets in percent.
+POSITION_BUCKET_SIZE = 10
+
+QUERY_SHADES_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_HUB): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_ROOM): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_SHADE_TYPE): vol.All(cv.ensure_list, [vol.Coerce(int)]),
+        vol.Optional(ATTR_MIN_POSITION): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=100)
+        ),
+        vol.Optional(ATTR_MAX_POSITION): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=100)
+        ),
+        vol.Optional(ATTR_WINDY): cv.boolean,
+        vol.Optional(ATTR_SUNNY): cv.boolean,
+        vol.Optional(ATTR_SUN_FLAG): cv.boolean,
+    }
+)
+
+_FLAG_ATTRS = (
+    (ATTR_WINDY, ShadeFlag.WINDY),
+    (ATTR_SUNNY, ShadeFlag.SUNNY),
+    (ATTR_SUN_FLAG, ShadeFlag.SUN_FLAG),
+)
+
+
+class ShadeIndex:
+    """Secondary indexes over the shades on a single hub.
+
+    Positions are Home Assistant positions where 100 is fully open.  They are
+    kept in buckets so a range query only checks the shades that sit in the
+    buckets at the edges of the range.
+    """
+
+    def __init__(
+        self, models: Mapping[int, ShadeModel], store: ESPSomfyStateStore
+    ) -> None:
+        """Build the indexes for the shade models on a hub."""
+        self.models = models
+        self._store = store
+        self._rooms: dict[int, set[int]] = {}
+        self._types: dict[int, set[int]] = {}
+        self._buckets: dict[int, set[int]] = {}
+        self._keys: dict[int, tuple[int, int]] = {}
+        self._positions: dict[int, int] = {}
+        for model in models.values():
+            self.set_model(model)
+
+    def set_model(self, model: ShadeModel) -> None:
+        """Index a shade or move it to the entries for its new model."""
+        shade_id = model.shade_id
+        self.remove(shade_id)
+        self._rooms.setdefault(model.room_id, set()).add(shade_id)
+        self._types.setdefault(model.shade_type, set()).add(shade_id)
+        self._keys[shade_id] = (model.room_id, model.shade_type)
+        self.update_position(model)
+
+    def remove(self, shade_id: int) -> None:
+        """Remove a shade from the indexes."""
+        if (keys := self._keys.pop(shade_id, None)) is not None:
+            self._rooms[keys[0]].discard(shade_id)
+            self._types[keys[1]].discard(shade_id)
+        if (position := self._positions.pop(shade_id, None)) is not None:
+            self._buckets[position // POSITION_BUCKET_SIZE].discard(shade_id)
+
+    def update_position(self, model: ShadeModel) -> None:
+        """Move a shade to the bucket for its current position."""
+        shade_id = model.shade_id
+        position = model.position(self._store.shade(shade_id).position)
+        old = self._positions.get(shade_id)
+        if old == position:
+            return
+        if old is not None:
+            self._buckets[old // POSITION_BUCKET_SIZE].discard(shade_id)
+        self._positions[shade_id] = position
+        self._buckets.setdefault(position // POSITION_BUCKET_SIZE, set()).add(shade_id)
+
+    def _in_range(self, low: int, high: int) -> set[int]:
+        """Get the shades with a position between low and high inclusive."""
+        found: set[int] = set()
+        for bucket in range(
+            low // POSITION_BUCKET_SIZE, high // POSITION_BUCKET_SIZE + 1
+        ):
+            if not (ids := self._buckets.get(bucket)):
+                continue
+            start = bucket * POSITION_BUCKET_SIZE
+            if low <= start and start + POSITION_BUCKET_SIZE - 1 <= high:
+                found |= ids
+            else:
+                found.update(
+                    shade_id
+                    for shade_id in ids
+                    if low <= self._positions[shade_id] <= high
+                )
+        return found
+
+    def query(
+        self,
+        *,
+        room_ids: Iterable[int] | None = None,
+        shade_types: Iterable[int] | None = None,
+        min_position: int | None = None,
+        max_position: int | None = None,
+        flags_set: ShadeFlag = NO_FLAGS,
+        flags_clear: ShadeFlag = NO_FLAGS,
+    ) -> set[int]:
+        """Get the ids of the shades that match all of the filters."""
+        candidates: list[set[int] | frozenset[int]] = []
+        if room_ids is not None:
+            candidates.append(
+                set().union(*(self._rooms.get(room_id, ()) for room_id in room_ids))
+            )
+        if shade_types is not None:
+            candidates.append(
+                set().union(
+                    *(self._types.get(shade_type, ()) for shade_type in shade_types)
+                )
+            )
+        if min_position is not None or max_position is not None:
+            candidates.append(
+                self._in_range(
+                    0 if min_position is None else min_position,
+                    100 if max_position is None else max_position,
+                )
+            )
+        candidates.extend(self._store.flagged(flag) for flag in flags_set)
+        if not candidates:
+            matched = set(self._keys)
+        else:
+            # Start from the smallest set so the intersections stay cheap.
+            candidates.sort(key=len)
+            matched = set(candidates[0]).intersection(*candidates[1:])
+        for flag in flags_clear:
+            matched -= self._store.flagged(flag)
+        return matched
+
+
+def _room_ids(controller: ESPSomfyController, rooms: Iterable[str]) -> set[int]:
+    """Resolve room names or ids to the room ids on a hub."""
+    names = {str(room).casefold() for room in rooms}
+    room_ids = {int(room) for room in names if room.isdigit()}
+    for room in controller.api.get_config().get("rooms", []):
+        if str(room.get("name", "")).casefold() in names:
+            room_ids.add(int(room["roomId"]))
+    return room_ids
+
+
+@callback
+def async_query_shades(
+    hass: HomeAssistant,
+    *,
+    hubs: Iterable[str] | None = None,
+    rooms: Iterable[str] | None = None,
+    shade_types: Iterable[int] | None = None,
+    min_position: int | None = None,
+    max_position: int | None = None,
+    flags_set: ShadeFlag = NO_FLAGS,
+    flags_clear: ShadeFlag = NO_FLAGS,
+) -> list[str]:
+    """Get the entity ids of the shades on any hub that match all the filters.
+
+    Hubs are identified by their config entry id and rooms by name or id.
+    """
+    entity_ids: list[str] = []
+    controllers: dict[str, ESPSomfyController] = hass.data.get(DOMAIN, {})
+    for entry_id, controller in controllers.items():
+        if hubs is not None and entry_id not in hubs:
+            continue
+        shade_ids = controller.shade_index.query(
+            room_ids=None if rooms is None else _room_ids(controller, rooms),
+            shade_types=shade_types,
+            min_position=min_position,
+            max_position=max_position,
+            flags_set=flags_set,
+            flags_clear=flags_clear,
+        )
+        entity_ids.extend(
+            entity_id
+            for shade_id in sorted(shade_ids)
+            if (
+                entity_id := controller.entity_id_for(
+                    f"{controller.unique_id}_{shade_id}"
+                )
+            )
+            is not None
+        )
+    return entity_ids
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services that span all the hubs."""
+
+    @callback
+    def _async_query_shades(call: ServiceCall) -> ServiceResponse:
+        flags_set = flags_clear = NO_FLAGS
+        for attr, flag in _FLAG_ATTRS:
+            if attr in call.data:
+                if call.data[attr]:
+                    flags_set |= flag
+                else:
+                    flags_clear |= flag
+        return {
+            "entity_ids": async_query_shades(
+                hass,
+                hubs=call.data.get(ATTR_HUB),
+                rooms=call.data.get(ATTR_ROOM),
+                shade_types=call.data.get(ATTR_SHADE_TYPE),
+                min_position=call.data.get(ATTR_MIN_POSITION),
+                max_position=call.data.get(ATTR_MAX_POSITION),
+                flags_set=flags_set,
+                flags_clear=flags_clear,
+            )
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        SVC_QUERY_SHADES,
+        _async_query_shades,
+        schema=QUERY_SHADES_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
@@ -0,0 +1,126 @@
+"""Cached address resolution for ESPSomfy RTS hubs."""
+
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+
+from zeroconf import AddressResolverIPv4, IPVersion
+
+from homeassistant.components import zeroconf
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds a lookup gets before the host name is used as it is.
+RESOLVE_TIMEOUT = 5
+
+
+def is_ip_address(host: str) -> bool:
+    """Indicates whether a host is an IP address rather than a name."""
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+def is_mdns_name(host: str) -> bool:
+    """Indicates whether a host name is resolved over mDNS."""
+    return host.rstrip(".").lower().endswith(".local")
+
+
+class HostResolver:
+    """Resolves the host name of a hub once and keeps the address.
+
+    The address is only looked up again after a connection to it failed and
+    it keeps being used until that lookup succeeds.  Names such as
+    espsomfyrts.local are looked up over the shared zeroconf instance of Home
+    Assistant since the system resolver does not know about mDNS.  Zeroconf
+    announcements for the hub replace the address without a lookup.
+    """
+
+    def __init__(self, hass: HomeAssistant, host: str) -> None:
+        """Initialize the resolver for a host."""
+        self.hass = hass
+        self.host = host
+        self._address: str | None = host if is_ip_address(host) else None
+        # Set when a connection to the address failed.
+        self._stale = False
+        self._lock = asyncio.Lock()
+        self.lookups = 0
+        self.failures = 0
+        self.last_latency: float | None = None
+
+    @property
+    def address(self) -> str:
+        """Get the cached address or the host when it is not resolved."""
+        return self._address or self.host
+
+    async def async_resolve(self) -> str:
+        """Get the address for the host, looking it up when it is not cached.
+
+        A failed lookup keeps the address that was used before.
+        """
+        if self._address is not None and not self._stale:
+            return self._address
+        async with self._lock:
+            if self._address is not None and not self._stale:
+                # Another caller looked it up while this one waited.
+                return self._address
+            if (address := await self._async_lookup()) is not None:
+                self._address = address
+                self._stale = False
+        return self.address
+
+    async def _async_lookup(self) -> str | None:
+        """Look the host up and record how long it took."""
+        start = time.monotonic()
+        self.lookups += 1
+        try:
+            if is_mdns_name(self.host):
+                address = await self._async_query_mdns()
+            else:
+                address = await self._async_query_dns()
+        except (OSError, TimeoutError) as err:
+            self.failures += 1
+            _LOGGER.debug("Unable to resolve %s: %s", self.host, err)
+            return None
+        finally:
+            self.last_latency = round(time.monotonic() - start, 3)
+        _LOGGER.debug("Resolved %s to %s in %ss", self.host, address, self.last_latency)
+        return address
+
+    async def _async_query_dns(self) -> str:
+        """Look the host up with the system resolver."""
+        async with asyncio.timeout(RESOLVE_TIMEOUT):
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                self.host, None, family=socket.AF_INET, type=socket.SOCK_STREAM
+            )
+        return infos[0][4][0]
+
+    async def _async_query_mdns(self) -> str:
+        """Look the host up over mDNS, answering from the zeroconf cache first."""
+        aiozc = await zeroconf.async_get_async_instance(self.hass)
+        info = AddressResolverIPv4(f"{self.host.rstrip('.')}.")
+        if not await info.async_request(aiozc.zeroconf, RESOLVE_TIMEOUT * 1000):
+            raise TimeoutError(f"No mDNS answer for {self.host}")
+        return info.parsed_addresses(IPVersion.V4Only)[0]
+
+    def learn(self, address: str) -> bool:
+        """Take the address from an announcement and return whether it changed."""
+        if is_ip_address(self.host):
+            return False
+        self._stale = False
+        if address == self._address:
+            return False
+        self._address = address
+        return True
+
+    def invalidate(self) -> None:
+        """Look the address up again after a connection to it failed."""
+        if not is_ip_address(self.host):
+            self._stale = True
@@ -250,7 +250,7 @@ class ESPSomfyDiagSensor(ESPSomfyEntity, SensorEntity):
         """Initialize a new diagnostic sensor."""
         super().__init__(controller=controller, data=data)
         self._controller = controller
-        self._available = True
+        self._available = controller.connected is not False
         self.events = {}
 
         self._attr_entity_category = cfg.entity_category
@@ -336,7 +336,7 @@ class ESPSomfyWifiStrengthSensor(ESPSomfyDiagSensor):
             ),
             data=data,
         )
-        self._available = True
+        self._available = controller.connected is not False
 
     @property
     def should_poll(self) -> bool:
@@ -0,0 +1,120 @@
+"""Compact snapshots of the shade and group state for dashboards."""
+
+from __future__ import annotations
+
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any
+
+from aiohttp import hdrs, web
+
+from homeassistant.components.http import KEY_HASS, HomeAssistantView
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN
+from .store import KIND_GROUP, KIND_SHADE, ShadeState
+
+if TYPE_CHECKING:
+    from .controller import ESPSomfyController
+
+
+def row_entity_id(controller: ESPSomfyController, row: ShadeState) -> str | None:
+    """Get the entity id of the cover for a shade or group row."""
+    if row.kind == KIND_SHADE:
+        return controller.entity_id_for(f"{controller.unique_id}_{row.id}")
+    return controller.entity_id_for(f"{controller.unique_id}_group{row.id}")
+
+
+def row_entry(controller: ESPSomfyController, row: ShadeState) -> dict[str, Any]:
+    """Get the compact entry for a shade or group row.
+
+    Positions are reported the way Home Assistant shows them where 100 is
+    fully open.
+    """
+    entry: dict[str, Any] = {
+        "id": row.id,
+        "entity_id": row_entity_id(controller, row),
+        "direction": row.direction,
+        "flags": int(row.flags),
+    }
+    if row.kind == KIND_SHADE and (model := controller.api.shade_models.get(row.id)):
+        entry["position"] = model.position(row.position)
+        if model.has_tilt:
+            entry["tilt"] = model.tilt_position(row.tilt_position)
+    return entry
+
+
+def _controllers(hass: HomeAssistant) -> dict[str, ESPSomfyController]:
+    """Get the controllers for all the configured hubs."""
+    return hass.data.get(DOMAIN, {})
+
+
+@callback
+def async_snapshot_version(hass: HomeAssistant) -> int:
+    """Get the newest store version across all the hubs."""
+    return max(
+        (controller.store.version for controller in _controllers(hass).values()),
+        default=0,
+    )
+
+
+@callback
+def async_snapshot(hass: HomeAssistant, since: int = 0) -> dict[str, Any]:
+    """Get the shades and groups on every hub that changed after a version.
+
+    The ids of the shades and groups removed after the version are listed so
+    a client can drop them.
+    """
+    hubs = [
+        {
+            "hub": entry_id,
+            "name": controller.device_name,
+            "connected": bool(controller.connected),
+            "shades": [
+                row_entry(controller, row)
+                for row in controller.store.shades.values()
+                if row.version > since
+            ],
+            "groups": [
+                row_entry(controller, row)
+                for row in controller.store.groups.values()
+                if row.version > since
+            ],
+            "removed_shades": controller.store.removed_since(KIND_SHADE, since),
+            "removed_groups": controller.store.removed_since(KIND_GROUP, since),
+        }
+        for entry_id, controller in _controllers(hass).items()
+    ]
+    return {"version": async_snapshot_version(hass), "hubs": hubs}
+
+
+class ESPSomfySnapshotView(HomeAssistantView):
+    """Serve the shade and group snapshot with conditional requests."""
+
+    url = f"/api/{DOMAIN}/snapshot"
+    name = f"api:{DOMAIN}:snapshot"
+
+    async def get(self, request: web.Request) -> web.Response:
+        """Return the snapshot or 304 when nothing has changed."""
+        hass = request.app[KEY_HASS]
+        try:
+            since = int(request.query.get("since", 0))
+        except ValueError:
+            return self.json_message("Invalid since", HTTPStatus.BAD_REQUEST)
+        # The number of hubs is part of the tag so unloading a hub also
+        # invalidates it and since is so a full and a partial snapshot differ.
+        # The registry index version covers entities that were renamed.
+        controllers = _controllers(hass)
+        index_version = sum(
+            controller.registry_version() for controller in controllers.values()
+        )
+        etag = (
+            f'"{async_snapshot_version(hass)}-{len(controllers)}'
+            f'-{index_version}-{since}"'
+        )
+        if etag in request.headers.getall(hdrs.IF_NONE_MATCH, ()):
+            return web.Response(
+                status=HTTPStatus.NOT_MODIFIED, headers={hdrs.ETAG: etag}
+            )
+        response = self.json(async_snapshot(hass, since))
+        response.headers[hdrs.ETAG] = etag
+        return response
@@ -0,0 +1,96 @@
+"""Detects shades that look like they stopped without a final state frame."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+import logging
+from typing import TYPE_CHECKING, Any
+
+import aiohttp
+
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from .controller import ESPSomfyController
+
+_LOGGER = logging.getLogger(__name__)
+
+STALE_CHECK_INTERVAL = timedelta(seconds=5)
+# Seconds past the expected end of a move before a shade is refreshed.
+STALE_GRACE = 5
+# Seconds without a frame before a shade with no learned speed is refreshed.
+STALE_FALLBACK = 120
+
+
+class StaleShadeDetector:
+    """Refreshes a moving shade that has not reported past its travel time.
+
+    A missed final frame would otherwise leave the shade moving until its
+    next move.  Only the shades that are moving are watched and the check
+    only runs while one of them is.
+    """
+
+    def __init__(self, controller: ESPSomfyController) -> None:
+        """Initialize the detector for a hub."""
+        self._controller = controller
+        # The time of the last frame for each moving shade.
+        self._moving: dict[int, float] = {}
+        self._refreshing: set[int] = set()
+        self._unsub_check: CALLBACK_TYPE | None = None
+        self.refreshes = 0
+
+    @callback
+    def observe(self, shade_id: int, moving: bool) -> None:
+        """Note a motion frame for a shade."""
+        if moving:
+            self._moving[shade_id] = self._controller.clock()
+            if self._unsub_check is None:
+                self._unsub_check = async_track_time_interval(
+                    self._controller.hass, self._async_check, STALE_CHECK_INTERVAL
+                )
+        elif self._moving.pop(shade_id, None) is not None and not self._moving:
+            self.async_stop()
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop watching the shades."""
+        self._moving.clear()
+        if self._unsub_check is not None:
+            self._unsub_check()
+            self._unsub_check = None
+
+    @callback
+    def _async_check(self, _now: Any) -> None:
+        """Refresh the moving shades that are past their expected travel time."""
+        controller = self._controller
+        if not controller.socket_connected:
+            # The poller keeps the shades current while the socket is down.
+            return
+        now = controller.clock()
+        for shade_id, last in list(self._moving.items()):
+            if shade_id in self._refreshing:
+                continue
+            remaining = controller.motion_model(shade_id).remaining(last)
+            expected = STALE_FALLBACK if remaining is None else remaining
+            if now - last > expected + STALE_GRACE:
+                self._refreshing.add(shade_id)
+                controller.hass.async_create_task(
+                    self._async_refresh(shade_id), f"{DOMAIN}_refresh_shade"
+                )
+
+    async def _async_refresh(self, shade_id: int) -> None:
+        """Refresh a single shade from the hub."""
+        _LOGGER.debug("Refreshing shade %s that has not reported its stop", shade_id)
+        self.refreshes += 1
+        try:
+            await self._controller.async_refresh_shade(shade_id)
+        except (aiohttp.ClientError, TimeoutError) as err:
+            _LOGGER.debug("Unable to refresh shade %s: %s", shade_id, err)
+        finally:
+            self._refreshing.discard(shade_id)
+            if shade_id in self._moving:
+                # Still moving on the hub so wait another travel time.
+                self._moving[shade_id] = self._controller.clock()
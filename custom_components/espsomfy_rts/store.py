@@ -0,0 +1,313 @@
+"""Runtime state store for ESPSomfy RTS shades and groups."""
+
+from __future__ import annotations
+
+from enum import IntFlag
+import itertools
+from typing import Any
+
+from homeassistant.util import dt as dt_util
+
+from .const import EVT_GROUPSTATE, EVT_SHADECOMMAND, EVT_SHADESTATE
+
+KIND_SHADE = "shade"
+KIND_GROUP = "group"
+
+
+class ShadeFlag(IntFlag):
+    """Bits carried in the flags of a shade or group."""
+
+    SUN_FLAG = 0x01
+    WINDY = 0x10
+    SUNNY = 0x20
+
+
+# Pseudo field reported when a frame changed the compiled model of the row.
+FIELD_MODEL = "model"
+# Pseudo field reported when the hub confirmed a row restored from disk.
+FIELD_RESTORED = "restored"
+
+# Versions are shared by every store so they can be compared across hubs.
+_versions = itertools.count(1)
+
+
+def _flags(value: Any) -> ShadeFlag:
+    return ShadeFlag(int(value))
+
+
+# Frame key, row attribute and conversion for the values carried by shadeState
+# and groupState.
+_STATE_FIELDS = (
+    ("position", "position", int),
+    ("direction", "direction", int),
+    ("target", "target", int),
+    ("myPos", "my_pos", int),
+    ("tiltPosition", "tilt_position", int),
+    ("tiltDirection", "tilt_direction", int),
+    ("tiltTarget", "tilt_target", int),
+    ("myTiltPos", "my_tilt_pos", int),
+    ("flags", "flags", _flags),
+    ("remoteAddress", "remote_address", int),
+)
+# Frame key and row attribute for the values saved across restarts in this order.
+_SAVED_FIELDS = (
+    ("position", "position"),
+    ("tiltPosition", "tilt_position"),
+    ("myPos", "my_pos"),
+    ("myTiltPos", "my_tilt_pos"),
+    ("flags", "flags"),
+)
+SAVED_ATTRS = frozenset(attr for _key, attr in _SAVED_FIELDS)
+# Frame key, row attribute and conversion for the values carried by shadeCommand.
+_COMMAND_FIELDS = (
+    ("remoteAddress", "remote_address", int),
+    ("cmd", "last_cmd", str),
+    ("source", "cmd_source", str),
+    ("sourceAddress", "cmd_address", int),
+)
+
+
+class ShadeState:
+    """The runtime state for a single shade or group."""
+
+    __slots__ = (
+        "kind",
+        "id",
+        "position",
+        "direction",
+        "target",
+        "my_pos",
+        "tilt_position",
+        "tilt_direction",
+        "tilt_target",
+        "my_tilt_pos",
+        "flags",
+        "flag_transitions",
+        "remote_address",
+        "last_cmd",
+        "cmd_source",
+        "cmd_address",
+        "cmd_fired",
+        "restored",
+        "version",
+    )
+
+    def __init__(self, kind: str, row_id: int) -> None:
+        """Initialize an empty state row."""
+        self.kind = kind
+        self.id = row_id
+        self.position: int = 0
+        self.direction: int = 0
+        self.target: int | None = None
+        self.my_pos: int | None = None
+        self.tilt_position: int = 100
+        self.tilt_direction: int = 0
+        self.tilt_target: int | None = None
+        self.my_tilt_pos: int | None = None
+        self.flags = ShadeFlag(0)
+        # The bits that flipped the last time the flags changed.
+        self.flag_transitions = ShadeFlag(0)
+        self.remote_address: int | None = None
+        self.last_cmd: str | None = None
+        self.cmd_source: str | None = None
+        self.cmd_address: int | None = None
+        self.cmd_fired: float | None = None
+        # Set while the values come from disk and the hub has not confirmed them.
+        self.restored = False
+        # The store version when the row last changed.
+        self.version = 0
+
+    @property
+    def sun_flag(self) -> bool:
+        """Indicates whether the sun flag is set for the shade."""
+        return ShadeFlag.SUN_FLAG in self.flags
+
+    @property
+    def windy(self) -> bool:
+        """Indicates whether the wind sensor is tripped."""
+        return ShadeFlag.WINDY in self.flags
+
+    @property
+    def sunny(self) -> bool:
+        """Indicates whether the sun sensor is tripped."""
+        return ShadeFlag.SUNNY in self.flags
+
+    def apply_state(self, data: Any) -> set[str]:
+        """Apply the values from a state frame and return the changed fields."""
+        changed: set[str] = set()
+        flags = self.flags
+        for key, attr, conv in _STATE_FIELDS:
+            if key in data:
+                value = conv(data[key])
+                if getattr(self, attr) != value:
+                    setattr(self, attr, value)
+                    changed.add(attr)
+        if "flags" in changed:
+            self.flag_transitions = flags ^ self.flags
+        return changed
+
+    def apply_command(self, data: Any) -> set[str]:
+        """Apply the values from a shadeCommand frame and return the changed fields."""
+        changed: set[str] = set()
+        for key, attr, conv in _COMMAND_FIELDS:
+            if key in data:
+                value = conv(data[key])
+                if getattr(self, attr) != value:
+                    setattr(self, attr, value)
+                    changed.add(attr)
+        # Every command is an event of its own so the time always changes.
+        self.cmd_fired = dt_util.as_timestamp(dt_util.utcnow())
+        changed.add("cmd_fired")
+        return changed
+
+
+class ESPSomfyStateStore:
+    """Holds the runtime state for all the shades and groups on a hub."""
+
+    def __init__(self) -> None:
+        """Initialize the state store."""
+        self.shades: dict[int, ShadeState] = {}
+        self.groups: dict[int, ShadeState] = {}
+        # The ids of the rows that have a flag set by kind and flag.
+        self._flagged: dict[tuple[str, ShadeFlag], set[int]] = {}
+        # The store version when each shade or group was removed by kind and id.
+        self.removed: dict[tuple[str, int], int] = {}
+        self.version = 0
+
+    def bump(self) -> int:
+        """Move the store to a new version."""
+        self.version = next(_versions)
+        return self.version
+
+    def touch(self, row: ShadeState) -> None:
+        """Mark a row as changed in a new version of the store."""
+        row.version = self.bump()
+
+    def shade(self, shade_id: int) -> ShadeState:
+        """Get the state row for a shade, creating it when missing."""
+        row = self.shades.get(shade_id)
+        if row is None:
+            row = self.shades[shade_id] = ShadeState(KIND_SHADE, shade_id)
+            self.removed.pop((KIND_SHADE, shade_id), None)
+        return row
+
+    def group(self, group_id: int) -> ShadeState:
+        """Get the state row for a group, creating it when missing."""
+        row = self.groups.get(group_id)
+        if row is None:
+            row = self.groups[group_id] = ShadeState(KIND_GROUP, group_id)
+            self.removed.pop((KIND_GROUP, group_id), None)
+        return row
+
+    def load(self, shades: Any, groups: Any) -> list[tuple[ShadeState, set[str]]]:
+        """Seed the rows from the discovery payload and return the rows that changed."""
+        changes: list[tuple[ShadeState, set[str]]] = []
+        for shade in shades:
+            if "shadeId" in shade:
+                row = self.shade(int(shade["shadeId"]))
+                if changed := self._apply_state(row, shade):
+                    changes.append((row, changed))
+        for group in groups:
+            if "groupId" in group:
+                row = self.group(int(group["groupId"]))
+                if changed := self._apply_state(row, group):
+                    changes.append((row, changed))
+        return changes
+
+    def dump(self) -> dict[str, list[list[Any]]]:
+        """Get the values that are kept across restarts in a compact form."""
+        return {
+            kind: [
+                [
+                    row.id,
+                    *(
+                        None if (value := getattr(row, attr)) is None else int(value)
+                        for _key, attr in _SAVED_FIELDS
+                    ),
+                ]
+                for row in rows.values()
+            ]
+            for kind, rows in ((KIND_SHADE, self.shades), (KIND_GROUP, self.groups))
+        }
+
+    def restore(self, data: dict[str, list[list[Any]]]) -> None:
+        """Apply the values saved by dump to the known rows and mark them restored."""
+        for kind, rows in ((KIND_SHADE, self.shades), (KIND_GROUP, self.groups)):
+            for row_id, *values in data.get(kind, ()):
+                if (row := rows.get(int(row_id))) is None:
+                    continue
+                self._apply_state(
+                    row,
+                    {
+                        key: value
+                        for (key, _attr), value in zip(
+                            _SAVED_FIELDS, values, strict=False
+                        )
+                        if value is not None
+                    },
+                )
+                row.restored = True
+
+    def mark_restored(self) -> None:
+        """Mark every known row restored until the hub reports it."""
+        for rows in (self.shades, self.groups):
+            for row in rows.values():
+                row.restored = True
+
+    def _apply_state(self, row: ShadeState, data: Any) -> set[str]:
+        """Apply a state frame to a row and keep the flag index current."""
+        changed = row.apply_state(data)
+        if row.restored:
+            # The hub has reported the row so the restored values are confirmed.
+            row.restored = False
+            changed.add(FIELD_RESTORED)
+        if changed:
+            self.touch(row)
+        if "flags" in changed:
+            for flag in row.flag_transitions:
+                ids = self._flagged.setdefault((row.kind, flag), set())
+                if flag in row.flags:
+                    ids.add(row.id)
+                else:
+                    ids.discard(row.id)
+        return changed
+
+    def remove(self, kind: str, row_id: int) -> None:
+        """Drop the row for a shade or group that no longer exists."""
+        rows = self.shades if kind == KIND_SHADE else self.groups
+        if (row := rows.pop(row_id, None)) is None:
+            return
+        for flag in row.flags:
+            self._flagged[(kind, flag)].discard(row_id)
+        self.removed[(kind, row_id)] = self.bump()
+
+    def removed_since(self, kind: str, version: int) -> list[int]:
+        """Get the ids of the shades or groups removed after a version."""
+        return [
+            row_id
+            for (removed_kind, row_id), removed in self.removed.items()
+            if removed_kind == kind and removed > version
+        ]
+
+    def flagged(self, flag: ShadeFlag, kind: str = KIND_SHADE) -> frozenset[int]:
+        """Get the ids of the shades or groups that have a flag set."""
+        return frozenset(self._flagged.get((kind, flag), ()))
+
+    def apply_frame(self, data: Any) -> tuple[ShadeState | None, set[str]]:
+        """Decode a socket frame into the store.
+
+        Returns the affected row along with the names of the fields that
+        changed.  Frames that do not carry shade or group state return no row.
+        """
+        evt = data.get("event")
+        if evt == EVT_SHADESTATE and "shadeId" in data:
+            row = self.shade(int(data["shadeId"]))
+            return row, self._apply_state(row, data)
+        if evt == EVT_SHADECOMMAND and "shadeId" in data:
+            row = self.shade(int(data["shadeId"]))
+            self.touch(row)
+            return row, row.apply_command(data)
+        if evt == EVT_GROUPSTATE and "groupId" in data:
+            row = self.group(int(data["groupId"]))
+            return row, self._apply_state(row, data)
+        return None, set()
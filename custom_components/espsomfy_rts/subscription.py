@@ -0,0 +1,255 @@
+"""Websocket subscription that streams shade and group deltas."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.event import async_call_later
+
+from .const import DOMAIN, SIGNAL_HUB_UPDATED
+from .snapshot import async_snapshot_version, row_entity_id, row_entry
+from .store import FIELD_MODEL, ShadeState
+
+if TYPE_CHECKING:
+    from .controller import ESPSomfyController
+
+# Row fields that are streamed to the subscribers.
+_DELTA_FIELDS = frozenset(
+    {FIELD_MODEL, "position", "direction", "tilt_position", "tilt_direction", "flags"}
+)
+DEFAULT_INTERVAL = 0.5
+
+
+class _ShadeSubscription:
+    """Merges the deltas for one client and sends them at its own rate.
+
+    Hubs that are set up after the subscription started stream every row
+    they have.  Hubs that are unloaded are listed once under removed_hubs.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        connection: websocket_api.ActiveConnection,
+        msg_id: int,
+        interval: float,
+        hubs: list[str] | None = None,
+        entity_ids: set[str] | None = None,
+    ) -> None:
+        """Initialize the subscription."""
+        self._hass = hass
+        self._connection = connection
+        self._msg_id = msg_id
+        self._interval = interval
+        self._hubs = hubs
+        self._entity_ids = entity_ids
+        # The rows each hub is filtered down to or None for every row.
+        self._rows: dict[str, set[tuple[str, int]] | None] = {}
+        self._controllers: dict[str, ESPSomfyController] = {}
+        self._pending: dict[tuple[str, str, int], ShadeState] = {}
+        self._removed: set[str] = set()
+        self._unsubs: dict[str, CALLBACK_TYPE] = {}
+        self._unsub_hubs: CALLBACK_TYPE | None = None
+        self._unsub_flush: CALLBACK_TYPE | None = None
+
+    def start(self) -> None:
+        """Watch the hubs that are set up now and the ones set up later."""
+        controllers: dict[str, ESPSomfyController] = self._hass.data.get(DOMAIN, {})
+        for entry_id, controller in controllers.items():
+            self.watch(entry_id, controller)
+        self._unsub_hubs = async_dispatcher_connect(
+            self._hass, SIGNAL_HUB_UPDATED, self._async_hub_updated
+        )
+
+    def watch(self, entry_id: str, controller: ESPSomfyController) -> bool:
+        """Stream the changes for the rows the client asked for on a hub.
+
+        Returns whether any of the rows on the hub are watched.
+        """
+        self.unwatch(entry_id)
+        if self._hubs is not None and entry_id not in self._hubs:
+            return False
+        rows: set[tuple[str, int]] | None = None
+        if self._entity_ids is not None:
+            rows = {
+                (row.kind, row.id)
+                for row in (
+                    *controller.store.shades.values(),
+                    *controller.store.groups.values(),
+                )
+                if row_entity_id(controller, row) in self._entity_ids
+            }
+            if not rows:
+                return False
+        self._controllers[entry_id] = controller
+        self._rows[entry_id] = rows
+
+        @callback
+        def _async_row_changed(row: ShadeState, changed: set[str]) -> None:
+            self._async_row_changed(entry_id, row, changed)
+
+        self._unsubs[entry_id] = controller.async_add_hub_listener(_async_row_changed)
+        return True
+
+    def unwatch(self, entry_id: str) -> bool:
+        """Stop streaming the changes for a hub and return whether it was watched."""
+        if (unsub := self._unsubs.pop(entry_id, None)) is None:
+            return False
+        unsub()
+        del self._controllers[entry_id]
+        del self._rows[entry_id]
+        for key in [key for key in self._pending if key[0] == entry_id]:
+            del self._pending[key]
+        return True
+
+    @callback
+    def _async_hub_updated(
+        self, entry_id: str, controller: ESPSomfyController | None
+    ) -> None:
+        """Follow a hub that was set up or unloaded."""
+        if controller is None:
+            if self.unwatch(entry_id):
+                self._removed.add(entry_id)
+                self._async_schedule_flush()
+            return
+        if not self.watch(entry_id, controller):
+            return
+        self._removed.discard(entry_id)
+        for row in (
+            *controller.store.shades.values(),
+            *controller.store.groups.values(),
+        ):
+            if self._watched(entry_id, row):
+                self._pending[(entry_id, row.kind, row.id)] = row
+        self._async_schedule_flush()
+
+    def initial(self) -> dict[str, Any]:
+        """Get the current state of every watched row."""
+        return {
+            "version": async_snapshot_version(self._hass),
+            "changes": [
+                self._change(entry_id, row)
+                for entry_id, controller in self._controllers.items()
+                for row in (
+                    *controller.store.shades.values(),
+                    *controller.store.groups.values(),
+                )
+                if self._watched(entry_id, row)
+            ],
+        }
+
+    def _watched(self, entry_id: str, row: ShadeState) -> bool:
+        """Indicates whether the client asked for a row."""
+        rows = self._rows[entry_id]
+        return rows is None or (row.kind, row.id) in rows
+
+    def _change(self, entry_id: str, row: ShadeState) -> dict[str, Any]:
+        """Get the entry sent to the client for a row."""
+        return {
+            "hub": entry_id,
+            "kind": row.kind,
+            **row_entry(self._controllers[entry_id], row),
+        }
+
+    @callback
+    def _async_row_changed(
+        self, entry_id: str, row: ShadeState, changed: set[str]
+    ) -> None:
+        """Queue a row that changed and send the queue when it is due."""
+        if changed.isdisjoint(_DELTA_FIELDS) or not self._watched(entry_id, row):
+            return
+        # Later changes to a row replace the earlier ones that were not sent.
+        self._pending[(entry_id, row.kind, row.id)] = row
+        self._async_schedule_flush()
+
+    @callback
+    def _async_schedule_flush(self) -> None:
+        """Send the queue now or when the interval is up."""
+        if self._interval <= 0:
+            self._async_flush()
+        elif self._unsub_flush is None:
+            self._unsub_flush = async_call_later(
+                self._hass, self._interval, self._async_flush
+            )
+
+    @callback
+    def _async_flush(self, _now: Any = None) -> None:
+        """Send the queued changes to the client."""
+        self._unsub_flush = None
+        if not self._pending and not self._removed:
+            return
+        message: dict[str, Any] = {
+            "version": async_snapshot_version(self._hass),
+            "changes": [
+                self._change(entry_id, row)
+                for (entry_id, _kind, _row_id), row in self._pending.items()
+            ],
+        }
+        if self._removed:
+            message["removed_hubs"] = sorted(self._removed)
+        self._pending.clear()
+        self._removed.clear()
+        self._connection.send_message(
+            websocket_api.event_message(self._msg_id, message)
+        )
+
+    @callback
+    def async_unsubscribe(self) -> None:
+        """Stop streaming the changes."""
+        if self._unsub_hubs is not None:
+            self._unsub_hubs()
+            self._unsub_hubs = None
+        for entry_id in list(self._unsubs):
+            self.unwatch(entry_id)
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+        self._pending.clear()
+        self._removed.clear()
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/subscribe_shades",
+        vol.Optional("hub"): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional("entity_id"): cv.entity_ids,
+        vol.Optional("interval", default=DEFAULT_INTERVAL): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=60)
+        ),
+    }
+)
+@callback
+def ws_subscribe_shades(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict
+) -> None:
+    """Stream compact deltas for the shades and groups a client follows.
+
+    Changes are merged per row and sent at most once per interval so slow
+    clients only get the latest value for each row.
+    """
+    subscription = _ShadeSubscription(
+        hass,
+        connection,
+        msg["id"],
+        msg["interval"],
+        msg.get("hub"),
+        set(msg["entity_id"]) if "entity_id" in msg else None,
+    )
+    subscription.start()
+    connection.subscriptions[msg["id"]] = subscription.async_unsubscribe
+    connection.send_result(msg["id"])
+    connection.send_message(
+        websocket_api.event_message(msg["id"], subscription.initial())
+    )
+
+
+@callback
+def async_setup_websocket(hass: HomeAssistant) -> None:
+    """Register the websocket commands."""
+    websocket_api.async_register_command(hass, ws_subscribe_shades)
@@ -2,16 +2,20 @@
 
 from __future__ import annotations
 
+from collections.abc import Callable, Mapping
+from functools import partial
 from typing import Any
 
 from homeassistant.components.switch import SwitchEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import DOMAIN, EVT_CONNECTED, EVT_GROUPSTATE, EVT_SHADESTATE
+from .const import ATTR_RESTORED, DOMAIN, EVT_CONNECTED
 from .controller import ESPSomfyController
 from .entity import ESPSomfyEntity
+from .model import ShadeModel
+from .store import KIND_SHADE, ShadeFlag, ShadeState
 
 
 async def async_setup_entry(
@@ -20,44 +24,47 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up shades for the shade controller."""
-    controller = hass.data[DOMAIN][config_entry.entry_id]
-    new_entities = []
+    controller: ESPSomfyController = hass.data[DOMAIN][config_entry.entry_id]
     data = controller.api.get_config()
-    if "serverId" in data:
-        for shade in controller.api.shades:
-            try:
-                if "shadeType" in shade and (
-                    int(shade["shadeType"]) == 9 or int(shade["shadeType"] == 10)
-                ):
-                    new_entities.append(
-                        ESPSomfyBinarySwitch(controller=controller, data=shade)
+    if "serverId" not in data:
+        return
+
+    def _row_entities(
+        kind: str, row_id: int
+    ) -> dict[str, Callable[[], ESPSomfyEntity]]:
+        data = None
+        if kind == KIND_SHADE:
+            if (shade := controller.api.shade_models.get(row_id)) is None:
+                return {}
+            if shade.is_dry_contact:
+                return {
+                    _binary_switch_unique_id(controller, row_id): partial(
+                        ESPSomfyBinarySwitch, controller=controller, model=shade
                     )
-                elif "sunSensor" in shade:
-                    if shade["sunSensor"] is True:
-                        new_entities.append(
-                            ESPSomfySunSwitch(controller=controller, data=shade)
-                        )
-                elif "shadeType" in shade:
-                    match shade["shadeType"]:
-                        case 3:
-                            new_entities.append(
-                                ESPSomfySunSwitch(controller=controller, data=shade)
-                            )
-            except KeyError:
-                pass
-
-        for group in controller.api.groups:
-            try:
-                if "sunSensor" in group:
-                    if group["sunSensor"] is True:
-                        new_entities.append(
-                            ESPSomfySunSwitch(controller=controller, data=group)
-                        )
-
-            except KeyError:
-                pass
-    if new_entities:
-        async_add_entities(new_entities)
+                }
+            if shade.has_sun_switch:
+                data = shade.raw
+        elif (group := controller.api.group_models.get(row_id)) is not None:
+            if group.has_sun_sensor:
+                data = group.raw
+        if data is None:
+            return {}
+        return {
+            _sun_switch_unique_id(controller, data): partial(
+                ESPSomfySunSwitch, controller=controller, data=data
+            )
+        }
+
+    controller.async_add_row_platform(_row_entities, async_add_entities)
+
+
+def _sun_switch_unique_id(
+    controller: ESPSomfyController, data: Mapping[str, Any]
+) -> str:
+    """Get the unique id for the sun switch of a shade or group."""
+    if "groupId" in data:
+        return f"sunswitch_group_{controller.unique_id}_{data['groupId']}"
+    return f"sunswitch_{controller.unique_id}_{data['shadeId']}"
 
 
 class ESPSomfySunSwitch(ESPSomfyEntity, SwitchEntity):
@@ -73,57 +80,44 @@ class ESPSomfySunSwitch(ESPSomfyEntity, SwitchEntity):
         self._attr_name = data["name"]
         self._attr_has_entity_name = False
         self._sunswitch_type = None
-        self._available = True
+        self._available = controller.connected is not False
+        self._attr_unique_id = _sun_switch_unique_id(controller, data)
         if "groupId" in data:
             self._group_id = data["groupId"]
-            self._attr_unique_id = (
-                f"sunswitch_group_{controller.unique_id}_{self._group_id}"
-            )
             self._sunswitch_type = "group"
+            self._state = controller.store.group(int(self._group_id))
         else:
             self._shade_id = data["shadeId"]
-            self._attr_unique_id = f"sunswitch_{controller.unique_id}_{self._shade_id}"
             self._sunswitch_type = "motor"
+            self._state = controller.store.shade(int(self._shade_id))
 
-        if "flags" in data:
-            self._attr_is_on = bool((int(data["flags"]) & 0x01) == 0x01)
-        else:
-            self._attr_is_on = False
+        self._attr_is_on = self._state.sun_flag
 
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to the flag changes for the shade or group."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._controller.async_add_flag_listener(
+                self._state.kind, self._state.id, ShadeFlag.SUN_FLAG, self._handle_flag
+            )
+        )
+
+    @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         if (
             self._controller.data["event"] == EVT_CONNECTED
             and "connected" in self._controller.data
+            and self._available != bool(self._controller.data["connected"])
         ):
             self._available = bool(self._controller.data["connected"])
             self.async_write_ha_state()
-        elif (
-            self._sunswitch_type == "motor"
-            and "shadeId" in self._controller.data
-            and self._controller.data["shadeId"] == self._shade_id
-        ):
-            if (
-                self._controller.data["event"] == EVT_SHADESTATE
-                and "flags" in self._controller.data
-            ):
-                self._attr_is_on = bool(
-                    (int(self._controller.data["flags"]) & 0x01) == 0x01
-                )
-                self.async_write_ha_state()
-        elif (
-            self._sunswitch_type == "group"
-            and "groupId" in self._controller.data
-            and self._controller.data["groupId"] == self._group_id
-        ):
-            if (
-                self._controller.data["event"] == EVT_GROUPSTATE
-                and "flags" in self._controller.data
-            ):
-                self._attr_is_on = bool(
-                    (int(self._controller.data["flags"]) & 0x01) == 0x01
-                )
-                self.async_write_ha_state()
+
+    @callback
+    def _handle_flag(self, state: ShadeState, is_on: bool) -> None:
+        """Handle the flag being set or cleared on the shade or group."""
+        self._attr_is_on = is_on
+        self.async_write_ha_state()
 
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn the entity on."""
@@ -144,30 +138,47 @@ class ESPSomfySunSwitch(ESPSomfyEntity, SwitchEntity):
         """Indicates whether the shade is available."""
         return self._available
 
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any] | None:
+        """Mark the flag as restored until the hub confirms it."""
+        if self._state.restored:
+            return {ATTR_RESTORED: True}
+        return None
+
+
+def _binary_switch_unique_id(controller: ESPSomfyController, shade_id: int) -> str:
+    """Get the unique id for the switch of a dry contact."""
+    return f"binaryswitch_{controller.unique_id}_{shade_id}"
+
 
 class ESPSomfyBinarySwitch(ESPSomfyEntity, SwitchEntity):
     """A binary switch for toggling a dry contact."""
 
-    def __init__(self, controller: ESPSomfyController, data) -> None:
+    def __init__(self, controller: ESPSomfyController, model: ShadeModel) -> None:
         """Initialize a new BinarySwitch."""
-        super().__init__(controller=controller, data=data)
+        super().__init__(controller=controller, data=model)
         self._controller = controller
-        self._shade_id = None
         self._group_id = None
-        self._attr_name = data["name"]
+        self._attr_name = model.name
         self._attr_has_entity_name = False
-        self._binaryswitch_type = data["shadeType"]
-        self._shade_id = data["shadeId"]
-        self._available = True
-        self._attr_unique_id = f"binaryswitch_{controller.unique_id}_{self._shade_id}"
-        self._flip_commands = False
-        if "flipCommands" in data:
-            self._flip_commands = bool(data["flipCommands"])
-        if "position" in data:
-            self._attr_is_on = bool((int(data["position"])) > 0)
-        else:
-            self._attr_is_on = False
+        self._binaryswitch_type = model.shade_type
+        self._shade_id = model.shade_id
+        self._available = controller.connected is not False
+        self._attr_unique_id = _binary_switch_unique_id(controller, self._shade_id)
+        self._state = controller.store.shade(self._shade_id)
+        self._flip_commands = model.flip_commands
+        self._attr_is_on = self._state.position > 0
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to the state changes for the dry contact."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._controller.async_add_state_listener(
+                self._state.kind, self._state.id, self._handle_state_delta
+            )
+        )
 
+    @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         if self.registry_entry.disabled:
@@ -175,14 +186,18 @@ class ESPSomfyBinarySwitch(ESPSomfyEntity, SwitchEntity):
         if (
             self._controller.data["event"] == EVT_CONNECTED
             and "connected" in self._controller.data
+            and self._available != bool(self._controller.data["connected"])
         ):
             self._available = bool(self._controller.data["connected"])
             self.async_write_ha_state()
-        elif (
-            "position" in self._controller.data
-            and self._controller.data["shadeId"] == self._shade_id
-        ):
-            self._attr_is_on = bool((int(self._controller.data["position"])) > 0)
+
+    @callback
+    def _handle_state_delta(self, state: ShadeState, changed: set[str]) -> None:
+        """Handle the fields that changed on the dry contact."""
+        if self.registry_entry.disabled:
+            return
+        if "position" in changed and self._attr_is_on != (state.position > 0):
+            self._attr_is_on = state.position > 0
             self.async_write_ha_state()
 
     @property
@@ -44,7 +44,7 @@ class ESPSomfyRTSUpdateEntity(ESPSomfyEntity, UpdateEntity):
     def __init__(self, controller: ESPSomfyController) -> None:
         """Initialize the update entity."""
         self._controller = controller
-        self._available = True
+        self._available = controller.connected is not False
         self._attr_name = "Firmware Update"
         self._attr_unique_id = f"update_{controller.unique_id}"
         self._update_status = 0
@@ -67,8 +67,9 @@ class ESPSomfyRTSUpdateEntity(ESPSomfyEntity, UpdateEntity):
             self._controller.data["event"] == EVT_CONNECTED
             and "connected" in self._controller.data
         ):
-            self._available = bool(self._controller.data["connected"])
-            self.async_write_ha_state()
+            if self._available != bool(self._controller.data["connected"]):
+                self._available = bool(self._controller.data["connected"])
+                self.async_write_ha_state()
         elif self._controller.data["event"] == EVT_FWSTATUS:
             if (
                 self._controller.check_for_update
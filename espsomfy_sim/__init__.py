@@ -0,0 +1,25 @@
+"""Local stand-in for an ESPSomfy RTS hub.
+
+Serves the HTTP API and socket that the integration talks to so it can be
+exercised without any hardware.  Run it with ``python -m espsomfy_sim``.
+"""
+
+from .device import (
+    SimulatedGroup,
+    SimulatedHub,
+    SimulatedShade,
+    SimulatorConfig,
+    encode_frame,
+)
+from .server import API_PORT, SOCKET_PORT, Simulator
+
+__all__ = [
+    "API_PORT",
+    "SOCKET_PORT",
+    "SimulatedGroup",
+    "SimulatedHub",
+    "SimulatedShade",
+    "Simulator",
+    "SimulatorConfig",
+    "encode_frame",
+]
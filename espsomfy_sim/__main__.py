@@ -0,0 +1,131 @@
+"""Run a simulated ESPSomfy RTS hub from the command line."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+
+from .device import SimulatorConfig
+from .server import API_PORT, SOCKET_PORT, Simulator
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse the command line."""
+    defaults = SimulatorConfig()
+    parser = argparse.ArgumentParser(prog="python -m espsomfy_sim", description=__doc__)
+    parser.add_argument("--host", default="0.0.0.0", help="address to listen on")
+    parser.add_argument("--api-port", type=int, default=API_PORT)
+    parser.add_argument("--socket-port", type=int, default=SOCKET_PORT)
+    parser.add_argument("--shades", type=int, default=defaults.shades)
+    parser.add_argument("--groups", type=int, default=defaults.groups)
+    parser.add_argument(
+        "--tilt-shades",
+        type=int,
+        default=defaults.tilt_shades,
+        help="number of shades that also tilt",
+    )
+    parser.add_argument(
+        "--sun-shades",
+        type=int,
+        default=defaults.sun_shades,
+        help="number of shades with a sun sensor",
+    )
+    parser.add_argument(
+        "--travel-time",
+        type=float,
+        default=defaults.travel_time,
+        help="seconds for a motor to travel from open to closed",
+    )
+    parser.add_argument(
+        "--travel-spread",
+        type=float,
+        default=defaults.travel_spread,
+        help="fraction each motor's travel time may differ by",
+    )
+    parser.add_argument("--tilt-time", type=float, default=defaults.tilt_time)
+    parser.add_argument(
+        "--frame-rate",
+        type=float,
+        default=defaults.frame_rate,
+        help="state frames per second for each moving shade",
+    )
+    parser.add_argument(
+        "--remote-rate",
+        type=float,
+        default=defaults.remote_rate,
+        help="remote presses per second across the hub",
+    )
+    parser.add_argument(
+        "--chatter-rate",
+        type=float,
+        default=defaults.chatter_rate,
+        help="memStatus and wifiStrength frames per second",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=defaults.latency,
+        help="seconds added to every response and frame",
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=defaults.jitter,
+        help="random seconds added on top of the latency",
+    )
+    parser.add_argument(
+        "--loss",
+        type=float,
+        default=defaults.loss,
+        help="chance between 0 and 1 that a request or frame is dropped",
+    )
+    parser.add_argument("--pin", help="require a pin to log in")
+    parser.add_argument("--server-id", default=defaults.server_id)
+    parser.add_argument("--hostname", default=defaults.hostname)
+    parser.add_argument("--seed", type=int, help="seed for a repeatable run")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    """Serve the hub until the process is stopped."""
+    config = SimulatorConfig(
+        shades=args.shades,
+        groups=args.groups,
+        travel_time=args.travel_time,
+        travel_spread=args.travel_spread,
+        tilt_time=args.tilt_time,
+        tilt_shades=args.tilt_shades,
+        sun_shades=args.sun_shades,
+        frame_rate=args.frame_rate,
+        remote_rate=args.remote_rate,
+        chatter_rate=args.chatter_rate,
+        latency=args.latency,
+        jitter=args.jitter,
+        loss=args.loss,
+        pin=args.pin,
+        server_id=args.server_id,
+        hostname=args.hostname,
+        seed=args.seed,
+    )
+    simulator = Simulator(config, args.host, args.api_port, args.socket_port)
+    await simulator.async_start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await simulator.async_stop()
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the simulator."""
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    try:
+        asyncio.run(async_main(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+"""Simulated ESPSomfy RTS hub state and motor motion."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+import json
+import random
+import time
+from typing import Any
+
+SUN_FLAG = 0x01
+WINDY = 0x10
+SUNNY = 0x20
+
+FIRMWARE_VERSION = "v2.4.7"
+
+
+def encode_frame(event: str, payload: dict[str, Any]) -> str:
+    """Encode a frame the way the hub sends it over the socket."""
+    return f"42[{event},{json.dumps(payload, separators=(',', ':'))}]"
+
+
+@dataclass
+class SimulatorConfig:
+    """Settings for a simulated hub."""
+
+    shades: int = 8
+    groups: int = 1
+    # Seconds a motor takes to travel from fully open to fully closed.
+    travel_time: float = 20.0
+    # Fraction each motor's travel time may differ from the travel time.
+    travel_spread: float = 0.0
+    tilt_time: float = 3.0
+    tilt_shades: int = 0
+    sun_shades: int = 0
+    # State frames per second sent for each moving shade.
+    frame_rate: float = 2.0
+    # Remote presses per second across the whole hub.
+    remote_rate: float = 0.0
+    # memStatus and wifiStrength frames per second.
+    chatter_rate: float = 0.1
+    # Seconds added to every response and frame along with the random jitter.
+    latency: float = 0.0
+    jitter: float = 0.0
+    # Chance that a request or frame is dropped.
+    loss: float = 0.0
+    pin: str | None = None
+    server_id: str = "SIM000001"
+    hostname: str = "ESPSomfyRTS-sim"
+    seed: int | None = None
+
+
+class SimulatedShade:
+    """A single motor along with the position it is heading for."""
+
+    def __init__(
+        self, shade_id: int, travel_time: float, tilt_time: float, tilt: bool, sun: bool
+    ) -> None:
+        """Initialize the shade at rest and fully open."""
+        self.shade_id = shade_id
+        self.name = f"Shade {shade_id}"
+        self.remote_address = 0x100000 + shade_id
+        self.travel_time = travel_time
+        self.tilt_time = tilt_time
+        self.tilt_type = 1 if tilt else 0
+        self.sun_sensor = sun
+        self.position = 0.0
+        self.target = 0.0
+        self.my_pos = -1
+        self.tilt_position = 0.0
+        self.tilt_target = 0.0
+        self.my_tilt_pos = -1
+        self.flags = 0
+        self.last_frame = 0.0
+
+    @property
+    def direction(self) -> int:
+        """Get the direction of travel with -1 for up and 1 for down."""
+        return _direction(self.position, self.target)
+
+    @property
+    def tilt_direction(self) -> int:
+        """Get the direction the tilt is moving."""
+        return _direction(self.tilt_position, self.tilt_target)
+
+    @property
+    def moving(self) -> bool:
+        """Indicates whether the lift or tilt is moving."""
+        return self.direction != 0 or self.tilt_direction != 0
+
+    def advance(self, elapsed: float) -> None:
+        """Move the motor toward its targets for a number of seconds."""
+        self.position = _step(self.position, self.target, elapsed, self.travel_time)
+        self.tilt_position = _step(
+            self.tilt_position, self.tilt_target, elapsed, self.tilt_time
+        )
+
+    def stop(self) -> None:
+        """Stop the motor where it is."""
+        self.target = self.position = round(self.position)
+        self.tilt_target = self.tilt_position = round(self.tilt_position)
+
+    def config(self) -> dict[str, Any]:
+        """Get the shade as it is listed in the discovery payload."""
+        return {
+            "shadeId": self.shade_id,
+            "roomId": 0,
+            "name": self.name,
+            "remoteAddress": self.remote_address,
+            "shadeType": 0,
+            "tiltType": self.tilt_type,
+            "hasTilt": self.tilt_type != 0,
+            "flipCommands": False,
+            "flipPosition": False,
+            "sunSensor": self.sun_sensor,
+            **self.state(),
+        }
+
+    def state(self) -> dict[str, Any]:
+        """Get the payload for a shadeState frame."""
+        return {
+            "shadeId": self.shade_id,
+            "remoteAddress": self.remote_address,
+            "tiltType": self.tilt_type,
+            "hasTilt": self.tilt_type != 0,
+            "flipPosition": False,
+            "position": round(self.position),
+            "direction": self.direction,
+            "target": round(self.target),
+            "myPos": self.my_pos,
+            "tiltPosition": round(self.tilt_position),
+            "tiltDirection": self.tilt_direction,
+            "tiltTarget": round(self.tilt_target),
+            "myTiltPos": self.my_tilt_pos,
+            "flags": self.flags,
+        }
+
+
+class SimulatedGroup:
+    """A group of shades that share a remote."""
+
+    def __init__(self, group_id: int, shades: list[SimulatedShade]) -> None:
+        """Initialize the group."""
+        self.group_id = group_id
+        self.name = f"Group {group_id}"
+        self.remote_address = 0x200000 + group_id
+        self.shades = shades
+        self.flags = 0
+
+    def config(self) -> dict[str, Any]:
+        """Get the group as it is listed in the discovery payload."""
+        return {"roomId": 0, "name": self.name, **self.state()}
+
+    def state(self) -> dict[str, Any]:
+        """Get the payload for a groupState frame."""
+        return {
+            "groupId": self.group_id,
+            "remoteAddress": self.remote_address,
+            "flags": self.flags,
+            "linkedShades": [
+                {"shadeId": shade.shade_id, "name": shade.name, "shadeType": 0}
+                for shade in self.shades
+            ],
+        }
+
+
+class SimulatedHub:
+    """The shades, groups and settings of a single simulated hub.
+
+    Frames are handed to the emit callback as an event name and payload.
+    The hub is driven by calling tick which moves the motors and sends the
+    frames that are due.  A clock other than the monotonic one lets the
+    frames be generated ahead of time.
+    """
+
+    def __init__(
+        self,
+        config: SimulatorConfig,
+        emit: Callable[[str, dict[str, Any]], None],
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize the hub from its settings."""
+        self.config = config
+        self.clock = clock
+        self.random = random.Random(config.seed)
+        self._emit = emit
+        self.shades: dict[int, SimulatedShade] = {}
+        for shade_id in range(1, config.shades + 1):
+            spread = self.random.uniform(-config.travel_spread, config.travel_spread)
+            self.shades[shade_id] = SimulatedShade(
+                shade_id,
+                config.travel_time * (1 + spread),
+                config.tilt_time,
+                shade_id <= config.tilt_shades,
+                shade_id <= config.sun_shades,
+            )
+        self.groups: dict[int, SimulatedGroup] = {}
+        shades = list(self.shades.values())
+        for group_id in range(1, min(config.groups, len(shades)) + 1):
+            # Spread the shades over the groups round robin.
+            self.groups[group_id] = SimulatedGroup(
+                group_id, shades[group_id - 1 :: config.groups]
+            )
+        self.api_key = f"{self.random.getrandbits(64):016x}"
+        self.started = clock()
+        self.frames_sent = 0
+        self.commands = 0
+        self._last_tick = now = clock()
+        self._next_remote = now + self._next_event(config.remote_rate)
+        self._next_chatter = now + self._next_event(config.chatter_rate)
+
+    def discovery(self) -> dict[str, Any]:
+        """Get the discovery payload."""
+        config = self.config
+        return {
+            "serverId": config.server_id,
+            "version": FIRMWARE_VERSION,
+            "model": 3,
+            "hostname": config.hostname,
+            "authType": 1 if config.pin else 0,
+            "permissions": 0 if config.pin else 1,
+            "chipModel": "esp32",
+            "connType": "Wifi",
+            "ssid": "simulated",
+            "checkForUpdate": False,
+            "memory": self.memory(),
+            "rooms": [],
+            "shades": [shade.config() for shade in self.shades.values()],
+            "groups": [group.config() for group in self.groups.values()],
+        }
+
+    def memory(self) -> dict[str, int]:
+        """Get the heap figures the hub reports."""
+        return {
+            "free": 150000 - 64 * len(self.shades) - self.random.randrange(2048),
+            "max": 110592,
+            "min": 98304,
+        }
+
+    def tick(self) -> None:
+        """Move the motors and send the frames that are due."""
+        now = self.clock()
+        elapsed = now - self._last_tick
+        self._last_tick = now
+        interval = 1 / self.config.frame_rate if self.config.frame_rate > 0 else 0
+        for shade in self.shades.values():
+            if not shade.moving:
+                continue
+            shade.advance(elapsed)
+            if not shade.moving:
+                # The frame that reports the stop is always sent.
+                shade.stop()
+                self.send_shade(shade, now)
+            elif now - shade.last_frame >= interval:
+                self.send_shade(shade, now)
+        if now >= self._next_remote:
+            self._next_remote = now + self._next_event(self.config.remote_rate)
+            self.press_remote()
+        if now >= self._next_chatter:
+            self._next_chatter = now + self._next_event(self.config.chatter_rate)
+            self.send_chatter()
+
+    def press_remote(self) -> None:
+        """Press a button on the remote for a random shade."""
+        shade = self.random.choice(list(self.shades.values()))
+        command = self.random.choice(("up", "down", "my"))
+        self.emit(
+            "shadeCommand",
+            {
+                "shadeId": shade.shade_id,
+                "remoteAddress": shade.remote_address,
+                "cmd": command.capitalize(),
+                "source": "remote",
+                "sourceAddress": shade.remote_address + 0x1000,
+            },
+        )
+        self.shade_command(shade, {"command": command})
+
+    def send_chatter(self) -> None:
+        """Send the periodic status frames."""
+        self.emit("memStatus", self.memory())
+        self.emit(
+            "wifiStrength",
+            {
+                "ssid": "simulated",
+                "channel": 6,
+                "strength": -50 - self.random.randrange(20),
+            },
+        )
+
+    def send_shade(self, shade: SimulatedShade, now: float | None = None) -> None:
+        """Send the state of a shade."""
+        shade.last_frame = self.clock() if now is None else now
+        self.emit("shadeState", shade.state())
+
+    def send_group(self, group: SimulatedGroup) -> None:
+        """Send the state of a group."""
+        self.emit("groupState", group.state())
+
+    def emit(self, event: str, payload: dict[str, Any]) -> None:
+        """Hand a frame to the sockets."""
+        self.frames_sent += 1
+        self._emit(event, payload)
+
+    def shade_command(self, shade: SimulatedShade, data: dict[str, Any]) -> None:
+        """Apply a shadeCommand request to a shade."""
+        self.commands += 1
+        command = str(data.get("command", "")).lower()
+        if "target" in data:
+            shade.target = _clamp(data["target"])
+        elif command in ("up", "u"):
+            shade.target = 0
+        elif command in ("down", "d"):
+            shade.target = 100
+        elif command in ("my", "m", "stop"):
+            if shade.moving:
+                shade.stop()
+            elif shade.my_pos >= 0:
+                shade.target = shade.my_pos
+        elif command == "toggle":
+            if shade.moving:
+                shade.stop()
+            else:
+                shade.target = 0 if shade.position >= 50 else 100
+        elif command == "sunflag":
+            shade.flags |= SUN_FLAG
+        elif command == "flag":
+            shade.flags &= ~SUN_FLAG
+        # The hub reports the command as soon as it is sent to the motor.
+        self.send_shade(shade)
+
+    def tilt_command(self, shade: SimulatedShade, data: dict[str, Any]) -> None:
+        """Apply a tiltCommand request to a shade."""
+        self.commands += 1
+        command = str(data.get("command", "")).lower()
+        if "target" in data:
+            shade.tilt_target = _clamp(data["target"])
+        elif command in ("up", "u"):
+            shade.tilt_target = 0
+        elif command in ("down", "d"):
+            shade.tilt_target = 100
+        elif command in ("my", "m", "stop"):
+            shade.stop()
+        self.send_shade(shade)
+
+    def group_command(self, group: SimulatedGroup, data: dict[str, Any]) -> None:
+        """Apply a groupCommand request to the shades in a group."""
+        command = str(data.get("command", "")).lower()
+        if command == "sunflag":
+            group.flags |= SUN_FLAG
+        elif command == "flag":
+            group.flags &= ~SUN_FLAG
+        for shade in group.shades:
+            self.shade_command(shade, data)
+        self.send_group(group)
+
+    def set_positions(self, shade: SimulatedShade, data: dict[str, Any]) -> None:
+        """Set the current positions without moving the motor."""
+        if "position" in data:
+            shade.position = shade.target = _clamp(data["position"])
+        if "tiltPosition" in data:
+            shade.tilt_position = shade.tilt_target = _clamp(data["tiltPosition"])
+        self.send_shade(shade)
+
+    def set_sensor(self, shade: SimulatedShade, data: dict[str, Any]) -> None:
+        """Set the sun and wind sensor bits for a shade."""
+        for key, bit in (("sunny", SUNNY), ("windy", WINDY)):
+            if key in data:
+                shade.flags = shade.flags | bit if data[key] else shade.flags & ~bit
+        self.send_shade(shade)
+
+    def _next_event(self, rate: float) -> float:
+        """Get the seconds until the next random event at a rate per second."""
+        if rate <= 0:
+            return float("inf")
+        return self.random.expovariate(rate)
+
+
+def _direction(position: float, target: float) -> int:
+    if round(position) == round(target):
+        return 0
+    return -1 if target < position else 1
+
+
+def _step(position: float, target: float, elapsed: float, full: float) -> float:
+    """Move a position toward its target at the rate of a full travel time."""
+    if full <= 0:
+        return target
+    step = 100 * elapsed / full
+    if abs(target - position) <= step:
+        return target
+    return position + step if target > position else position - step
+
+
+def _clamp(value: Any) -> float:
+    return float(min(max(int(value), 0), 100))
@@ -0,0 +1,279 @@
+"""aiohttp servers for the HTTP API and socket of a simulated hub."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import json
+import logging
+import time
+from typing import Any
+
+from aiohttp import WSMsgType, web
+
+from .device import SimulatedHub, SimulatedShade, SimulatorConfig, encode_frame
+
+_LOGGER = logging.getLogger(__name__)
+
+API_PORT = 8081
+SOCKET_PORT = 8080
+# Seconds between the steps of the motors.
+TICK_INTERVAL = 0.05
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+
+class SocketClient:
+    """A connected socket along with the frames waiting to go out to it.
+
+    Every frame is held until its latency has passed.  Frames never pass
+    each other so the order the hub sent them in is kept.
+    """
+
+    def __init__(self, ws: web.WebSocketResponse) -> None:
+        """Initialize the client."""
+        self.ws = ws
+        self.queue: asyncio.Queue[tuple[float, str]] = asyncio.Queue()
+        self._due = 0.0
+
+    def send(self, message: str, delay: float) -> None:
+        """Queue a message to go out after a delay."""
+        self._due = max(time.monotonic() + delay, self._due)
+        self.queue.put_nowait((self._due, message))
+
+    async def async_run(self) -> None:
+        """Send the queued messages as they come due."""
+        while True:
+            due, message = await self.queue.get()
+            if (wait := due - time.monotonic()) > 0:
+                await asyncio.sleep(wait)
+            try:
+                await self.ws.send_str(message)
+            except ConnectionError:
+                return
+
+
+class Simulator:
+    """Serves a simulated hub on the same ports as the real one."""
+
+    def __init__(
+        self,
+        config: SimulatorConfig,
+        host: str = "0.0.0.0",
+        api_port: int = API_PORT,
+        socket_port: int = SOCKET_PORT,
+    ) -> None:
+        """Initialize the simulator."""
+        self.config = config
+        self.host = host
+        self.api_port = api_port
+        self.socket_port = socket_port
+        self.hub = SimulatedHub(config, self._broadcast)
+        self.clients: set[SocketClient] = set()
+        self.requests = 0
+        self.dropped_requests = 0
+        self.dropped_frames = 0
+        self._runners: list[web.AppRunner] = []
+        self._tick_task: asyncio.Task | None = None
+
+    def api_app(self) -> web.Application:
+        """Build the application for the HTTP API."""
+        app = web.Application(middlewares=[self._impair_middleware])
+        app.router.add_get("/discovery", self._async_discovery)
+        app.router.add_get("/shades", self._async_shades)
+        app.router.add_get("/shade", self._async_shade)
+        app.router.add_get("/groups", self._async_groups)
+        app.router.add_put("/shadeCommand", self._async_shade_command)
+        app.router.add_put("/groupCommand", self._async_group_command)
+        app.router.add_put("/tiltCommand", self._async_tilt_command)
+        app.router.add_put("/setPositions", self._async_set_positions)
+        app.router.add_put("/setSensor", self._async_set_sensor)
+        app.router.add_put("/login", self._async_login)
+        app.router.add_get("/backup", self._async_backup)
+        app.router.add_route("*", "/reboot", self._async_reboot)
+        app.router.add_get("/stats", self._async_stats)
+        return app
+
+    def socket_app(self) -> web.Application:
+        """Build the application for the socket."""
+        app = web.Application()
+        app.router.add_get("/", self._async_socket)
+        return app
+
+    async def async_start(self) -> None:
+        """Start serving the hub."""
+        for app, port in (
+            (self.api_app(), self.api_port),
+            (self.socket_app(), self.socket_port),
+        ):
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, self.host, port).start()
+            self._runners.append(runner)
+        self._tick_task = asyncio.create_task(self._async_tick())
+        _LOGGER.info(
+            "Simulating %s shades on http://%s:%s and ws://%s:%s",
+            len(self.hub.shades),
+            self.host,
+            self.api_port,
+            self.host,
+            self.socket_port,
+        )
+
+    async def async_stop(self) -> None:
+        """Stop serving the hub and close the sockets."""
+        if self._tick_task is not None:
+            self._tick_task.cancel()
+            self._tick_task = None
+        for client in list(self.clients):
+            await client.ws.close()
+        for runner in self._runners:
+            await runner.cleanup()
+        self._runners.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Get the counters for the simulator."""
+        return {
+            "uptime": round(time.monotonic() - self.hub.started, 3),
+            "clients": len(self.clients),
+            "requests": self.requests,
+            "commands": self.hub.commands,
+            "frames_sent": self.hub.frames_sent,
+            "dropped_requests": self.dropped_requests,
+            "dropped_frames": self.dropped_frames,
+        }
+
+    def _delay(self) -> float:
+        """Get the latency for a single response or frame."""
+        config = self.config
+        return max(config.latency + self.hub.random.uniform(0, config.jitter), 0)
+
+    def _lost(self) -> bool:
+        """Roll for whether a response or frame is dropped."""
+        return self.config.loss > 0 and self.hub.random.random() < self.config.loss
+
+    def _broadcast(self, event: str, payload: dict[str, Any]) -> None:
+        """Send a frame to every connected socket."""
+        message = encode_frame(event, payload)
+        for client in self.clients:
+            if self._lost():
+                self.dropped_frames += 1
+                continue
+            client.send(message, self._delay())
+
+    async def _async_tick(self) -> None:
+        """Step the motors until the simulator is stopped."""
+        while True:
+            await asyncio.sleep(TICK_INTERVAL)
+            self.hub.tick()
+
+    @web.middleware
+    async def _impair_middleware(
+        self, request: web.Request, handler: Handler
+    ) -> web.StreamResponse:
+        """Add the latency to the requests and drop the ones that are lost."""
+        self.requests += 1
+        if (delay := self._delay()) > 0:
+            await asyncio.sleep(delay)
+        if self._lost():
+            # Close the connection without an answer like a request that
+            # never made it to the hub.
+            self.dropped_requests += 1
+            if request.transport is not None:
+                request.transport.close()
+            raise web.HTTPServiceUnavailable
+        return await handler(request)
+
+    def _shade(self, shade_id: Any) -> SimulatedShade:
+        """Get a shade by the id sent with a request."""
+        try:
+            return self.hub.shades[int(shade_id)]
+        except (KeyError, TypeError, ValueError):
+            raise web.HTTPNotFound(text=f"Shade {shade_id} not found") from None
+
+    async def _async_discovery(self, request: web.Request) -> web.Response:
+        return web.json_response(self.hub.discovery())
+
+    async def _async_shades(self, request: web.Request) -> web.Response:
+        return web.json_response([shade.config() for shade in self.hub.shades.values()])
+
+    async def _async_shade(self, request: web.Request) -> web.Response:
+        return web.json_response(self._shade(request.query.get("shadeId")).config())
+
+    async def _async_groups(self, request: web.Request) -> web.Response:
+        return web.json_response([group.config() for group in self.hub.groups.values()])
+
+    async def _async_shade_command(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        shade = self._shade(data.get("shadeId"))
+        self.hub.shade_command(shade, data)
+        return web.json_response(shade.state())
+
+    async def _async_group_command(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        try:
+            group = self.hub.groups[int(data.get("groupId"))]
+        except (KeyError, TypeError, ValueError):
+            raise web.HTTPNotFound(
+                text=f"Group {data.get('groupId')} not found"
+            ) from None
+        self.hub.group_command(group, data)
+        return web.json_response(group.state())
+
+    async def _async_tilt_command(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        shade = self._shade(data.get("shadeId"))
+        self.hub.tilt_command(shade, data)
+        return web.json_response(shade.state())
+
+    async def _async_set_positions(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        shade = self._shade(data.get("shadeId"))
+        self.hub.set_positions(shade, data)
+        return web.json_response(shade.state())
+
+    async def _async_set_sensor(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        shade = self._shade(data.get("shadeId"))
+        self.hub.set_sensor(shade, data)
+        return web.json_response(shade.state())
+
+    async def _async_login(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        pin = self.config.pin
+        if pin and data.get("pin") != pin:
+            return web.json_response(
+                {"success": False, "type": 1, "msg": "Invalid pin"}
+            )
+        return web.json_response({"success": True, "apiKey": self.hub.api_key})
+
+    async def _async_backup(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=json.dumps(self.hub.discovery()),
+            headers={"Content-Disposition": "attachment; filename=sim.backup"},
+        )
+
+    async def _async_reboot(self, request: web.Request) -> web.Response:
+        # The sockets drop while the hub restarts.
+        for client in list(self.clients):
+            await client.ws.close()
+        return web.json_response({"success": True})
+
+    async def _async_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    async def _async_socket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        client = SocketClient(ws)
+        await ws.send_str("connected")
+        self.clients.add(client)
+        sender = asyncio.create_task(client.async_run())
+        try:
+            async for msg in ws:
+                if msg.type is WSMsgType.ERROR:
+                    break
+        finally:
+            self.clients.discard(client)
+            sender.cancel()
+        return ws
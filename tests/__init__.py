@@ -0,0 +1,65 @@
+"""Tests for the ESPSomfy RTS integration."""
+
+from __future__ import annotations
+
+from typing import Any
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.const import CONF_HOST, Platform
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.espsomfy_rts.const import DOMAIN, STORAGE_VERSION
+from custom_components.espsomfy_rts.controller import ESPSomfyController
+
+
+async def setup_integration(
+    hass: HomeAssistant,
+    hass_storage: dict[str, Any],
+    discovery: dict[str, Any],
+    options: dict[str, Any] | None = None,
+    host: str = "192.0.2.1",
+) -> ESPSomfyController:
+    """Set up a hub from a cached discovery payload without opening the socket."""
+    entry = MockConfigEntry(
+        domain=DOMAIN, data={CONF_HOST: host}, options=options or {}
+    )
+    entry.add_to_hass(hass)
+    key = f"{DOMAIN}.{entry.entry_id}.discovery"
+    hass_storage[key] = {
+        "version": STORAGE_VERSION,
+        "minor_version": 1,
+        "key": key,
+        "data": discovery,
+    }
+    with (
+        patch.object(ESPSomfyController, "ws_connect"),
+        patch.object(ESPSomfyController, "async_refresh_discovery"),
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+    return hass.data[DOMAIN][entry.entry_id]
+
+
+def shade_entity_id(
+    hass: HomeAssistant, controller: ESPSomfyController, shade_id: int = 1
+) -> str:
+    """Get the entity id of the cover for a shade."""
+    entity_id = er.async_get(hass).async_get_entity_id(
+        Platform.COVER, DOMAIN, f"{controller.unique_id}_{shade_id}"
+    )
+    assert entity_id is not None
+    return entity_id
+
+
+def shade_state(position: int, direction: int, target: int = 100) -> dict[str, Any]:
+    """Get a shadeState frame for shade 1 as it comes off the socket."""
+    return {
+        "event": "shadeState",
+        "shadeId": 1,
+        "position": position,
+        "direction": direction,
+        "target": target,
+    }
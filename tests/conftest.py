@@ -0,0 +1,24 @@
+"""Fixtures for the ESPSomfy RTS tests."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from espsomfy_sim.device import SimulatedHub, SimulatorConfig
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations: None) -> None:
+    """Load the integration from custom_components in every test."""
+
+
+@pytest.fixture
+def discovery() -> dict[str, Any]:
+    """Get the discovery payload of a hub with a single shade and no groups."""
+    hub = SimulatedHub(
+        SimulatorConfig(shades=1, groups=0, chatter_rate=0, seed=0),
+        lambda _event, _payload: None,
+    )
+    return hub.discovery()
@@ -0,0 +1,134 @@
+"""Tests for the write budget of moving shades."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any
+
+from freezegun.api import FrozenDateTimeFactory
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+from pytest_homeassistant_custom_component.components.recorder.common import (
+    async_wait_recording_done,
+)
+
+from homeassistant.components.cover import CoverState
+from homeassistant.components.recorder import Recorder, get_instance, history
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from custom_components.espsomfy_rts.const import (
+    CONF_MAX_WRITE_RATE,
+    CONF_POSITION_DEADBAND,
+    DEFAULT_MAX_WRITE_RATE,
+)
+from custom_components.espsomfy_rts.controller import ESPSomfyController
+
+from . import setup_integration, shade_entity_id, shade_state
+
+# Seconds between the frames of a move, the hub sends them a lot faster than
+# the default write budget.
+FRAME_INTERVAL = timedelta(seconds=0.1)
+MOVE_FRAMES = 100
+UNLIMITED_OPTIONS = {CONF_MAX_WRITE_RATE: 0, CONF_POSITION_DEADBAND: 0}
+
+
+async def _async_close_shade(
+    hass: HomeAssistant,
+    freezer: FrozenDateTimeFactory,
+    controllers: list[ESPSomfyController],
+) -> None:
+    """Close shade 1 on every hub one percent per frame and stop it at the end."""
+    for position in range(1, MOVE_FRAMES + 1):
+        freezer.tick(FRAME_INTERVAL)
+        for controller in controllers:
+            controller.ws_onpacket(shade_state(position, 1))
+        async_fire_time_changed(hass)
+        await hass.async_block_till_done()
+    freezer.tick(FRAME_INTERVAL)
+    for controller in controllers:
+        controller.ws_onpacket(shade_state(MOVE_FRAMES, 0))
+    # Let the writes held back by the budget go out.
+    freezer.tick(timedelta(seconds=5))
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+
+
+def _recorded_rows(hass: HomeAssistant, start: datetime, entity_id: str) -> int:
+    """Count the states the recorder stored for an entity after a time."""
+    states = history.state_changes_during_period(
+        hass, start, entity_id=entity_id, include_start_time_state=False
+    )
+    return len(states.get(entity_id, []))
+
+
+async def test_limiter_saves_writes_and_rows(
+    recorder_mock: Recorder,
+    hass: HomeAssistant,
+    hass_storage: dict[str, Any],
+    discovery: dict[str, Any],
+    freezer: FrozenDateTimeFactory,
+) -> None:
+    """Test a move writes and records far less with the limiter than without."""
+    limited = await setup_integration(hass, hass_storage, discovery)
+    unlimited = await setup_integration(
+        hass,
+        hass_storage,
+        {**discovery, "serverId": "SIM000002"},
+        UNLIMITED_OPTIONS,
+        host="192.0.2.2",
+    )
+    limited_id = shade_entity_id(hass, limited)
+    unlimited_id = shade_entity_id(hass, unlimited)
+    await async_wait_recording_done(hass)
+    start = dt_util.utcnow()
+    limited_writes = limited.state_writes
+    unlimited_writes = unlimited.state_writes
+
+    await _async_close_shade(hass, freezer, [limited, unlimited])
+    await async_wait_recording_done(hass)
+
+    limited_writes = limited.state_writes - limited_writes
+    unlimited_writes = unlimited.state_writes - unlimited_writes
+    # Without the limiter every frame is written.
+    assert unlimited_writes >= MOVE_FRAMES
+    # With it the move is held to the budget plus the start and the stop.
+    move_seconds = MOVE_FRAMES * FRAME_INTERVAL.total_seconds()
+    assert limited_writes <= move_seconds * DEFAULT_MAX_WRITE_RATE + 3
+    assert limited.writes_suppressed > 0
+    assert unlimited.writes_suppressed == 0
+
+    limited_rows = await get_instance(hass).async_add_executor_job(
+        _recorded_rows, hass, start, limited_id
+    )
+    unlimited_rows = await get_instance(hass).async_add_executor_job(
+        _recorded_rows, hass, start, unlimited_id
+    )
+    assert 0 < limited_rows <= limited_writes
+    assert limited_rows < unlimited_rows <= unlimited_writes
+
+    # Both shades end up at the position of the last frame.
+    assert hass.states.get(limited_id).state == CoverState.CLOSED
+    assert hass.states.get(unlimited_id).state == CoverState.CLOSED
+
+
+async def test_stop_is_written_at_once(
+    hass: HomeAssistant,
+    hass_storage: dict[str, Any],
+    discovery: dict[str, Any],
+    freezer: FrozenDateTimeFactory,
+) -> None:
+    """Test the stop of a move is written without waiting for the budget."""
+    controller = await setup_integration(hass, hass_storage, discovery)
+    entity_id = shade_entity_id(hass, controller)
+
+    controller.ws_onpacket(shade_state(1, 1))
+    freezer.tick(FRAME_INTERVAL)
+    # Inside the deadband of the first frame so it is not written.
+    controller.ws_onpacket(shade_state(2, 1))
+    writes = controller.state_writes
+    freezer.tick(FRAME_INTERVAL)
+    controller.ws_onpacket(shade_state(3, 0, 3))
+    await hass.async_block_till_done()
+
+    assert controller.state_writes == writes + 1
+    assert hass.states.get(entity_id).state == CoverState.OPEN
@@ -0,0 +1,83 @@
+"""Tests for the shade attributes kept out of the recorder."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+import pytest
+from pytest_homeassistant_custom_component.components.recorder.common import (
+    async_wait_recording_done,
+)
+
+from homeassistant.components.recorder import Recorder, get_instance, history
+from homeassistant.core import HomeAssistant, State
+from homeassistant.util import dt as dt_util
+
+from custom_components.espsomfy_rts.const import (
+    CONF_RECORDED_ATTRIBUTES,
+    VOLATILE_ATTRIBUTES,
+)
+
+from . import setup_integration, shade_entity_id, shade_state
+
+
+def _recorded_state(hass: HomeAssistant, start: datetime, entity_id: str) -> State:
+    """Get the last state the recorder stored for an entity after a time."""
+    states = history.get_significant_states(
+        hass,
+        start,
+        entity_ids=[entity_id],
+        significant_changes_only=False,
+        include_start_time_state=False,
+    )
+    return states[entity_id][-1]
+
+
+@pytest.mark.parametrize(
+    ("options", "recorded"),
+    [
+        ({}, False),
+        ({CONF_RECORDED_ATTRIBUTES: list(VOLATILE_ATTRIBUTES)}, True),
+    ],
+)
+async def test_volatile_attributes(
+    recorder_mock: Recorder,
+    hass: HomeAssistant,
+    hass_storage: dict[str, Any],
+    discovery: dict[str, Any],
+    options: dict[str, Any],
+    recorded: bool,
+) -> None:
+    """Test the volatile attributes are only recorded when they are chosen."""
+    controller = await setup_integration(hass, hass_storage, discovery, options)
+    entity_id = shade_entity_id(hass, controller)
+    await async_wait_recording_done(hass)
+    start = dt_util.utcnow()
+
+    controller.ws_onpacket(
+        {
+            "event": "shadeCommand",
+            "shadeId": 1,
+            "remoteAddress": 1234,
+            "cmd": "Down",
+            "source": "remote",
+            "sourceAddress": 5678,
+        }
+    )
+    controller.ws_onpacket(shade_state(10, 1))
+    await hass.async_block_till_done()
+    await async_wait_recording_done(hass)
+
+    attributes = hass.states.get(entity_id).attributes
+    volatile = [name for name in VOLATILE_ATTRIBUTES if name in attributes]
+    assert {"target", "last_cmd", "cmd_source", "cmd_address", "cmd_fired"} <= set(
+        volatile
+    )
+    state = await get_instance(hass).async_add_executor_job(
+        _recorded_state, hass, start, entity_id
+    )
+    for name in volatile:
+        assert (name in state.attributes) is recorded
+    # The other attributes are always recorded.
+    assert state.attributes["remote_address"] == attributes["remote_address"]